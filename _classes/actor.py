@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio, logging
+from discord.ext import commands
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+Job = Tuple[Callable[..., Awaitable[Any]], tuple, dict, asyncio.Future]
+
+
+class MailboxFull(commands.CommandError):
+    """Raised when a guild already has too many pending music commands"""
+    def __init__(self) -> None:
+        super().__init__("Có quá nhiều lệnh đang chờ xử lý, hãy thử lại sau ít giây")
+
+
+class GuildActor:
+    """
+    Runs the music commands of one guild one after another.
+
+    Jobs are coroutine functions put in a bounded mailbox and awaited in order by a
+    single task, so two commands of the same guild never interleave. The task exits
+    after `idle_timeout` seconds without jobs, `ActorRegistry` starts a new one on demand.
+
+    Parameters
+    -----------
+    guild_id: `int`
+        The guild this actor belongs to
+    maxsize: `int`
+        Maximum number of pending jobs
+    idle_timeout: `float`
+        Seconds without jobs before the task exits
+    on_exit: `Optional[Callable[[GuildActor], None]]`
+        Called when the task exits because it was idle
+    """
+    def __init__(self, guild_id: int, *, maxsize: int, idle_timeout: float,
+                 on_exit: Optional[Callable[[GuildActor], None]] = None) -> None:
+        self.guild_id = guild_id
+        self.idle_timeout = idle_timeout
+        self.on_exit = on_exit
+        self.mailbox: asyncio.Queue[Job] = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name=f"guild-actor-{self.guild_id}")
+
+    async def submit(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Queue `func(*args, **kwargs)` and wait for its result, raises `MailboxFull` if the mailbox is full"""
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        try:
+            self.mailbox.put_nowait((func, args, kwargs, future))
+        except asyncio.QueueFull:
+            raise MailboxFull() from None
+        self.start()
+        return await future
+
+    async def post(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """
+        Like `submit`, but waits for a free slot instead of raising `MailboxFull`.
+
+        For lifecycle events such as a track ending, which must never be dropped
+        because users are spamming commands.
+        """
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self.mailbox.put((func, args, kwargs, future))
+        self.start()
+        return await future
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        while not self.mailbox.empty():
+            *_, future = self.mailbox.get_nowait()
+            future.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                func, args, kwargs, future = await asyncio.wait_for(self.mailbox.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                if self.mailbox.empty():
+                    if self.on_exit:
+                        self.on_exit(self)
+                    return
+                continue
+            # The caller stopped waiting, e.g. its interaction expired
+            if future.cancelled():
+                continue
+            try:
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                future.cancel()
+                # Only stop the actor if it is the one being cancelled, not the job
+                if asyncio.current_task().cancelling():
+                    raise
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+
+class ActorRegistry:
+    """
+    One `GuildActor` per guild, created lazily.
+
+    Guilds do not share anything, so commands of different guilds run fully in parallel.
+
+    Parameters
+    -----------
+    maxsize: `int`
+        Mailbox size of every actor
+    idle_timeout: `float`
+        Seconds an actor's task stays alive without jobs
+    """
+    def __init__(self, *, maxsize: int, idle_timeout: float) -> None:
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.actors: Dict[int, GuildActor] = {}
+
+    def get(self, guild_id: int) -> GuildActor:
+        actor = self.actors.get(guild_id)
+        if actor is None:
+            actor = self.actors[guild_id] = GuildActor(guild_id, maxsize=self.maxsize,
+                                                       idle_timeout=self.idle_timeout, on_exit=self._forget)
+        return actor
+
+    def _forget(self, actor: GuildActor) -> None:
+        if self.actors.get(actor.guild_id) is actor:
+            del self.actors[actor.guild_id]
+
+    async def submit(self, guild_id: int, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Run `func(*args, **kwargs)` on the actor of `guild_id` and return its result"""
+        return await self.get(guild_id).submit(func, *args, **kwargs)
+
+    async def post(self, guild_id: int, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Run `func(*args, **kwargs)` on the actor of `guild_id`, waiting for room in a full mailbox"""
+        return await self.get(guild_id).post(func, *args, **kwargs)
+
+    async def close(self) -> None:
+        actors, self.actors = list(self.actors.values()), {}
+        for actor in actors:
+            await actor.stop()
+        if actors:
+            logging.info(f"Stopped {len(actors)} guild actors")
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    A bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    Parameters
+    -----------
+    maxsize: `int`
+        Maximum number of entries kept, the least recently used one is evicted first
+    ttl: `float`
+        Lifetime of an entry in seconds
+
+    Attributes
+    -----------
+    - hits: `int`
+        - Number of lookups answered from the cache
+    - misses: `int`
+        - Number of lookups that were missing or expired
+    """
+    def __init__(self, *, maxsize: int = 512, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, *, count: bool = True) -> Optional[V]:
+        """
+        Return the cached value for `key`, or `None` if it is missing or expired.
+
+        Pass `count=False` for a lookup that is part of one already counted,
+        so a single request is never counted as two misses.
+        """
+        entry = self._data.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._data[key]
+            entry = None
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Cache `value` under `key`, evicting the least recently used entries if needed"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove `key` from the cache and return its value if it was there"""
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        """Short human readable summary of the cache"""
+        return (f"{len(self)}/{self.maxsize} entries, "
+                f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%})")
+
+
+class SingleFlight(Generic[V]):
+    """
+    Runs one call per key at a time, concurrent callers with the same key share its result.
+
+    The shared call is shielded, a caller that is cancelled does not cancel it for the others.
+
+    Attributes
+    -----------
+    - coalesced: `int`
+        - Number of calls answered by a call already in flight
+    """
+    def __init__(self) -> None:
+        self.coalesced: int = 0
+        self._inflight: Dict[Hashable, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[V]]) -> V:
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(call())
+            future.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future[V]) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Every caller may have been cancelled, do not leave the error unretrieved
+        if not future.cancelled():
+            future.exception()
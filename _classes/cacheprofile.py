@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import discord, gc, tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from discord.state import ConnectionState
+
+
+@dataclass(frozen=True)
+class CacheProfile:
+    """
+    What the gateway sends and what discord.py keeps of it.
+
+    Attributes
+    -----------
+    name: `str`
+        Name of the profile, see `PROFILES`
+    intents: `discord.Intents`
+        Gateway intents
+    member_cache_flags: `discord.MemberCacheFlags`
+        Which members are cached
+    chunk_guilds_at_startup: `bool`
+        Whether the full member list of every guild is requested on startup
+    max_messages: `Optional[int]`
+        Size of the message cache, `None` disables it
+    """
+    name: str
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    chunk_guilds_at_startup: bool
+    max_messages: Optional[int]
+
+    def options(self) -> Dict[str, Any]:
+        """Keyword arguments for `commands.Bot`"""
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+            "max_messages": self.max_messages,
+        }
+
+
+def _lean_intents() -> discord.Intents:
+    # Prefix commands still need the content, members are only needed while they are in voice
+    intents = discord.Intents.default()
+    intents.message_content = True
+    return intents
+
+
+PROFILES: Dict[str, CacheProfile] = {
+    "full": CacheProfile("full", discord.Intents.all(), discord.MemberCacheFlags.all(),
+                         chunk_guilds_at_startup=True, max_messages=1000),
+    "lean": CacheProfile("lean", _lean_intents(), discord.MemberCacheFlags.from_intents(_lean_intents()),
+                         chunk_guilds_at_startup=False, max_messages=None),
+}
+
+
+def get_profile(name: str) -> CacheProfile:
+    """The profile called `name`, raises `ValueError` if there is none"""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown cache profile {name!r}, expected one of {', '.join(PROFILES)}") from None
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": str(user_id), "username": f"user{user_id}", "global_name": f"User {user_id}",
+            "discriminator": "0", "avatar": f"{user_id:032x}"}
+
+
+def _guild_payload(guild_id: int, members: int, *, all_members: bool, presences: bool,
+                   in_voice: int) -> Dict[str, Any]:
+    """A GUILD_CREATE payload holding what the gateway would send for the given intents"""
+    base = guild_id * 100_000
+    roles = [{"id": str(guild_id if i == 0 else base + i), "name": "@everyone" if i == 0 else f"role {i}",
+              "permissions": "0", "position": i, "color": 0, "hoist": False, "managed": False,
+              "mentionable": False} for i in range(10)]
+    channels = [{"id": str(base + 100 + i), "type": 0, "name": f"channel {i}", "position": i,
+                 "permission_overwrites": []} for i in range(10)]
+    channels += [{"id": str(base + 110 + i), "type": 2, "name": f"voice {i}", "position": 10 + i,
+                  "permission_overwrites": [], "bitrate": 64000, "user_limit": 0} for i in range(2)]
+    voice_channel = channels[-1]["id"]
+    ids = [base + 1000 + i for i in range(members)]
+    # Without the members intent only the members in voice come with the guild
+    delivered = ids if all_members else ids[:in_voice]
+    payload = {
+        "id": str(guild_id), "name": f"guild {guild_id}", "member_count": members, "roles": roles,
+        "channels": channels, "emojis": [], "stickers": [], "features": [],
+        "members": [{"user": _user(user_id), "roles": [roles[1]["id"], roles[2]["id"]],
+                     "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+                    for user_id in delivered],
+        "voice_states": [{"user_id": str(user_id), "channel_id": voice_channel, "session_id": "0",
+                          "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                          "self_video": False, "suppress": False, "request_to_speak_timestamp": None}
+                         for user_id in ids[:in_voice]],
+    }
+    if presences:
+        payload["presences"] = [{"user": {"id": str(user_id)}, "status": "online",
+                                 "client_status": {"desktop": "online"},
+                                 "activities": [{"name": "Genshin Impact", "type": 0, "created_at": 0}]}
+                                for user_id in delivered]
+    return payload
+
+
+def _message_payload(message_id: int, channel_id: int, author_id: int) -> Dict[str, Any]:
+    return {"id": str(message_id), "channel_id": str(channel_id), "author": _user(author_id),
+            "content": "!play em của ngày hôm qua", "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+            "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0}
+
+
+def _state(profile: CacheProfile) -> ConnectionState:
+    return ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None,
+                           intents=profile.intents, member_cache_flags=profile.member_cache_flags,
+                           max_messages=profile.max_messages, chunk_guilds_at_startup=profile.chunk_guilds_at_startup)
+
+
+def _traced(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by `build` once its garbage is collected, what it returns is kept alive until then"""
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - start
+    del kept
+    return size
+
+
+def measure_caches(profile: CacheProfile, *, guilds: int = 100, members: int = 250,
+                   messages: int = 5000, in_voice: int = 5) -> Dict[str, int]:
+    """
+    Resident bytes of the discord.py caches of `profile` under a synthetic load.
+
+    Guilds are built from GUILD_CREATE payloads like the gateway would send them for the
+    profile's intents, once without members, once with the members and once with the
+    presences too, the differences give the cost of each cache. Then `messages` messages
+    are pushed through the message cache. This is CPU heavy, run it in a thread.
+
+    Parameters
+    -----------
+    profile: `CacheProfile`
+        The profile to measure
+    guilds: `int`
+        Number of synthetic guilds
+    members: `int`
+        Members per guild
+    messages: `int`
+        Messages received, the cache keeps at most `profile.max_messages` of them
+    in_voice: `int`
+        Members per guild sitting in a voice channel
+
+    Returns
+    -----------
+    `Dict[str, int]`
+        - Bytes per cache: `guilds` (channels and roles included), `members` (users included),
+          `presences` and `messages`
+    """
+    intents = profile.intents
+
+    def build(with_members: bool, presences: bool) -> Callable[[], list]:
+        def run() -> list:
+            state = _state(profile)
+            built = [discord.Guild(data=_guild_payload(guild_id, members, all_members=with_members and intents.members,
+                                                       presences=presences, in_voice=in_voice if with_members else 0),
+                                   state=state)
+                     for guild_id in range(1, guilds + 1)]
+            return [state, built]
+        return run
+
+    def channel() -> list:
+        state = _state(profile)
+        guild = discord.Guild(data=_guild_payload(1, 0, all_members=False, presences=False, in_voice=0), state=state)
+        return [state, guild.text_channels[0]]
+
+    def fill_messages() -> list:
+        state, text_channel = kept = channel()
+        for i in range(messages):
+            message = discord.Message(state=state, channel=text_channel,
+                                      data=_message_payload(i + 1, text_channel.id, i % 500 + 1))
+            if state._messages is not None:
+                state._messages.append(message)
+        return kept
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        bare = _traced(build(False, False))
+        with_members = _traced(build(True, False))
+        with_presences = _traced(build(True, intents.presences))
+        empty = _traced(channel)
+        message_cache = _traced(fill_messages)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {
+        "guilds": bare,
+        "members": max(with_members - bare, 0),
+        "presences": max(with_presences - with_members, 0),
+        "messages": max(message_cache - empty, 0),
+    }
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio, json, logging, multiprocessing
+from aiohttp import ClientSession
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+Address = Tuple[str, int]
+Handler = Callable[[Dict[str, Any]], Any]
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+async def fetch_recommended_shards(token: str) -> int:
+    """Number of shards Discord recommends for the bot"""
+    async with ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def split_shards(shard_count: int, clusters: int) -> List[List[int]]:
+    """Contiguous groups of shard ids, one per cluster, the first clusters get the extra shards"""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    groups, start = [], 0
+    for i in range(clusters):
+        end = start + size + (i < extra)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+class IPCHub:
+    """
+    Local message bus between the clusters, run by the launcher.
+
+    Every cluster keeps one TCP connection to the hub and sends newline delimited
+    JSON messages, the hub forwards each message to every other cluster.
+    """
+    def __init__(self) -> None:
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.forwarded: int = 0
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._serve, host, port)
+        logging.info(f"IPC hub listening on {host}:{port}")
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self._writers):
+            writer.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            async for line in reader:
+                for other in list(self._writers):
+                    if other is not writer and not other.is_closing():
+                        other.write(line)
+                        self.forwarded += 1
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class ClusterIPC:
+    """
+    The connection of one cluster to the `IPCHub`.
+
+    `publish` never blocks, messages published while the hub is unreachable are dropped,
+    the connection is retried in the background.
+
+    Parameters
+    -----------
+    cluster_id: `int`
+        Id of this cluster, sent with every message
+    host: `str`
+        Address of the hub
+    port: `int`
+        Port of the hub
+    """
+    def __init__(self, cluster_id: int, host: str, port: int) -> None:
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.dropped: int = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        """Call `handler` with the data of every message other clusters publish on `topic`"""
+        self.handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> None:
+        if self._writer is None or self._writer.is_closing():
+            self.dropped += 1
+            logging.warning(f"IPC hub unreachable, dropped a {topic!r} message")
+            return
+        message = {"topic": topic, "cluster": self.cluster_id, "data": data}
+        self._writer.write(json.dumps(message).encode() + b"\n")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"cluster-ipc-{self.cluster_id}")
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                logging.warning(f"Cannot reach the IPC hub ({e}), retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            backoff = 1.0
+            try:
+                async for line in reader:
+                    self._dispatch(line)
+            except ConnectionError:
+                pass
+            self._writer.close()
+            self._writer = None
+            logging.warning("Lost the connection to the IPC hub")
+
+    def _dispatch(self, line: bytes) -> None:
+        try:
+            message = json.loads(line)
+            handlers = self.handlers.get(message["topic"], [])
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring a malformed IPC message: {e}")
+            return
+        for handler in handlers:
+            try:
+                handler(message["data"])
+            except Exception as e:
+                logging.error(f"IPC handler for {message['topic']!r} failed: {e!r}")
+
+
+class ClusterLauncher:
+    """
+    Runs groups of shards in separate processes.
+
+    Every cluster is a process with its own event loop, database pool and http session,
+    started with `target(cluster_id, shard_ids, shard_count, address)`. The launcher runs
+    the `IPCHub` the clusters talk through and restarts a cluster that crashes.
+
+    Parameters
+    -----------
+    target: `Callable[[int, List[int], int, Address], None]`
+        Entry point of a cluster process, must be importable by a spawned process
+    shard_count: `int`
+        Total number of shards
+    clusters: `int`
+        Number of processes
+    address: `Tuple[str, int]`
+        Where the IPC hub listens
+    max_backoff: `float`
+        Maximum delay between two restarts of a cluster in seconds
+    """
+    def __init__(self, target: Callable[[int, List[int], int, Address], None], *, shard_count: int,
+                 clusters: int, address: Address, max_backoff: float = 60.0) -> None:
+        self.target = target
+        self.shard_count = shard_count
+        self.groups = split_shards(shard_count, clusters)
+        self.address = address
+        self.max_backoff = max_backoff
+        self.hub = IPCHub()
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+
+    def _spawn(self, cluster_id: int) -> None:
+        process = self._context.Process(
+            target=self.target, args=(cluster_id, self.groups[cluster_id], self.shard_count, self.address),
+            name=f"furina-cluster-{cluster_id}"
+        )
+        process.start()
+        self._processes[cluster_id] = process
+        logging.info(f"Started cluster {cluster_id} (pid {process.pid}) with shards {self.groups[cluster_id]}")
+
+    async def run(self) -> None:
+        """Start every cluster and supervise them until cancelled"""
+        await self.hub.start(*self.address)
+        backoff = {cluster_id: 1.0 for cluster_id in range(len(self.groups))}
+        try:
+            for cluster_id in range(len(self.groups)):
+                self._spawn(cluster_id)
+            while True:
+                await asyncio.sleep(1.0)
+                for cluster_id, process in list(self._processes.items()):
+                    if process.is_alive():
+                        continue
+                    logging.error(f"Cluster {cluster_id} exited with code {process.exitcode}, "
+                                  f"restarting in {backoff[cluster_id]:.0f}s")
+                    await asyncio.sleep(backoff[cluster_id])
+                    backoff[cluster_id] = min(backoff[cluster_id] * 2, self.max_backoff)
+                    self._spawn(cluster_id)
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            await asyncio.to_thread(process.join, 15)
+            if process.is_alive():
+                process.kill()
+        await self.hub.close()
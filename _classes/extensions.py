@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import ast, asyncio, importlib.util, logging, time
+from dataclasses import dataclass, field
+from discord.ext import commands
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Bot
+
+
+def read_dependencies(name: str) -> Tuple[str, ...]:
+    """
+    The `DEPENDS` tuple of the extension `name`, read from its source without importing it.
+
+    An extension declares the extensions it needs loaded first with a module level
+    `DEPENDS = ("_extensions.utils",)`, extensions without one depend on nothing.
+    """
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin:
+        return ()
+    with open(spec.origin, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), spec.origin)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id == "DEPENDS"):
+            return tuple(ast.literal_eval(node.value))
+    return ()
+
+
+class WarmingUp(commands.CheckFailure):
+    """A command needs the background start up work of its cog, which has not finished yet"""
+
+
+class Warmup:
+    """
+    Start up work of a cog running in the background after `cog_load` returned.
+
+    A failed attempt is retried after `retry_delay` seconds, the delay doubling up to
+    `max_retry_delay`, until it succeeds or the cog is unloaded. A dependency that is
+    down while the bot starts, e.g. Lavalink, does not leave the cog broken until the
+    next restart, so the work must be safe to run again after a failure.
+
+    Parameters
+    -----------
+    name: `str`
+        Shown in the logs
+    work: `Callable[[], Awaitable[None]]`
+        The work, usually the slow half of `cog_load`, called once per attempt
+    started: `float`
+        `time.perf_counter()` of the start of the bot, for the startup timeline
+    retry_delay: `float`
+        Seconds before the first retry
+    max_retry_delay: `float`
+        Longest delay between two attempts
+    """
+    def __init__(self, name: str, work: Callable[[], Awaitable[None]], *, started: float,
+                 retry_delay: float, max_retry_delay: float) -> None:
+        self.name = name
+        self.started = started
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.attempts: int = 0
+        self.duration: Optional[float] = None
+        self.error: Optional[Exception] = None
+        self.retry_at: Optional[float] = None
+        self._attempted = asyncio.Event()
+        self.task = asyncio.create_task(self._run(work), name=f"warmup-{name}")
+
+    async def _run(self, work: Callable[[], Awaitable[None]]) -> None:
+        loop = asyncio.get_running_loop()
+        delay = self.retry_delay
+        while True:
+            self.attempts += 1
+            begin = time.perf_counter()
+            try:
+                await work()
+            except Exception as e:
+                self.error = e
+                logging.error(f"Warm-up of {self.name} failed (attempt {self.attempts}), "
+                              f"retrying in {delay:.0f}s: {e!r}", exc_info=e)
+            else:
+                self.error = None
+                self.duration = time.perf_counter() - begin
+                logging.info(f"Warm-up of {self.name} finished in {self.duration * 1000:.0f} ms, "
+                             f"{(time.perf_counter() - self.started) * 1000:.0f} ms after startup")
+                return
+            finally:
+                self._attempted.set()
+            self.retry_at = loop.time() + delay
+            await asyncio.sleep(delay)
+            self.retry_at = None
+            delay = min(delay * 2, self.max_retry_delay)
+
+    @property
+    def ready(self) -> bool:
+        return self.task.done() and not self.task.cancelled() and self.error is None
+
+    @property
+    def failed(self) -> bool:
+        """Whether the last attempt failed, a retry may still be pending"""
+        return self.task.cancelled() or self.error is not None
+
+    async def wait(self) -> bool:
+        """Wait until the first attempt is done, returns whether the work succeeded"""
+        attempted = asyncio.ensure_future(self._attempted.wait())
+        try:
+            await asyncio.wait((attempted, self.task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            attempted.cancel()
+        return self.ready
+
+    def check(self) -> None:
+        """Raise `WarmingUp` unless the work is done"""
+        if self.ready:
+            return
+        if not self.failed:
+            raise WarmingUp(f"{self.name} is warming up")
+        if self.retry_at is not None:
+            retry_in = max(self.retry_at - asyncio.get_running_loop().time(), 0)
+            raise WarmingUp(f"{self.name} failed to start, retrying in {retry_in:.0f}s")
+        raise WarmingUp(f"{self.name} failed to start" if self.task.done() else f"{self.name} failed to start, retrying")
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+@dataclass
+class ExtensionTiming:
+    name: str
+    depends: Tuple[str, ...]
+    start: float = 0.0
+    end: float = 0.0
+    error: Optional[str] = None
+    warmups: List[Warmup] = field(default_factory=list)
+
+
+class ExtensionLoader:
+    """
+    Loads extensions concurrently, each one once the extensions in its `DEPENDS` are loaded.
+
+    An extension whose dependency failed or is not in the load set is not loaded, neither
+    are the extensions of a dependency cycle.
+    Cogs move slow start up work out of `cog_load` with `warmup`, `load` then returns
+    without waiting for it.
+
+    Parameters
+    -----------
+    bot: `commands.Bot`
+        The bot the extensions are loaded into
+    retry_delay: `float`
+        Seconds before a failed warm-up is retried the first time
+    max_retry_delay: `float`
+        Longest delay between two attempts of a warm-up
+    """
+    def __init__(self, bot: Bot, *, retry_delay: float, max_retry_delay: float) -> None:
+        self.bot = bot
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.started = time.perf_counter()
+        self.timings: Dict[str, ExtensionTiming] = {}
+        self.warmups: Dict[str, Warmup] = {}
+
+    def warmup(self, cog: commands.Cog, work: Callable[[], Awaitable[None]]) -> Warmup:
+        """Run `work()` in the background as the warm-up of `cog`, usually called from its `cog_load`"""
+        warmup = self.warmups[cog.qualified_name] = Warmup(cog.qualified_name, work, started=self.started,
+                                                           retry_delay=self.retry_delay,
+                                                           max_retry_delay=self.max_retry_delay)
+        timing = self.timings.get(type(cog).__module__)
+        if timing:
+            timing.warmups.append(warmup)
+        return warmup
+
+    @staticmethod
+    def order(dependencies: Dict[str, Tuple[str, ...]]) -> Tuple[List[str], List[Tuple[str, ...]]]:
+        """
+        The extensions in an order loading them one by one would respect, and the dependency cycles.
+
+        Returns
+        -----------
+        `Tuple[List[str], List[Tuple[str, ...]]]`
+            - The extensions outside of any cycle, dependencies first
+            - Every cycle found, as the extensions in it
+        """
+        ordered: List[str] = []
+        cycles: List[Tuple[str, ...]] = []
+        state: Dict[str, bool] = {}
+        cyclic: Set[str] = set()
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name):
+                return
+            if name in state:
+                cycle = path[path.index(name):]
+                cycles.append(cycle)
+                cyclic.update(cycle)
+                return
+            state[name] = False
+            for dependency in dependencies.get(name, ()):
+                if dependency in dependencies:
+                    visit(dependency, path + (name,))
+            state[name] = True
+            if name not in cyclic:
+                ordered.append(name)
+
+        for name in dependencies:
+            visit(name, ())
+        return ordered, cycles
+
+    async def load(self, extensions: Iterable[str]) -> Dict[str, ExtensionTiming]:
+        """
+        Load `extensions` and log the startup timeline.
+
+        Returns
+        -----------
+        `Dict[str, ExtensionTiming]`
+            - When every extension started and finished loading, and why it failed if it did
+        """
+        dependencies = {name: read_dependencies(name) for name in extensions}
+        _, cycles = self.order(dependencies)
+        # Extensions of a cycle would wait for each other forever, they fail instead
+        cyclic = {name: cycle for cycle in cycles for name in cycle}
+        self.timings = {name: ExtensionTiming(name, depends) for name, depends in dependencies.items()}
+        loaded: Dict[str, asyncio.Future] = {name: asyncio.get_running_loop().create_future()
+                                             for name in dependencies}
+
+        async def load_one(name: str) -> None:
+            timing = self.timings[name]
+            try:
+                if name in cyclic:
+                    raise LookupError(f"is in the dependency cycle {' -> '.join(cyclic[name] + cyclic[name][:1])}")
+                for dependency in timing.depends:
+                    if dependency not in loaded:
+                        raise LookupError(f"depends on {dependency}, which is not an extension")
+                    if not await loaded[dependency]:
+                        raise LookupError(f"depends on {dependency}, which failed to load")
+                timing.start = time.perf_counter()
+                await self.bot.load_extension(name)
+            except Exception as e:
+                timing.error = f"{e}"
+                logging.error(f"An error occured when trying to load {name}\n{e}", exc_info=not isinstance(e, LookupError))
+                loaded[name].set_result(False)
+            else:
+                logging.info(f"Loaded extension: {name}")
+                loaded[name].set_result(True)
+            finally:
+                timing.end = time.perf_counter()
+
+        await asyncio.gather(*(load_one(name) for name in dependencies))
+        logging.info(self.timeline())
+        return self.timings
+
+    def timeline(self) -> str:
+        """The start time and load time of every extension, relative to the start of the bot"""
+        end = max((timing.end for timing in self.timings.values()), default=self.started)
+        lines = [f"Startup timeline, extensions loaded {(end - self.started) * 1000:.0f} ms after startup:"]
+        width = max((len(name) for name in self.timings), default=0)
+        for timing in sorted(self.timings.values(), key=lambda timing: (timing.start or timing.end)):
+            begin = timing.start or timing.end
+            line = (f"  {timing.name:<{width}}  +{(begin - self.started) * 1000:>7.0f} ms"
+                    f"  {(timing.end - begin) * 1000:>7.0f} ms")
+            if timing.error:
+                line += f"  FAILED ({timing.error})"
+            for warmup in timing.warmups:
+                line += (f"  warm-up {warmup.duration * 1000:.0f} ms" if warmup.duration is not None
+                         else "  warming up in the background")
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from asqlite import Pool
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class GuildConfig:
+    guild_id: int
+    prefix: Optional[str] = None
+    music_channel: Optional[int] = None
+    webhook: Optional[str] = None
+
+
+class GuildSettings:
+    """
+    Per guild settings in the `guild_settings` table, cached in memory.
+
+    Every guild is read once by `load`, updates write their single row then the cache,
+    so reads never touch the database. The prefix lists returned by `prefixes`
+    are built once per guild and shared, callers must not mutate them.
+
+    Parameters
+    -----------
+    pool: `asqlite.Pool`
+        The bot's database pool
+    default_prefix: `str`
+        Prefix of the guilds without a custom one
+    default_music_channel: `Optional[int]`
+        Music channel of the guilds without a configured one
+    default_webhook: `Optional[str]`
+        Music webhook url of the guilds without a configured one
+
+    Attributes
+    -----------
+    on_update: `Optional[Callable[[GuildConfig], None]]`
+        Called after every `update`, e.g. to tell the other clusters
+    """
+    COLUMNS = ("prefix", "music_channel", "webhook")
+
+    def __init__(self, pool: Pool, *, default_prefix: str, default_music_channel: Optional[int] = None,
+                 default_webhook: Optional[str] = None) -> None:
+        self.pool = pool
+        self.default_prefix = default_prefix
+        self.default_music_channel = default_music_channel
+        self.default_webhook = default_webhook
+        self._configs: Dict[int, GuildConfig] = {}
+        self._mentions: List[str] = []
+        self._prefixes: Dict[int, List[str]] = {}
+        self._default_prefixes: List[str] = [default_prefix]
+        self.on_update: Optional[Callable[[GuildConfig], None]] = None
+
+    async def create_table(self) -> None:
+        """Create a `guild_settings` table in the database, moving the rows of the old `custom_prefixes` table"""
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """CREATE TABLE IF NOT EXISTS guild_settings
+                   ( guild_id      INT NOT NULL PRIMARY KEY,
+                     prefix        TEXT,
+                     music_channel INT,
+                     webhook       TEXT )""")
+            async with db.execute(
+                """SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'custom_prefixes'"""
+            ) as cursor:
+                legacy = await cursor.fetchone()
+            if legacy:
+                async with db.transaction():
+                    await db.execute(
+                        """INSERT INTO guild_settings ( guild_id, prefix )
+                           SELECT guild_id, prefix FROM custom_prefixes WHERE true
+                           ON CONFLICT(guild_id) DO UPDATE SET prefix = excluded.prefix""")
+                    await db.execute("""DROP TABLE custom_prefixes""")
+
+    async def load(self) -> None:
+        """Read every row of the table into the cache"""
+        async with self.pool.acquire() as db:
+            async with db.execute("""SELECT * FROM guild_settings""") as cursor:
+                rows = await cursor.fetchall()
+        self._configs = {row["guild_id"]: GuildConfig(row["guild_id"], row["prefix"], row["music_channel"],
+                                                      row["webhook"])
+                         for row in rows}
+        self._rebuild()
+
+    def bind(self, user_id: int) -> None:
+        """Add the mentions of the bot user `user_id` to every prefix list"""
+        self._mentions = [f"<@{user_id}> ", f"<@!{user_id}> "]
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._default_prefixes = self._mentions + [self.default_prefix]
+        self._prefixes = {guild_id: self._mentions + [config.prefix]
+                          for guild_id, config in self._configs.items() if config.prefix}
+
+    def get(self, guild_id: int) -> GuildConfig:
+        return self._configs.get(guild_id) or GuildConfig(guild_id)
+
+    def prefix(self, guild_id: Optional[int]) -> str:
+        config = self._configs.get(guild_id)
+        return config.prefix if config and config.prefix else self.default_prefix
+
+    def prefixes(self, guild_id: Optional[int]) -> List[str]:
+        """Mentions and prefix of `guild_id`, the same list object on every call"""
+        return self._prefixes.get(guild_id, self._default_prefixes)
+
+    def music_channel(self, guild_id: int) -> Optional[int]:
+        config = self._configs.get(guild_id)
+        return config.music_channel if config and config.music_channel else self.default_music_channel
+
+    def webhook(self, guild_id: int) -> Optional[str]:
+        config = self._configs.get(guild_id)
+        return config.webhook if config and config.webhook else self.default_webhook
+
+    async def update(self, guild_id: int, **values) -> GuildConfig:
+        """
+        Write some settings of `guild_id`, `None` resets a setting to its default.
+
+        Parameters
+        -----------
+        guild_id: `int`
+            The guild
+        values:
+            New values of `prefix`, `music_channel` or `webhook`
+
+        Returns
+        -----------
+        `GuildConfig`
+            - The updated settings
+        """
+        unknown = set(values) - set(self.COLUMNS)
+        if unknown:
+            raise TypeError(f"Unknown guild settings: {', '.join(sorted(unknown))}")
+        config = replace(self.get(guild_id), **values)
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """INSERT INTO guild_settings ( guild_id, prefix, music_channel, webhook )
+                   VALUES ( ?, ?, ?, ? )
+                   ON CONFLICT(guild_id) DO UPDATE SET
+                   prefix = excluded.prefix, music_channel = excluded.music_channel, webhook = excluded.webhook""",
+                (guild_id, config.prefix, config.music_channel, config.webhook)
+            )
+        self.apply(config)
+        if self.on_update:
+            self.on_update(config)
+        return config
+
+    def apply(self, config: GuildConfig) -> None:
+        """Put `config` in the cache without writing it, for settings another process already wrote"""
+        self._configs[config.guild_id] = config
+        if config.prefix:
+            self._prefixes[config.guild_id] = self._mentions + [config.prefix]
+        else:
+            self._prefixes.pop(config.guild_id, None)
+
+    def stats(self) -> str:
+        """Short human readable summary of the cache"""
+        return f"{len(self._configs)} guilds configured, {len(self._prefixes)} custom prefixes"
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import bisect, json, logging, time
+from asqlite import Pool
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from wavelink import Playable
+
+from _classes.queue import normalize_title
+
+
+def normalize_uri(uri: str) -> str:
+    """Drop the scheme and `www.` so `youtu` matches `https://www.youtube.com/...`"""
+    uri = uri.casefold().split("://", 1)[-1]
+    return uri.removeprefix("www.")
+
+
+@dataclass
+class HistoryEntry:
+    track: Playable
+    plays: int
+    last_played: float
+
+
+class PrefixIndex:
+    """
+    Sorted keys of the played titles and urls, a prefix lookup is a bisect plus a short scan.
+
+    Every word of a normalized title starts a key, so `"tay"` finds `"Em của ngày hôm qua - Sơn Tùng M-TP"`
+    by its later words as well. Keys are cut to `KEY_LENGTH` characters.
+    """
+    KEY_LENGTH = 40
+
+    def __init__(self) -> None:
+        self._keys: List[Tuple[str, str]] = []
+
+    @classmethod
+    def keys_of(cls, track: Playable) -> set[str]:
+        title = normalize_title(track.title)
+        keys = {title[i:i + cls.KEY_LENGTH] for i in range(len(title)) if i == 0 or title[i - 1] == " "}
+        if track.uri:
+            keys.add(normalize_uri(track.uri)[:cls.KEY_LENGTH])
+        return keys
+
+    def add(self, track: Playable) -> None:
+        for key in self.keys_of(track):
+            bisect.insort(self._keys, (key, track.identifier))
+
+    def discard(self, track: Playable) -> None:
+        for key in self.keys_of(track):
+            i = bisect.bisect_left(self._keys, (key, track.identifier))
+            if i < len(self._keys) and self._keys[i] == (key, track.identifier):
+                del self._keys[i]
+
+    def lookup(self, prefix: str, *, scan: int = 500) -> set[str]:
+        """Identifiers with a key starting with `prefix`, looking at most at `scan` keys"""
+        i = bisect.bisect_left(self._keys, (prefix, ""))
+        found: set[str] = set()
+        for key, identifier in self._keys[i:i + scan]:
+            if not key.startswith(prefix):
+                break
+            found.add(identifier)
+        return found
+
+
+class GuildHistory:
+    """
+    Ring buffer of the last `size` plays of one guild, with the distinct tracks in a `PrefixIndex`.
+
+    Parameters
+    -----------
+    size: `int`
+        Number of plays kept
+    half_life: `float`
+        Seconds after which a play counts half as much when ranking
+    """
+    def __init__(self, *, size: int, half_life: float) -> None:
+        self.half_life = half_life
+        self.plays: Deque[Tuple[str, float]] = deque(maxlen=size)
+        self.entries: Dict[str, HistoryEntry] = {}
+        self.index = PrefixIndex()
+
+    def record(self, track: Playable, played_at: float) -> None:
+        if len(self.plays) == self.plays.maxlen:
+            self._forget_oldest()
+        self.plays.append((track.identifier, played_at))
+        entry = self.entries.get(track.identifier)
+        if entry is None:
+            self.entries[track.identifier] = HistoryEntry(track, 1, played_at)
+            self.index.add(track)
+        else:
+            entry.plays += 1
+            entry.last_played = played_at
+
+    def _forget_oldest(self) -> None:
+        identifier, _ = self.plays.popleft()
+        entry = self.entries[identifier]
+        entry.plays -= 1
+        if not entry.plays:
+            del self.entries[identifier]
+            self.index.discard(entry.track)
+
+    def score(self, entry: HistoryEntry, now: float) -> float:
+        """Play count weighted down by how long ago the track was last played"""
+        return entry.plays * 0.5 ** ((now - entry.last_played) / self.half_life)
+
+    def suggest(self, text: str, limit: int = 25) -> List[Playable]:
+        """The best ranked played tracks whose title words or url start with `text`"""
+        now = time.time()
+        prefix = text.strip()
+        if not prefix:
+            candidates = self.entries.values()
+        else:
+            prefix = normalize_uri(prefix) if "://" in prefix else normalize_title(prefix)
+            candidates = [self.entries[identifier] for identifier in self.index.lookup(prefix)]
+        ranked = sorted(candidates, key=lambda entry: self.score(entry, now), reverse=True)
+        return [entry.track for entry in ranked[:limit]]
+
+
+class PlayHistory:
+    """
+    Per guild play history, kept in memory by `GuildHistory` and in the `play_history` table.
+
+    Plays are buffered and written by `flush`, the table keeps the last `size` plays of each guild.
+
+    Parameters
+    -----------
+    pool: `asqlite.Pool`
+        The bot's database pool
+    size: `int`
+        Number of plays kept per guild
+    half_life: `float`
+        See `GuildHistory`
+    """
+    def __init__(self, pool: Pool, *, size: int, half_life: float) -> None:
+        self.pool = pool
+        self.size = size
+        self.half_life = half_life
+        self.guilds: Dict[int, GuildHistory] = {}
+        self._pending: List[Tuple[int, str, str, float]] = []
+
+    def guild(self, guild_id: int) -> GuildHistory:
+        history = self.guilds.get(guild_id)
+        if history is None:
+            history = self.guilds[guild_id] = GuildHistory(size=self.size, half_life=self.half_life)
+        return history
+
+    async def create_table(self) -> None:
+        """Create a `play_history` table in the database"""
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """CREATE TABLE IF NOT EXISTS play_history
+                   ( guild_id   INT  NOT NULL,
+                     identifier TEXT NOT NULL,
+                     payload    TEXT NOT NULL,
+                     played_at  REAL NOT NULL )""")
+            await db.execute(
+                """CREATE INDEX IF NOT EXISTS play_history_guild
+                   ON play_history ( guild_id, played_at )""")
+
+    async def load(self, owns: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, Playable]]:
+        """
+        Fill the in-memory histories from the table.
+
+        Parameters
+        -----------
+        owns: `Optional[Callable[[int], bool]]`
+            Only load the guilds it returns `True` for, e.g. the guilds of this cluster
+
+        Returns
+        -----------
+        `List[Tuple[int, Playable]]`
+            - Every loaded play as `(guild_id, track)`, oldest first
+        """
+        async with self.pool.acquire() as db:
+            async with db.execute(
+                """SELECT guild_id, payload, played_at FROM
+                   ( SELECT *, ROW_NUMBER() OVER ( PARTITION BY guild_id ORDER BY played_at DESC ) AS rank
+                     FROM play_history )
+                   WHERE rank <= ? ORDER BY played_at""", (self.size,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        plays = []
+        for row in rows:
+            if owns and not owns(row["guild_id"]):
+                continue
+            try:
+                track = Playable(json.loads(row["payload"]))
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Ignoring a corrupted play history entry of guild {row['guild_id']}: {e}")
+                continue
+            self.guild(row["guild_id"]).record(track, row["played_at"])
+            plays.append((row["guild_id"], track))
+        return plays
+
+    def record(self, guild_id: int, track: Playable, played_at: Optional[float] = None) -> None:
+        """Add a play to the history, it is written on the next `flush`"""
+        played_at = played_at or time.time()
+        self.guild(guild_id).record(track, played_at)
+        self._pending.append((guild_id, track.identifier, json.dumps(track.raw_data), played_at))
+
+    def suggest(self, guild_id: int, text: str, limit: int = 25) -> List[Playable]:
+        history = self.guilds.get(guild_id)
+        return history.suggest(text, limit) if history else []
+
+    async def flush(self) -> None:
+        """Write the buffered plays and trim the table of the guilds that played"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        guild_ids = {(guild_id, guild_id, self.size - 1) for guild_id, *_ in pending}
+        async with self.pool.acquire() as db:
+            async with db.transaction():
+                await db.executemany(
+                    """INSERT INTO play_history ( guild_id, identifier, payload, played_at ) VALUES ( ?, ?, ?, ? )""",
+                    pending
+                )
+                await db.executemany(
+                    """DELETE FROM play_history WHERE guild_id = ? AND played_at <
+                       ( SELECT played_at FROM play_history WHERE guild_id = ?
+                         ORDER BY played_at DESC LIMIT 1 OFFSET ? )""",
+                    list(guild_ids)
+                )
+
+    def stats(self) -> str:
+        """Short human readable summary of the history"""
+        plays = sum(len(history.plays) for history in self.guilds.values())
+        tracks = sum(len(history.entries) for history in self.guilds.values())
+        return f"{len(self.guilds)} guilds, {plays} plays of {tracks} tracks, {len(self._pending)} pending"
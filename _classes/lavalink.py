@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio, hashlib, json, logging, os
+from aiohttp import ClientError, ClientSession
+from typing import Any, Dict, List, Optional
+
+CHUNK_SIZE = 1 << 20
+
+
+def sha256_file(path: str) -> str:
+    """Compute the sha256 of a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LavalinkArtifact:
+    """
+    Local cache of the `Lavalink.jar` release.
+
+    The installed version, checksum, size and mtime are recorded next to the jar
+    in `<path>.json` so a restart only costs one small API call, or none at all
+    when a version is pinned.
+
+    Parameters
+    -----------
+    session: `aiohttp.ClientSession`
+        The session used for the requests
+    path: `str`
+        Where the jar is stored
+    api: `str`
+        The GitHub releases API of Lavalink, can point to a local stand-in
+    pinned: `Optional[str]`
+        A release tag to stick to, if that version is installed no request is made
+    """
+    def __init__(self, session: ClientSession, *, path: str, api: str, pinned: Optional[str] = None) -> None:
+        self.session = session
+        self.path = path
+        self.api = api.rstrip("/")
+        self.pinned = pinned
+        self.meta_path = f"{path}.json"
+
+    def installed(self) -> Optional[Dict[str, Any]]:
+        """Metadata of the installed jar, `None` if there is none"""
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_intact(self, meta: Dict[str, Any]) -> bool:
+        """Check that the jar on disk is the one described by `meta`"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_size == meta.get("size") and stat.st_mtime_ns == meta.get("mtime_ns"):
+            return True
+        # The file was touched, fall back to the checksum
+        return sha256_file(self.path) == meta.get("sha256")
+
+    async def ensure(self) -> Optional[str]:
+        """
+        Make sure an up to date jar is installed.
+
+        Returns
+        -----------
+        `Optional[str]`
+            - The installed version, `None` if there is no jar and it could not be downloaded
+        """
+        meta = self.installed()
+        intact = meta is not None and await asyncio.to_thread(self._is_intact, meta)
+        if self.pinned and intact and meta["version"] == self.pinned:
+            logging.info(f"Lavalink {self.pinned} is pinned and installed, skipping the update check")
+            return self.pinned
+
+        try:
+            release = await self._fetch_release()
+            asset = next(asset for asset in release["assets"] if asset["name"] == "Lavalink.jar")
+        except (ClientError, asyncio.TimeoutError, KeyError, StopIteration) as e:
+            if intact:
+                logging.warning(f"Cannot check Lavalink releases ({e!r}), using installed {meta['version']}")
+                return meta["version"]
+            logging.error(f"Cannot check Lavalink releases and no jar is installed: {e!r}")
+            return None
+
+        version = release["tag_name"]
+        expected = (asset.get("digest") or "").removeprefix("sha256:") or None
+        if intact and meta["version"] == version and (expected is None or expected == meta["sha256"]):
+            logging.info(f"Lavalink {version} is up to date")
+            return version
+
+        await self._download(asset["browser_download_url"], version=version, expected=expected)
+        return version
+
+    async def _fetch_release(self) -> Dict[str, Any]:
+        url = f"{self.api}/tags/{self.pinned}" if self.pinned else f"{self.api}/latest"
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _download(self, url: str, *, version: str, expected: Optional[str]) -> None:
+        """Stream the jar to a temp file, verify it, then swap it in atomically"""
+        temp_path = f"{self.path}.part"
+        digest = hashlib.sha256()
+        size = 0
+        logging.info(f"Downloading Lavalink {version}...")
+        try:
+            with open(temp_path, "wb") as f:
+                async with self.session.get(url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+            checksum = digest.hexdigest()
+            if expected and checksum != expected:
+                raise ValueError(f"Checksum mismatch for Lavalink {version}: {checksum} != {expected}")
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        stat = os.stat(self.path)
+        meta = {"version": version, "sha256": checksum, "size": size, "mtime_ns": stat.st_mtime_ns}
+        with open(f"{self.meta_path}.part", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{self.meta_path}.part", self.meta_path)
+        logging.info(f"Lavalink {version} downloaded ({size / 1024 ** 2:.1f} MB)")
+
+
+class LavalinkProcess:
+    """
+    Supervisor for a local Lavalink node.
+
+    Runs the jar as an asyncio subprocess, forwards its output to the `lavalink` logger,
+    polls the REST endpoint to know when the node is ready and restarts the node with
+    exponential backoff when it dies.
+
+    Parameters
+    -----------
+    session: `aiohttp.ClientSession`
+        The session used for the readiness probe
+    jar: `str`
+        Path to `Lavalink.jar`
+    uri: `str`
+        The node's uri, e.g. `http://localhost:2333`
+    password: `str`
+        The node's password
+    jvm_options: `List[str]`
+        Extra options for the JVM, e.g. `["-Xmx1G"]`
+    max_backoff: `float`
+        Maximum delay between two restarts in seconds
+    """
+    STABLE_AFTER = 60.0
+
+    def __init__(self, session: ClientSession, *, jar: str, uri: str, password: str,
+                 jvm_options: Optional[List[str]] = None, java: str = "java", max_backoff: float = 60.0) -> None:
+        self.session = session
+        self.jar = jar
+        self.uri = uri.rstrip("/")
+        self.password = password
+        self.jvm_options = jvm_options or []
+        self.java = java
+        self.max_backoff = max_backoff
+        self.restarts: int = 0
+        self.ready = asyncio.Event()
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.logger = logging.getLogger("lavalink")
+
+    @property
+    def supervising(self) -> bool:
+        """Whether the supervisor task is running, it restarts the node when it exits"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start supervising the node in the background"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._supervise(), name="lavalink-supervisor")
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait until the node answers on its REST endpoint, returns `False` on timeout or if it cannot start"""
+        ready = asyncio.create_task(self.ready.wait())
+        waiting = {ready, self._task} if self._task else {ready}
+        await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        ready.cancel()
+        return self.ready.is_set()
+
+    async def wait_external(self, timeout: float) -> bool:
+        """Wait for a node another process supervises, returns `False` on timeout"""
+        try:
+            await asyncio.wait_for(self._probe(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.ready.is_set()
+
+    async def stop(self) -> None:
+        """Stop the node and the supervisor"""
+        self._stopping = True
+        if self._process and self._process.returncode is None:
+            self._process.terminate()
+            try:
+                await asyncio.wait_for(self._process.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                self._process.kill()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.ready.clear()
+
+    async def _supervise(self) -> None:
+        backoff = 1.0
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            try:
+                self._process = await asyncio.create_subprocess_exec(
+                    self.java, *self.jvm_options, "-jar", os.path.basename(self.jar),
+                    cwd=os.path.dirname(os.path.abspath(self.jar)),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
+            except FileNotFoundError as e:
+                logging.error(f"Java is not installed or not in PATH: {e}")
+                return
+            started_at = loop.time()
+            logging.info(f"Started Lavalink (pid {self._process.pid})")
+            probe = asyncio.create_task(self._probe())
+            await self._pipe_logs(self._process)
+            returncode = await self._process.wait()
+            probe.cancel()
+            self.ready.clear()
+            if self._stopping:
+                return
+
+            if loop.time() - started_at > self.STABLE_AFTER:
+                backoff = 1.0
+            logging.error(f"Lavalink exited with code {returncode}, restarting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            self.restarts += 1
+
+    async def _pipe_logs(self, process: asyncio.subprocess.Process) -> None:
+        assert process.stdout is not None
+        async for line in process.stdout:
+            self.logger.info(line.decode(errors="replace").rstrip())
+
+    async def _probe(self, interval: float = 0.5) -> None:
+        """Poll the node's `/version` endpoint until it answers"""
+        while True:
+            try:
+                async with self.session.get(f"{self.uri}/version", headers={"Authorization": self.password}) as response:
+                    if response.status == 200:
+                        logging.info(f"Lavalink {await response.text()} is ready")
+                        self.ready.set()
+                        return
+            except (ClientError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(interval)
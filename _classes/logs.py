@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import gzip, logging, os, queue, re, shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+LOG_DIR = "logs"
+LINE_FORMAT = "%(asctime)s | %(levelname)8s | %(message)s"
+LEGACY_LOG = re.compile(r"furina_\d{8}_\d{6}(_cluster\d+)?\.log")
+
+
+def log_path(cluster_id: Optional[int] = None) -> str:
+    """The current log file of the process, `logs/furina.log` or `logs/furina_cluster<id>.log`"""
+    suffix = f"_cluster{cluster_id}" if cluster_id is not None else ""
+    return os.path.join(LOG_DIR, f"furina{suffix}.log")
+
+
+class LogFormatter(logging.Formatter):
+    """Colored level names for the console, one `logging.Formatter` per level built up front"""
+    grey = '\x1b[38;21m'
+    blue = '\x1b[38;5;39m'
+    yellow = '\x1b[38;5;226m'
+    red = '\x1b[38;5;196m'
+    bold_red = '\x1b[31;1m'
+    reset = '\x1b[0m'
+
+    def __init__(self) -> None:
+        super().__init__(LINE_FORMAT)
+        colors = {
+            logging.DEBUG:    self.grey,
+            logging.INFO:     self.blue,
+            logging.WARNING:  self.yellow,
+            logging.ERROR:    self.red,
+            logging.CRITICAL: self.bold_red,
+        }
+        self.formatters: Dict[int, logging.Formatter] = {
+            level: logging.Formatter(color + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s")
+            for level, color in colors.items()
+        }
+
+    def format(self, record: logging.LogRecord) -> str:
+        formatter = self.formatters.get(record.levelno)
+        return formatter.format(record) if formatter else super().format(record)
+
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """
+    `RotatingFileHandler` that gzips the files it rotates out.
+
+    The current file keeps its name, so `furina.log` is always the latest one and
+    `furina.log.1.gz` ... `furina.log.<backup_count>.gz` are the older ones.
+    """
+    def __init__(self, filename: str, *, max_bytes: int, backup_count: int) -> None:
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+
+    def rotation_filename(self, default_name: str) -> str:
+        return default_name + ".gz"
+
+    def rotate(self, source: str, dest: str) -> None:
+        if not os.path.exists(source):
+            return
+        with open(source, "rb") as plain, gzip.open(dest, "wb") as compressed:
+            shutil.copyfileobj(plain, compressed)
+        os.remove(source)
+
+
+def delete_legacy_logs() -> int:
+    """Delete the per run `furina_<timestamp>.log` files written before the logs were rotated"""
+    removed = 0
+    for filename in os.listdir(LOG_DIR):
+        if LEGACY_LOG.fullmatch(filename):
+            os.remove(os.path.join(LOG_DIR, filename))
+            removed += 1
+    return removed
+
+
+def setup_logging(cluster_id: Optional[int] = None, *, level: int = logging.INFO, max_bytes: int,
+                  backup_count: int) -> QueueListener:
+    """
+    Send every record of the process through a queue to a listener thread doing the I/O.
+
+    The only work left on the event loop is merging the message with its arguments and
+    putting the record on the queue. The listener writes to the console and to the
+    rotating `log_path(cluster_id)`.
+
+    Parameters
+    -----------
+    cluster_id: `Optional[int]`
+        Cluster of the process, `None` for the launcher or a single process bot
+    level: `int`
+        Level of the root logger
+    max_bytes: `int`
+        Size at which the log file is rotated
+    backup_count: `int`
+        Number of compressed old files kept
+
+    Returns
+    -----------
+    `QueueListener`
+        - The started listener, stop it on shutdown to flush the queue
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = GzipRotatingFileHandler(log_path(cluster_id), max_bytes=max_bytes, backup_count=backup_count)
+    file_handler.setFormatter(logging.Formatter(LINE_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(LogFormatter())
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(records, console_handler, file_handler, respect_handler_level=True)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(records))
+    listener.start()
+    return listener
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional
+
+from wavelink import Node, NodeStatus, Pool, StatsResponsePayload
+
+
+def node_penalty(stats: Optional[StatsResponsePayload]) -> float:
+    """
+    Load score of a node, lower is better.
+
+    Follows the penalties Lavalink clients usually use: playing players, an
+    exponential CPU penalty and penalties for deficit and nulled frames.
+    """
+    if stats is None:
+        return 0.0
+    penalty = stats.playing
+    penalty += 1.05 ** (100 * stats.cpu.system_load) * 10 - 10
+    if stats.frames:
+        penalty += 1.03 ** (500 * stats.frames.deficit / 3000) * 600 - 600
+        penalty += (1.03 ** (500 * stats.frames.nulled / 3000) * 300 - 300) * 2
+    return penalty
+
+
+class NodeBalancer:
+    """
+    Keeps the latest stats of every node in `wavelink.Pool` and picks the least loaded one.
+
+    Stats are refreshed by `refresh`, players that were created since the last refresh
+    are counted too so a burst of new players does not all land on the same node.
+    """
+    def __init__(self) -> None:
+        self.stats: Dict[str, StatsResponsePayload] = {}
+
+    @staticmethod
+    def healthy_nodes() -> List[Node]:
+        return [node for node in Pool.nodes.values() if node.status == NodeStatus.CONNECTED]
+
+    def load(self, node: Node) -> float:
+        stats = self.stats.get(node.identifier)
+        # Players created since the last refresh are not in the stats yet
+        unreported = max(len(node.players) - (stats.players if stats else 0), 0)
+        return node_penalty(stats) + unreported
+
+    def best_node(self, *, exclude: Optional[Node] = None) -> Optional[Node]:
+        """The healthy node with the lowest load, `None` if there is none"""
+        nodes = [node for node in self.healthy_nodes() if node is not exclude]
+        return min(nodes, key=self.load, default=None)
+
+    async def refresh(self) -> None:
+        for node in self.healthy_nodes():
+            await self.refresh_node(node)
+
+    async def refresh_node(self, node: Node) -> Optional[float]:
+        """Fetch the stats of `node` now and return its load, `None` if the node did not answer"""
+        try:
+            self.stats[node.identifier] = await node.fetch_stats()
+        except Exception as e:
+            logging.warning(f"Cannot fetch stats of node {node.identifier}: {e}")
+            self.stats.pop(node.identifier, None)
+            return None
+        return self.load(node)
+
+
+balancer = NodeBalancer()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import discord, logging, time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from _classes.player import FurinaPlayer
+from _classes.views import PlayerView
+
+
+class NowPlayingBoard:
+    """
+    One "now playing" control message per guild, edited in place.
+
+    Track changes edit the existing message instead of sending a new one, and `tick`
+    refreshes the progress bars of all playing guilds from one shared loop, the least
+    recently refreshed first and at most `budget` edits per call so a busy bot stays
+    well within the rate limits.
+
+    Parameters
+    -----------
+    view: `PlayerView`
+        The controls attached to every message
+    render: `Callable[[FurinaPlayer], discord.Embed]`
+        Builds the embed of a player
+    budget: `int`
+        Maximum number of edits made by one `tick`
+    """
+    def __init__(self, view: PlayerView, render: Callable[[FurinaPlayer], discord.Embed], *, budget: int) -> None:
+        self.view = view
+        self.render = render
+        self.budget = budget
+        self.messages: Dict[int, discord.Message] = {}
+        self.sent: int = 0
+        self.edited: int = 0
+        self._refreshed: Dict[int, float] = {}
+
+    async def show(self, player: FurinaPlayer, channel: Optional[discord.abc.Messageable]) -> None:
+        """Update the message of `player`, sending it to `channel` if the guild has none yet"""
+        if await self._edit(player) or channel is None:
+            return
+        try:
+            await self.repost(player, channel.send)
+        except discord.HTTPException as e:
+            logging.warning(f"Cannot send the now playing message of guild {player.guild.id}: {e}")
+
+    async def repost(self, player: FurinaPlayer,
+                     send: Callable[..., Awaitable[discord.Message]]) -> discord.Message:
+        """Replace the message of `player` by a new one sent with `send`, e.g. to bring it back to the bottom"""
+        await self.close(player.guild.id)
+        message = await send(embed=self.render(player), view=self.view)
+        self.messages[player.guild.id] = message
+        self._refreshed[player.guild.id] = time.monotonic()
+        self.sent += 1
+        return message
+
+    async def close(self, guild_id: int, *, embed: Optional[discord.Embed] = None) -> None:
+        """Forget the message of `guild_id`, leaving `embed` on it without controls, or deleting it"""
+        message = self.messages.pop(guild_id, None)
+        self._refreshed.pop(guild_id, None)
+        if message is None:
+            return
+        try:
+            if embed:
+                await message.edit(embed=embed, view=None)
+            else:
+                await message.delete()
+        except discord.HTTPException:
+            pass
+
+    async def tick(self, players: Iterable[FurinaPlayer]) -> None:
+        """Refresh the progress bar of up to `budget` playing guilds"""
+        due = [player for player in players
+               if player.guild and player.guild.id in self.messages and player.playing and not player.paused]
+        due.sort(key=lambda player: self._refreshed.get(player.guild.id, 0.0))
+        for player in due[:self.budget]:
+            await self._edit(player)
+
+    async def _edit(self, player: FurinaPlayer) -> bool:
+        message = self.messages.get(player.guild.id)
+        if message is None:
+            return False
+        try:
+            await message.edit(embed=self.render(player), view=self.view)
+        except discord.NotFound:
+            self.messages.pop(player.guild.id, None)
+            return False
+        except discord.HTTPException as e:
+            logging.warning(f"Cannot update the now playing message of guild {player.guild.id}: {e}")
+        self._refreshed[player.guild.id] = time.monotonic()
+        self.edited += 1
+        return True
+
+    def stats(self) -> str:
+        """Short human readable summary of the board"""
+        return f"{len(self.messages)} messages, {self.sent} sent, {self.edited} edits"
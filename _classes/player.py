@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import discord, logging
+from typing import Any, Optional
+from wavelink import AutoPlayMode, Player, Playable, Node
+
+from _classes.nodes import balancer
+from _classes.queue import FurinaQueue
+
+
+class FurinaPlayer(Player):
+    """
+    `wavelink.Player` whose queue is a `FurinaQueue`.
+
+    New players go to the least loaded node of the pool, see `NodeBalancer`.
+    `autoplay` is only a flag here: wavelink's own autoplay, which searches the node
+    for recommendations after every track, stays disabled and the Music cog picks
+    the next track itself, see `Recommender`.
+    Use it as the `cls` when connecting to a voice channel:
+
+    .. code-block:: python
+        player = await channel.connect(cls=FurinaPlayer, self_deaf=True)
+    """
+    def __init__(self, client: discord.Client = discord.utils.MISSING,
+                 channel: discord.abc.Connectable = discord.utils.MISSING,
+                 *, nodes: list[Node] | None = None) -> None:
+        if not nodes and (node := balancer.best_node()):
+            nodes = [node]
+        super().__init__(client, channel, nodes=nodes)
+        self.queue: FurinaQueue = FurinaQueue()
+        self._autoplay_mode: AutoPlayMode = AutoPlayMode.disabled
+        # Track chosen for autoplay while the current one is still playing
+        self.autoplay_next: Optional[Playable] = None
+        # Text channel of the last music command, where the now playing message goes
+        self.home: Optional[discord.abc.Messageable] = None
+
+    @property
+    def autoplay(self) -> AutoPlayMode:
+        return self._autoplay_mode
+
+    @autoplay.setter
+    def autoplay(self, value: Any) -> None:
+        if not isinstance(value, AutoPlayMode):
+            raise ValueError("Please provide a valid 'wavelink.AutoPlayMode' to set.")
+        self._autoplay_mode = value
+        if value is not AutoPlayMode.enabled:
+            self.autoplay_next = None
+
+    async def switch_node(self, node: Node) -> None:
+        """
+        Move this player to another node, keeping the voice connection, queue and position.
+
+        Parameters
+        -----------
+        node: `wavelink.Node`
+            The node to move to
+        """
+        assert self.guild is not None
+        position, paused, current = self.position, self.paused, self.current
+        old = self.node
+        old._players.pop(self.guild.id, None)
+        self._node = node
+        node._players[self.guild.id] = self
+        await self._dispatch_voice_update()
+        if current:
+            await self.play(current, start=position, paused=paused, add_history=False)
+        logging.info(f"Moved player of guild {self.guild.id} from node {old.identifier} to {node.identifier}")
+
+    async def restore_from(self, old: FurinaPlayer, *, position: int) -> None:
+        """
+        Take over the queue and track of a player that was disconnected with its node.
+
+        Parameters
+        -----------
+        old: `FurinaPlayer`
+            The disconnected player
+        position: `int`
+            Where to resume the current track, in milliseconds
+        """
+        self.queue = old.queue
+        self.autoplay = old.autoplay
+        if old.current:
+            await self.play(old.current, start=position, paused=old.paused, add_history=False)
+
+    def snapshot_key(self) -> tuple:
+        """
+        Cheap fingerprint of the state saved by `PlayerSnapshots`, it changes whenever the player is dirty.
+
+        The position is left out, it moves on every tick while playing and only needs
+        the position update `PlayerSnapshots.save` does on its own.
+        """
+        return (
+            id(self.queue), self.queue._items.version, self.queue.mode, self.autoplay, self.paused,
+            self.current.encoded if self.current else None, self.channel.id if self.channel else None
+        )
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json, time
+from asqlite import Pool
+from typing import Iterable, List, Optional, Tuple
+
+from wavelink import Playable, Playlist
+
+
+class SavedPlaylists:
+    """
+    User and guild playlists in the `saved_playlists` table.
+
+    Tracks are stored as their raw Lavalink payload, encoded track included, so loading
+    a playlist rebuilds it locally without asking the node to search or decode anything.
+    A playlist is owned either by a user (`guild = False`) or by a guild (`guild = True`).
+
+    Parameters
+    -----------
+    pool: `asqlite.Pool`
+        The bot's database pool
+    """
+    def __init__(self, pool: Pool) -> None:
+        self.pool = pool
+
+    async def create_table(self) -> None:
+        """Create a `saved_playlists` table in the database"""
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """CREATE TABLE IF NOT EXISTS saved_playlists
+                   ( owner_id   INT  NOT NULL,
+                     guild      INT  NOT NULL DEFAULT 0,
+                     name       TEXT NOT NULL COLLATE NOCASE,
+                     tracks     TEXT NOT NULL,
+                     size       INT  NOT NULL,
+                     updated_at REAL NOT NULL,
+                     PRIMARY KEY ( owner_id, guild, name ) )""")
+
+    async def save(self, owner_id: int, name: str, tracks: Iterable[Playable], *, guild: bool = False) -> int:
+        """
+        Create or overwrite a playlist.
+
+        Returns
+        -----------
+        `int`
+            - Number of tracks saved
+        """
+        payload = [track.raw_data for track in tracks]
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """INSERT INTO saved_playlists ( owner_id, guild, name, tracks, size, updated_at )
+                   VALUES ( ?, ?, ?, ?, ?, ? )
+                   ON CONFLICT( owner_id, guild, name ) DO UPDATE SET
+                   name = excluded.name, tracks = excluded.tracks,
+                   size = excluded.size, updated_at = excluded.updated_at""",
+                (owner_id, int(guild), name, json.dumps(payload), len(payload), time.time())
+            )
+        return len(payload)
+
+    async def load(self, owner_id: int, name: str, *, guild: bool = False) -> Optional[Playlist]:
+        """The playlist `name` rebuilt from its stored tracks, `None` if there is none"""
+        async with self.pool.acquire() as db:
+            async with db.execute(
+                """SELECT name, tracks FROM saved_playlists WHERE owner_id = ? AND guild = ? AND name = ?""",
+                (owner_id, int(guild), name)
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return Playlist({"info": {"name": row["name"], "selectedTrack": -1},
+                         "tracks": json.loads(row["tracks"]), "pluginInfo": {}})
+
+    async def names(self, owner_id: int, *, guild: bool = False) -> List[Tuple[str, int]]:
+        """`(name, size)` of every playlist of the owner, by name"""
+        async with self.pool.acquire() as db:
+            async with db.execute(
+                """SELECT name, size FROM saved_playlists WHERE owner_id = ? AND guild = ? ORDER BY name""",
+                (owner_id, int(guild))
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [(row["name"], row["size"]) for row in rows]
+
+    async def delete(self, owner_id: int, name: str, *, guild: bool = False) -> bool:
+        async with self.pool.acquire() as db:
+            async with db.execute(
+                """DELETE FROM saved_playlists WHERE owner_id = ? AND guild = ? AND name = ?""",
+                (owner_id, int(guild), name)
+            ) as cursor:
+                return cursor.get_cursor().rowcount > 0
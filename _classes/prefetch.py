@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio, logging
+from typing import Dict, Optional
+
+from wavelink import LavalinkLoadException, Playable, Pool
+
+from _classes.actor import ActorRegistry, MailboxFull
+from _classes.cache import TTLCache
+from _classes.player import FurinaPlayer
+
+
+class TrackPrefetcher:
+    """
+    Resolves the next tracks of a queue in the background while the current one plays.
+
+    Each upcoming track is loaded again from its url on the node: tracks that no longer
+    load are dropped from the queue before their turn, through the guild's actor so the
+    drop never interleaves with a music command. Both outcomes are remembered, valid
+    tracks in `validated` and dead ones in `unavailable`, so a track is resolved at most
+    once per `ttl` however often it comes up, e.g. in loop mode. `next_track` pops the
+    next playable track and only resolves it on the spot when neither cache knows it.
+
+    Parameters
+    -----------
+    actors: `ActorRegistry`
+        The actors running the music commands of each guild
+    validated: `TTLCache[bool]`
+        Encoded tracks known to load, shared with the search code that just resolved them
+    depth: `int`
+        How many upcoming tracks are resolved ahead
+    timeout: `float`
+        Time limit of one resolve, a track that times out is kept and played anyway
+    """
+    def __init__(self, actors: ActorRegistry, *, validated: TTLCache[bool], depth: int, timeout: float) -> None:
+        self.actors = actors
+        self.depth = depth
+        self.timeout = timeout
+        self.validated = validated
+        self.unavailable: TTLCache[bool] = TTLCache(maxsize=validated.maxsize, ttl=validated.ttl)
+        self.resolves: int = 0
+        self.dropped: int = 0
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, player: FurinaPlayer) -> None:
+        """Start prefetching the upcoming tracks of `player`, replacing a run that is still going"""
+        if player.guild is None:
+            return
+        guild_id = player.guild.id
+        if (task := self._tasks.get(guild_id)) and not task.done():
+            task.cancel()
+        task = asyncio.create_task(self._prefetch(player, guild_id), name=f"prefetch-{guild_id}")
+        task.add_done_callback(lambda done: self._forget(guild_id, done))
+        self._tasks[guild_id] = task
+
+    def _forget(self, guild_id: int, task: asyncio.Task) -> None:
+        if self._tasks.get(guild_id) is task:
+            del self._tasks[guild_id]
+
+    def cancel_all(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    async def next_track(self, player: FurinaPlayer) -> Optional[Playable]:
+        """
+        Pop the next track to play, skipping the ones that cannot be loaded anymore.
+
+        Runs on the guild's actor, the popped track is already out of the queue.
+
+        Returns
+        -----------
+        `Optional[Playable]`
+            - The track to play, `None` if the queue ran out
+        """
+        # In loop mode `get` keeps returning the same track, do not spin on it
+        for _ in range(len(player.queue) + 1):
+            if player.queue.is_empty:
+                return None
+            track = player.queue.get()
+            if await self._resolve(track):
+                return track
+        return None
+
+    async def _prefetch(self, player: FurinaPlayer, guild_id: int) -> None:
+        ready, index = 0, 0
+        # Dropped tracks shift the queue, keep going until `depth` tracks are ready
+        while ready < self.depth and index < len(player.queue):
+            track = player.queue[index]
+            try:
+                valid = await self._resolve(track)
+            except Exception as e:
+                logging.warning(f"Cannot prefetch {track.identifier}: {e}")
+                valid = True
+            if valid:
+                ready += 1
+                index += 1
+                continue
+            try:
+                dropped = await self.actors.submit(guild_id, self._drop, player, index, track)
+            except MailboxFull:
+                # `next_track` skips it anyway, the negative result is cached
+                return
+            if not dropped:
+                index += 1
+
+    async def _drop(self, player: FurinaPlayer, index: int, track: Playable) -> bool:
+        """Remove `track` from `index` if it is still there, the queue may have changed while resolving"""
+        if index >= len(player.queue) or player.queue[index] is not track:
+            return False
+        player.queue.delete(index)
+        self.dropped += 1
+        return True
+
+    async def _resolve(self, track: Playable) -> bool:
+        """Whether `track` still loads, asking the node only when neither cache knows it"""
+        key = track.encoded
+        if key in self.validated:
+            return True
+        if key in self.unavailable:
+            return False
+        if not track.uri:
+            return True
+        self.resolves += 1
+        try:
+            results = await asyncio.wait_for(Pool.fetch_tracks(track.uri), timeout=self.timeout)
+        except LavalinkLoadException as e:
+            results = []
+            logging.info(f"Track {track.identifier} cannot be loaded anymore: {e.error}")
+        except Exception as e:
+            # The node is slow or unreachable, that says nothing about the track
+            logging.warning(f"Cannot resolve {track.identifier} ahead of time: {e!r}")
+            return True
+
+        if not results:
+            self.unavailable.set(key, True)
+            return False
+        self.validated.set(key, True)
+        return True
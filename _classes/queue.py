@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+import heapq, operator, random, unicodedata
+from collections import defaultdict
+from itertools import chain, islice
+from typing import Iterable, Iterator, Optional, SupportsIndex
+
+from wavelink import Playable, Queue
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip diacritics and collapse whitespace so `"Đàn Ông"` matches `"dan ong"`"""
+    title = unicodedata.normalize("NFKD", title.casefold().replace("đ", "d"))
+    title = "".join(char for char in title if not unicodedata.combining(char))
+    return " ".join(title.split())
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrackIndex:
+    """
+    Identifier and title index of the tracks held by a `TrackList`.
+
+    Keeps the chunks holding each `Playable.identifier`, one entry per queued
+    copy, so membership checks are O(1) and a track is found by scanning one
+    chunk instead of the whole queue, and a trigram index over the normalized
+    titles so substring searches only touch matching tracks.
+
+    A title stays posted in the trigram index after its track leaves, so a track
+    put back (the next round of a loop, a delete and re-insert) is not normalized
+    and indexed again. Those stale postings are skipped by the searches and pruned
+    once there are more than `STALE_LIMIT` of them.
+    """
+    STALE_LIMIT = 256
+
+    def __init__(self) -> None:
+        self._homes: dict[str, list[list[Playable]]] = {}
+        self._tracks: dict[str, Playable] = {}
+        self._titles: dict[str, str] = {}
+        self._order: dict[str, int] = {}
+        self._grams: dict[str, set[str]] = defaultdict(set)
+        self._stale: set[str] = set()
+        self._seq: int = 0
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._homes
+
+    def __len__(self) -> int:
+        return len(self._homes)
+
+    def get(self, identifier: str) -> Optional[Playable]:
+        return self._tracks.get(identifier)
+
+    def homes(self, identifier: str) -> list[list[Playable]]:
+        """The chunks holding a track with this identifier, once per queued copy"""
+        return self._homes.get(identifier, [])
+
+    def add(self, track: Playable, chunk: list[Playable]) -> None:
+        identifier = track.identifier
+        homes = self._homes.get(identifier)
+        if homes:
+            homes.append(chunk)
+            return
+        self._homes[identifier] = [chunk]
+        self._tracks[identifier] = track
+        self._order[identifier] = self._seq
+        self._seq += 1
+        if identifier in self._titles:
+            self._stale.discard(identifier)
+        else:
+            title = normalize_title(track.title)
+            self._titles[identifier] = title
+            for gram in trigrams(title):
+                self._grams[gram].add(identifier)
+
+    def discard(self, track: Playable, chunk: list[Playable]) -> None:
+        identifier = track.identifier
+        homes = self._homes.get(identifier)
+        if not homes:
+            return
+        if len(homes) > 1:
+            self._unhome(homes, chunk)
+            return
+        del self._homes[identifier]
+        del self._tracks[identifier]
+        del self._order[identifier]
+        self._stale.add(identifier)
+        if len(self._stale) > self.STALE_LIMIT:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Drop the titles and postings of the tracks no longer queued"""
+        for identifier in self._stale:
+            for gram in trigrams(self._titles.pop(identifier)):
+                postings = self._grams[gram]
+                postings.discard(identifier)
+                if not postings:
+                    del self._grams[gram]
+        self._stale.clear()
+
+    def moved(self, track: Playable, source: list[Playable], destination: list[Playable]) -> None:
+        """Record that `track` went from the chunk `source` to the chunk `destination`"""
+        if source is not destination:
+            homes = self._homes[track.identifier]
+            self._unhome(homes, source)
+            homes.append(destination)
+
+    @staticmethod
+    def _unhome(homes: list[list[Playable]], chunk: list[Playable]) -> None:
+        # Chunks are compared by identity, two chunks with the same tracks are still different chunks
+        for i, home in enumerate(homes):
+            if home is chunk:
+                del homes[i]
+                return
+
+    def search(self, query: str, limit: int = 25) -> list[Playable]:
+        """
+        Find up to `limit` tracks whose title contains `query`, in the order they were queued.
+
+        Parameters
+        -----------
+        query: `str`
+            Text to look for, matched against the normalized titles
+        limit: `int`
+            Maximum number of tracks returned
+        """
+        query = normalize_title(query)
+        postings = sorted((self._grams.get(gram, set()) for gram in trigrams(query)), key=len)
+        if not postings or len(postings[0]) * 4 > len(self._homes):
+            # Short or very common queries match densely, so an ordered scan exits early
+            matches = (identifier for identifier in self._order if query in self._titles[identifier])
+            return [self._tracks[identifier] for identifier in islice(matches, limit)]
+
+        candidates = postings[0].intersection(*postings[1:])
+        matches = [identifier for identifier in candidates
+                   if identifier in self._homes and query in self._titles[identifier]]
+        return [self._tracks[identifier] for identifier in heapq.nsmallest(limit, matches, key=self._order.get)]
+
+    def matching(self, query: str) -> set[str]:
+        """Identifiers of every track whose normalized title contains `query`, already normalized"""
+        postings = sorted((self._grams.get(gram, set()) for gram in trigrams(query)), key=len)
+        if not postings:
+            return {identifier for identifier in self._homes if query in self._titles[identifier]}
+        candidates = postings[0].intersection(*postings[1:])
+        return {identifier for identifier in candidates
+                if identifier in self._homes and query in self._titles[identifier]}
+
+    def rebuild(self, chunks: Iterable[list[Playable]]) -> None:
+        self.clear()
+        for chunk in chunks:
+            for track in chunk:
+                self.add(track, chunk)
+
+    def clear(self) -> None:
+        self._homes.clear()
+        self._tracks.clear()
+        self._titles.clear()
+        self._order.clear()
+        self._grams.clear()
+        self._stale.clear()
+
+
+class TrackList:
+    """
+    A chunked list of `Playable` that keeps a `TrackIndex` in sync on every mutation.
+
+    `wavelink.Queue` stores its tracks in `Queue._items` and only uses the regular list
+    methods on it, so swapping the list keeps every queue operation indexed. Tracks are
+    kept in chunks of about `LOAD` items with a Fenwick tree over the chunk lengths:
+    finding a position costs O(log n) and inserting or removing there only shifts one
+    chunk, instead of the whole queue like a flat `list` does. The index knows which
+    chunks hold an identifier, so finding a given track scans one chunk, not the queue.
+
+    Each operation pays a few microseconds of bookkeeping in Python, which a flat list
+    shifting its items in C does not: below a few tens of thousands of tracks a flat
+    list is as fast or faster at positional operations, past that this pulls ahead.
+    """
+    LOAD = 1024
+
+    def __init__(self, iterable: Iterable[Playable] = ()) -> None:
+        self.lookup = TrackIndex()
+        self._chunks: list[list[Playable]] = []
+        self._tree: list[int] = [0]
+        self._positions: dict[int, int] = {}
+        self._len: int = 0
+        self._load(list(iterable))
+        # Bumped on every mutation so snapshots can tell whether the queue changed
+        self.version: int = 0
+
+    def _load(self, tracks: list[Playable]) -> None:
+        """Replace the content with `tracks`, rebuilding chunks and index"""
+        self._chunks = [tracks[i:i + self.LOAD] for i in range(0, len(tracks), self.LOAD)]
+        self._len = len(tracks)
+        self._rebuild_tree()
+        self.lookup.rebuild(self._chunks)
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] + [len(chunk) for chunk in self._chunks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._positions = {id(chunk): i for i, chunk in enumerate(self._chunks)}
+
+    def _prefix(self, chunk: int) -> int:
+        """Number of tracks in the chunks before `chunk`"""
+        total = 0
+        while chunk:
+            total += self._tree[chunk]
+            chunk -= chunk & -chunk
+        return total
+
+    def _update(self, chunk: int, delta: int) -> None:
+        tree = self._tree
+        size = len(tree)
+        i = chunk + 1
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """Chunk and offset of a non-negative `index` below `len(self)`"""
+        # The head and the tail of the queue are where playback and appends happen
+        first = len(self._chunks[0])
+        if index < first:
+            return 0, index
+        last = self._len - len(self._chunks[-1])
+        if index >= last:
+            return len(self._chunks) - 1, index - last
+        tree = self._tree
+        size = len(tree)
+        pos, step = 0, 1 << (size - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < size and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return pos, index
+
+    def _normalize(self, index: SupportsIndex) -> int:
+        index = operator.index(index)
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("list index out of range")
+        return index
+
+    def _shrink(self, chunk: int, delta: int) -> None:
+        self._len += delta
+        if self._chunks[chunk]:
+            self._update(chunk, delta)
+        else:
+            del self._chunks[chunk]
+            self._rebuild_tree()
+
+    def _grow(self, chunk: int, delta: int) -> None:
+        self._len += delta
+        items = self._chunks[chunk]
+        if len(items) > 2 * self.LOAD:
+            # The first part stays in the same list, only the tracks split off change chunk
+            parts = [items[i:i + self.LOAD] for i in range(self.LOAD, len(items), self.LOAD)]
+            del items[self.LOAD:]
+            for part in parts:
+                for track in part:
+                    self.lookup.moved(track, items, part)
+            self._chunks[chunk + 1:chunk + 1] = parts
+            self._rebuild_tree()
+        else:
+            self._update(chunk, delta)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[Playable]:
+        return chain.from_iterable(self._chunks)
+
+    def __reversed__(self) -> Iterator[Playable]:
+        return (track for chunk in reversed(self._chunks) for track in reversed(chunk))
+
+    def __contains__(self, track: object) -> bool:
+        # `Playable.__eq__` matches on the encoded track or the identifier, the index covers both
+        return isinstance(track, Playable) and track.identifier in self.lookup
+
+    def __repr__(self) -> str:
+        return f"TrackList({list(self)!r})"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        chunk, offset = self._locate(self._normalize(index))
+        return self._chunks[chunk][offset]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            tracks = list(self)
+            tracks[index] = value
+            self._load(tracks)
+        else:
+            chunk, offset = self._locate(self._normalize(index))
+            items = self._chunks[chunk]
+            self.lookup.discard(items[offset], items)
+            items[offset] = value
+            self.lookup.add(value, items)
+        self.version += 1
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            tracks = list(self)
+            del tracks[index]
+            self._load(tracks)
+            self.version += 1
+        else:
+            self.pop(index)
+
+    def __iadd__(self, tracks: Iterable[Playable]) -> TrackList:
+        self.extend(tracks)
+        return self
+
+    def append(self, track: Playable) -> None:
+        self.insert(self._len, track)
+
+    def extend(self, tracks: Iterable[Playable]) -> None:
+        tracks = list(tracks)
+        if not tracks:
+            return
+        if not self._chunks:
+            self._chunks.append([])
+            self._rebuild_tree()
+        items = self._chunks[-1]
+        items.extend(tracks)
+        for track in tracks:
+            self.lookup.add(track, items)
+        self._grow(len(self._chunks) - 1, len(tracks))
+        self.version += 1
+
+    def insert(self, index: SupportsIndex, track: Playable) -> None:
+        self._insert(index, track)
+        self.version += 1
+
+    def pop(self, index: SupportsIndex = -1) -> Playable:
+        track, chunk = self._pop(index)
+        self.lookup.discard(track, chunk)
+        self.version += 1
+        return track
+
+    def _insert(self, index: SupportsIndex, track: Playable, source: Optional[list[Playable]] = None) -> None:
+        """Insert `track` at `index`, moving it from the chunk `source` or adding it to the index"""
+        index = operator.index(index)
+        if index < 0:
+            index = max(index + self._len, 0)
+        index = min(index, self._len)
+        if not self._chunks:
+            self._chunks.append([])
+            self._rebuild_tree()
+        if index == self._len:
+            chunk, offset = len(self._chunks) - 1, len(self._chunks[-1])
+        else:
+            chunk, offset = self._locate(index)
+        items = self._chunks[chunk]
+        items.insert(offset, track)
+        if source is None:
+            self.lookup.add(track, items)
+        else:
+            self.lookup.moved(track, source, items)
+        self._grow(chunk, 1)
+
+    def _pop(self, index: SupportsIndex) -> tuple[Playable, list[Playable]]:
+        """Take the track at `index` out of its chunk, the index is left to the caller"""
+        if not self._len:
+            raise IndexError("pop from empty list")
+        chunk, offset = self._locate(self._normalize(index))
+        items = self._chunks[chunk]
+        track = items.pop(offset)
+        self._shrink(chunk, -1)
+        return track, items
+
+    def find(self, identifier: str, start: int = 0, stop: Optional[int] = None) -> int:
+        """
+        Position of the first track with this identifier in `[start, stop)`, or -1.
+
+        Only the chunks holding the identifier are scanned, their position
+        comes from the prefix sums of the Fenwick tree.
+        """
+        start, stop, _ = slice(start, stop).indices(self._len)
+        found = -1
+        for items in sorted(self.lookup.homes(identifier), key=lambda home: self._positions[id(home)]):
+            base = self._prefix(self._positions[id(items)])
+            if base >= stop:
+                break
+            for offset, track in enumerate(items):
+                if track.identifier == identifier and start <= base + offset < stop:
+                    found = base + offset
+                    break
+            if found >= 0:
+                break
+        return found
+
+    def index(self, track: Playable, start: int = 0, stop: Optional[int] = None) -> int:
+        # `Playable.__eq__` matches on the encoded track or the identifier, same identifier is enough here
+        index = self.find(track.identifier, start, stop) if isinstance(track, Playable) else -1
+        if index < 0:
+            raise ValueError(f"{track!r} is not in list")
+        return index
+
+    def remove(self, track: Playable) -> None:
+        # Compares like `list.remove`, the stored object is the one discarded from the index
+        self.pop(self.index(track))
+
+    def move(self, source: SupportsIndex, destination: SupportsIndex) -> Playable:
+        """Move the track at `source` so it ends up at `destination`"""
+        track, chunk = self._pop(source)
+        self._insert(destination, track, chunk)
+        self.version += 1
+        return track
+
+    def shuffle(self, start: int = 0, stop: Optional[int] = None) -> None:
+        """Shuffle the tracks in `[start, stop)` in place, only the chunks holding that range are touched"""
+        start, stop, _ = slice(start, stop).indices(self._len)
+        if stop - start < 2:
+            return
+        chunk, offset = self._locate(start)
+        spans: list[tuple[list[Playable], int, int]] = []
+        remaining = stop - start
+        while remaining:
+            items = self._chunks[chunk]
+            end = min(len(items), offset + remaining)
+            spans.append((items, offset, end))
+            remaining -= end - offset
+            chunk, offset = chunk + 1, 0
+        if len(spans) == 1:
+            items, begin, end = spans[0]
+            tracks = items[begin:end]
+            random.shuffle(tracks)
+            items[begin:end] = tracks
+            self.version += 1
+            return
+        # Tracks can land in another chunk of the range, so they carry the chunk they come from
+        tracks = [(track, items) for items, begin, end in spans for track in items[begin:end]]
+        random.shuffle(tracks)
+        position = 0
+        for items, begin, end in spans:
+            moved = tracks[position:position + end - begin]
+            items[begin:end] = [track for track, _ in moved]
+            for track, source in moved:
+                if source is not items:
+                    self.lookup.moved(track, source, items)
+            position += end - begin
+        self.version += 1
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._rebuild_tree()
+        self._len = 0
+        self.lookup.clear()
+        self.version += 1
+
+    def copy(self) -> list[Playable]:
+        return list(self)
+
+
+class FurinaQueue(Queue):
+    """
+    `wavelink.Queue` with an identifier index for O(1) duplicate checks.
+
+    Every put, get, remove and clear goes through `TrackList`, so the index
+    never drifts from the queue content, and positional operations such as
+    `delete`, `put_at`, `move` and `shuffle` only touch one chunk of it.
+    """
+    def __init__(self, *, history: bool = True) -> None:
+        super().__init__(history=history)
+        self._items: TrackList = TrackList()
+
+    def has(self, track: Playable) -> bool:
+        """Whether a track with the same identifier is already in the queue"""
+        return track.identifier in self._items.lookup
+
+    def moved(self, track: Playable, source: list[Playable], destination: list[Playable]) -> None:
+        """Record that `track` went from the chunk `source` to the chunk `destination`"""
+        if source is not destination:
+            homes = self._homes[track.identifier]
+            self._unhome(homes, source)
+            homes.append(destination)
+
+    @staticmethod
+    def _unhome(homes: list[list[Playable]], chunk: list[Playable]) -> None:
+        # Chunks are compared by identity, two chunks with the same tracks are still different chunks
+        for i, home in enumerate(homes):
+            if home is chunk:
+                del homes[i]
+                return
+
+    def search(self, query: str, limit: int = 25) -> list[Playable]:
+        """Find up to `limit` queued tracks whose title contains `query`"""
+        return self._items.lookup.search(query, limit)
+
+    def matching(self, query: str) -> set[str]:
+        """Identifiers of the queued tracks whose title contains `query`, already normalized"""
+        return self._items.lookup.matching(query)
+
+    def remove_identifier(self, identifier: str) -> Optional[Playable]:
+        """Remove the first queued track with this identifier and return it, if any"""
+        index = self._items.find(identifier)
+        return self._items.pop(index) if index >= 0 else None
+
+    def move(self, source: int, destination: int) -> Playable:
+        """Move the track at position `source` to position `destination` and return it"""
+        track = self._items.move(source, destination)
+        self._wakeup_next()
+        return track
+
+    def shuffle(self, start: int = 0, stop: Optional[int] = None) -> None:
+        """Shuffle the whole queue, or only the tracks in `[start, stop)`"""
+        self._items.shuffle(start, stop)
+
+    def copy(self) -> FurinaQueue:
+        copy_queue = FurinaQueue(history=self.history is not None)
+        copy_queue._items = TrackList(self._items)
+        return copy_queue
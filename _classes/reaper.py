@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio, logging, math
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+from wavelink import Node
+
+from _classes.nodes import balancer
+from _classes.player import FurinaPlayer
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: many timeouts driven by a single task.
+
+    Timers are put in the slot they expire in, each tick only looks at one slot, so
+    scheduling and cancelling are O(1) whatever the number of timers. Timers longer
+    than one turn of the wheel wait for the extra rounds in their slot.
+
+    Parameters
+    -----------
+    tick: `float`
+        Resolution of the wheel in seconds
+    slots: `int`
+        Number of slots, one turn of the wheel lasts `tick * slots` seconds
+    """
+    def __init__(self, *, tick: float = 1.0, slots: int = 512) -> None:
+        self.tick = tick
+        self._slots: List[Dict[Hashable, list]] = [{} for _ in range(slots)]
+        self._where: Dict[Hashable, int] = {}
+        self._cursor: int = 0
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, delay: float, callback: Callback) -> None:
+        """Run `callback` in about `delay` seconds, replacing the timer of `key` if there is one"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][key] = [(ticks - 1) // len(self._slots), callback]
+        self._where[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="timer-wheel")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for slot in self._slots:
+            slot.clear()
+        self._where.clear()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+            self.advance()
+
+    def advance(self) -> None:
+        """Move to the next slot and fire the timers that expire there"""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        expired: List[Callback] = []
+        for key, entry in list(bucket.items()):
+            if entry[0]:
+                entry[0] -= 1
+                continue
+            del bucket[key]
+            del self._where[key]
+            expired.append(entry[1])
+        for callback in expired:
+            task = asyncio.create_task(self._fire(callback))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _fire(callback: Callback) -> None:
+        try:
+            await callback()
+        except Exception as e:
+            logging.error(f"Timer callback failed: {e!r}")
+
+
+class IdleReaper:
+    """
+    Frees the players nobody uses anymore.
+
+    A player that plays to an empty channel is paused after `pause_after` seconds, a
+    player that is paused or has nothing to play is handed to `park` after
+    `disconnect_after` seconds. `touch` re-evaluates a player and must be called
+    whenever its state may have changed, the timers of every guild live in one `TimerWheel`.
+    The stats of the node are fetched right before and after each pause or disconnect,
+    the drop of its `NodeBalancer.load` is the load the reaper freed on that node.
+
+    Parameters
+    -----------
+    wheel: `TimerWheel`
+        The wheel holding the timers
+    pause_after: `float`
+        Seconds of playing without listeners before pausing
+    disconnect_after: `float`
+        Seconds of being paused or stopped before disconnecting
+    park: `Callable[[FurinaPlayer], Awaitable[bool]]`
+        Saves and disconnects a player, returns whether it did
+    """
+    def __init__(self, wheel: TimerWheel, *, pause_after: float, disconnect_after: float,
+                 park: Callable[[FurinaPlayer], Awaitable[bool]]) -> None:
+        self.wheel = wheel
+        self.pause_after = pause_after
+        self.disconnect_after = disconnect_after
+        self.park = park
+        self.paused: int = 0
+        self.reaped: int = 0
+        self.paused_by_node: Counter[str] = Counter()
+        self.reaped_by_node: Counter[str] = Counter()
+        # Node identifier -> sum of `NodeBalancer.load` before minus after each pause and disconnect
+        self.load_freed: Counter[str] = Counter()
+        self._stages: Dict[int, str] = {}
+
+    @staticmethod
+    def has_listeners(player: FurinaPlayer) -> bool:
+        return bool(player.channel) and any(not member.bot for member in player.channel.members)
+
+    def touch(self, player: FurinaPlayer) -> None:
+        """Arm, keep or cancel the idle timer of `player` according to its current state"""
+        if not player.guild:
+            return
+        guild_id = player.guild.id
+        if not player.connected or player.guild.voice_client is not player:
+            stage = None
+        elif player.playing and not player.paused:
+            stage = None if self.has_listeners(player) else "pause"
+        else:
+            stage = "disconnect"
+
+        if stage is None:
+            self.forget(guild_id)
+        elif self._stages.get(guild_id) != stage or guild_id not in self.wheel:
+            # The same stage keeps its deadline, touching does not postpone it
+            self._stages[guild_id] = stage
+            if stage == "pause":
+                self.wheel.schedule(guild_id, self.pause_after, lambda: self._pause(player))
+            else:
+                self.wheel.schedule(guild_id, self.disconnect_after, lambda: self._reap(player))
+
+    def forget(self, guild_id: int) -> None:
+        self._stages.pop(guild_id, None)
+        self.wheel.cancel(guild_id)
+
+    async def _pause(self, player: FurinaPlayer) -> None:
+        self._stages.pop(player.guild.id, None)
+        if player.connected and player.playing and not player.paused and not self.has_listeners(player):
+            node = player.node
+            before = await balancer.refresh_node(node)
+            await player.pause(True)
+            self.paused += 1
+            self.paused_by_node[node.identifier] += 1
+            freed = await self._record_load(node, before)
+            logging.info(f"Paused idle player of guild {player.guild.id}, node {node.identifier} load {-freed:+.1f}")
+        self.touch(player)
+
+    async def _reap(self, player: FurinaPlayer) -> None:
+        self._stages.pop(player.guild.id, None)
+        idle = player.connected and player.guild.voice_client is player and (player.paused or not player.playing)
+        if not idle:
+            return self.touch(player)
+        node = player.node
+        before = await balancer.refresh_node(node)
+        if await self.park(player):
+            self.reaped += 1
+            self.reaped_by_node[node.identifier] += 1
+            freed = await self._record_load(node, before)
+            logging.info(f"Disconnected idle player of guild {player.guild.id} from node {node.identifier}, "
+                         f"load {-freed:+.1f}")
+        else:
+            self.touch(player)
+
+    async def _record_load(self, node: Node, before: Optional[float]) -> float:
+        """Add how much the load of `node` dropped since `before` to `load_freed` and return it"""
+        after = await balancer.refresh_node(node)
+        if before is None or after is None:
+            return 0.0
+        self.load_freed[node.identifier] += before - after
+        return before - after
+
+    def stats(self) -> str:
+        """Short human readable summary of the reaper"""
+        nodes = ", ".join(
+            f"{node}: load {-self.load_freed[node]:+.1f} ({self.paused_by_node[node]} paused, "
+            f"{self.reaped_by_node[node]} disconnected)"
+            for node in sorted(self.paused_by_node.keys() | self.reaped_by_node.keys())
+        ) or "none"
+        return f"{len(self.wheel)} timers, {self.paused} paused, {self.reaped} disconnected, by node: {nodes}"
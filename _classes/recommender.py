@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, Optional
+
+from wavelink import Playable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class CoOccurrenceModel:
+    """
+    Track-to-track co-occurrence counts learned from what one guild plays.
+
+    Every played track is linked to the `window` tracks played right before it,
+    with a weight of `1 / distance`. The matrix is kept sparse as one dict per row,
+    scoring gathers the rows of the recent tracks into flat arrays and sums them
+    with `numpy.bincount`.
+
+    Parameters
+    -----------
+    window: `int`
+        How many previous tracks a play is linked to
+    recent: `int`
+        How many recent plays are never recommended again
+    max_tracks: `int`
+        Size of the vocabulary, the least played half is dropped when it is full
+    """
+    def __init__(self, *, window: int = 3, recent: int = 50, max_tracks: int = 5000) -> None:
+        self.window = window
+        self.max_tracks = max_tracks
+        self.index: Dict[str, int] = {}
+        self.tracks: List[Playable] = []
+        self.plays: List[int] = []
+        self.rows: List[Dict[int, float]] = []
+        self.recent: Deque[int] = deque(maxlen=max(recent, window))
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def _intern(self, track: Playable) -> int:
+        i = self.index.get(track.identifier)
+        if i is None:
+            if len(self.tracks) >= self.max_tracks:
+                self._prune()
+            i = self.index[track.identifier] = len(self.tracks)
+            self.tracks.append(track)
+            self.plays.append(0)
+            self.rows.append({})
+        return i
+
+    def _prune(self) -> None:
+        """Keep the most played half of the vocabulary and renumber it"""
+        import numpy as np
+        keep = sorted(np.argsort(self.plays, kind="stable")[len(self.plays) // 2:].tolist())
+        remap = {old: new for new, old in enumerate(keep)}
+        self.tracks = [self.tracks[i] for i in keep]
+        self.plays = [self.plays[i] for i in keep]
+        self.rows = [{remap[j]: w for j, w in self.rows[i].items() if j in remap} for i in keep]
+        self.index = {track.identifier: i for i, track in enumerate(self.tracks)}
+        self.recent = deque((remap[i] for i in self.recent if i in remap), maxlen=self.recent.maxlen)
+
+    def record(self, track: Playable) -> None:
+        """Learn one play, linking `track` to the tracks played just before it"""
+        i = self._intern(track)
+        previous = list(self.recent)[-self.window:]
+        for distance, j in enumerate(reversed(previous), 1):
+            if j == i:
+                continue
+            weight = 1.0 / distance
+            self.rows[i][j] = self.rows[i].get(j, 0.0) + weight
+            self.rows[j][i] = self.rows[j].get(i, 0.0) + weight
+        self.plays[i] += 1
+        self.recent.append(i)
+
+    def scores(self) -> np.ndarray:
+        """Score of every known track given the last `window` plays"""
+        # numpy is only imported once autoplay first needs it
+        import numpy as np
+        context = list(self.recent)[-self.window:]
+        cols, vals = [], []
+        for distance, j in enumerate(reversed(context), 1):
+            row = self.rows[j]
+            if row:
+                cols.append(np.fromiter(row.keys(), dtype=np.intp, count=len(row)))
+                vals.append(np.fromiter(row.values(), dtype=np.float64, count=len(row)) / distance)
+        if not cols:
+            return np.zeros(len(self.tracks))
+        return np.bincount(np.concatenate(cols), weights=np.concatenate(vals), minlength=len(self.tracks))
+
+    def recommend(self, exclude: Iterable[str] = ()) -> Optional[Playable]:
+        """
+        The best next track, `None` if the model knows nothing related to what was just played.
+
+        Parameters
+        -----------
+        exclude: `Iterable[str]`
+            Identifiers that must not be picked, e.g. the queued tracks
+        """
+        if not self.recent:
+            return None
+        import numpy as np
+        scores = self.scores()
+        banned = [self.index[identifier] for identifier in exclude if identifier in self.index]
+        banned.extend(self.recent)
+        scores[np.asarray(banned, dtype=np.intp)] = 0.0
+        # Break ties between equally related tracks with how often they were played
+        scores += (scores > 0) * np.asarray(self.plays, dtype=np.float64) * 1e-6
+        best = int(np.argmax(scores))
+        return self.tracks[best] if scores[best] > 0 else None
+
+
+class Recommender:
+    """
+    One `CoOccurrenceModel` per guild, updated after every play and queried by autoplay.
+
+    Parameters
+    -----------
+    kwargs:
+        Passed to every `CoOccurrenceModel`
+    """
+    def __init__(self, **kwargs) -> None:
+        self.kwargs = kwargs
+        self.models: Dict[int, CoOccurrenceModel] = {}
+
+    def model(self, guild_id: int) -> CoOccurrenceModel:
+        model = self.models.get(guild_id)
+        if model is None:
+            model = self.models[guild_id] = CoOccurrenceModel(**self.kwargs)
+        return model
+
+    def record(self, guild_id: int, track: Playable) -> None:
+        self.model(guild_id).record(track)
+
+    def recommend(self, guild_id: int, exclude: Iterable[str] = ()) -> Optional[Playable]:
+        model = self.models.get(guild_id)
+        return model.recommend(exclude) if model else None
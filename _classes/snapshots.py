@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json, logging, time
+from asqlite import Pool
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from wavelink import AutoPlayMode, Playable, QueueMode
+
+from _classes.player import FurinaPlayer
+
+
+class PlayerSnapshots:
+    """
+    Persists the state of every `FurinaPlayer` in the `player_snapshots` table.
+
+    Tracks are stored as their raw Lavalink payload, encoded track included, so they
+    can be rebuilt with `Playable(data)` without searching again.
+    Only players whose `FurinaPlayer.snapshot_key` changed since the last save are written.
+    A player whose only change is its position, past another `POSITION_STEP` milliseconds,
+    gets that position updated without serializing the queue again.
+    Players disconnected for being idle are kept as parked snapshots, they are not
+    restored on startup but can be resumed on demand.
+
+    Parameters
+    -----------
+    pool: `asqlite.Pool`
+        The bot's database pool
+    """
+    POSITION_STEP = 10_000
+
+    def __init__(self, pool: Pool) -> None:
+        self.pool = pool
+        # Guild id -> (snapshot key, position bucket) of the last write
+        self._saved: Dict[int, Tuple[tuple, int]] = {}
+
+    async def create_table(self) -> None:
+        """Create a `player_snapshots` table in the database"""
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """CREATE TABLE IF NOT EXISTS player_snapshots
+                   ( guild_id   INT  NOT NULL PRIMARY KEY,
+                     channel_id INT  NOT NULL,
+                     current    TEXT,
+                     position   INT  NOT NULL DEFAULT 0,
+                     paused     INT  NOT NULL DEFAULT 0,
+                     queue      TEXT NOT NULL,
+                     mode       INT  NOT NULL DEFAULT 0,
+                     autoplay   INT  NOT NULL DEFAULT 2,
+                     updated_at REAL NOT NULL,
+                     parked     INT  NOT NULL DEFAULT 0 )""")
+            # Tables created before parked snapshots existed
+            async with db.execute("""PRAGMA table_info(player_snapshots)""") as cursor:
+                columns = {row["name"] for row in await cursor.fetchall()}
+            if "parked" not in columns:
+                await db.execute("""ALTER TABLE player_snapshots ADD COLUMN parked INT NOT NULL DEFAULT 0""")
+
+    @staticmethod
+    def _row(player: FurinaPlayer, *, parked: bool = False) -> tuple:
+        current = json.dumps(player.current.raw_data) if player.current else None
+        queue = json.dumps([track.raw_data for track in player.queue])
+        return (player.guild.id, player.channel.id, current, player.position, int(player.paused),
+                queue, player.queue.mode.value, player.autoplay.value, time.time(), int(parked))
+
+    @staticmethod
+    def _snapshot(row) -> Dict[str, Any]:
+        return {
+            "guild_id": row["guild_id"],
+            "channel_id": row["channel_id"],
+            "current": Playable(json.loads(row["current"])) if row["current"] else None,
+            "position": row["position"],
+            "paused": bool(row["paused"]),
+            "queue": [Playable(data) for data in json.loads(row["queue"])],
+            "mode": QueueMode(row["mode"]),
+            "autoplay": AutoPlayMode(row["autoplay"]),
+        }
+
+    async def _upsert(self, db, rows: List[tuple]) -> None:
+        await db.executemany(
+            """INSERT INTO player_snapshots
+               ( guild_id, channel_id, current, position, paused, queue, mode, autoplay, updated_at, parked )
+               VALUES ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )
+               ON CONFLICT(guild_id) DO UPDATE SET
+               channel_id = excluded.channel_id, current = excluded.current,
+               position = excluded.position, paused = excluded.paused, queue = excluded.queue,
+               mode = excluded.mode, autoplay = excluded.autoplay, updated_at = excluded.updated_at,
+               parked = excluded.parked""",
+            rows
+        )
+
+    async def save(self, players: Iterable[FurinaPlayer], *, force: bool = False, prune: bool = True) -> int:
+        """
+        Write the players that changed since the last save.
+
+        Parameters
+        -----------
+        players: `Iterable[FurinaPlayer]`
+            All the connected players
+        force: `bool`
+            Write every player even if it did not change, e.g. on shutdown to keep the exact positions
+        prune: `bool`
+            Delete the snapshots of guilds that no longer have a player
+
+        Returns
+        -----------
+        `int`
+            - Number of players written, position only updates included
+        """
+        rows: List[tuple] = []
+        positions: List[tuple] = []
+        keys: Dict[int, Tuple[tuple, int]] = {}
+        alive: set[int] = set()
+        now = time.time()
+        for player in players:
+            if not player.guild or not player.channel:
+                continue
+            guild_id = player.guild.id
+            alive.add(guild_id)
+            key = (player.snapshot_key(), player.position // self.POSITION_STEP)
+            saved = self._saved.get(guild_id)
+            if force or saved is None or saved[0] != key[0]:
+                rows.append(self._row(player))
+            elif saved[1] != key[1]:
+                positions.append((player.position, now, guild_id))
+            else:
+                continue
+            keys[guild_id] = key
+        gone = [(guild_id,) for guild_id in self._saved if guild_id not in alive] if prune else []
+        if not rows and not positions and not gone:
+            return 0
+
+        async with self.pool.acquire() as db:
+            async with db.transaction():
+                if rows:
+                    await self._upsert(db, rows)
+                if positions:
+                    await db.executemany(
+                        """UPDATE player_snapshots SET position = ?, updated_at = ? WHERE guild_id = ?""", positions
+                    )
+                if gone:
+                    await db.executemany("""DELETE FROM player_snapshots WHERE guild_id = ?""", gone)
+        self._saved.update(keys)
+        for (guild_id,) in gone:
+            self._saved.pop(guild_id, None)
+        return len(rows) + len(positions)
+
+    async def park(self, player: FurinaPlayer) -> None:
+        """Save `player` as parked, right before it is disconnected for being idle"""
+        async with self.pool.acquire() as db:
+            await self._upsert(db, [self._row(player, parked=True)])
+        # Not a live player anymore, so the next `save` must not prune it
+        self._saved.pop(player.guild.id, None)
+
+    async def load_all(self) -> List[Dict[str, Any]]:
+        """Every snapshot of a live player, with the tracks already rebuilt"""
+        async with self.pool.acquire() as db:
+            async with db.execute("""SELECT * FROM player_snapshots WHERE parked = 0""") as cursor:
+                rows = await cursor.fetchall()
+        snapshots = []
+        for row in rows:
+            try:
+                snapshots.append(self._snapshot(row))
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Ignoring a corrupted player snapshot for guild {row['guild_id']}: {e}")
+        return snapshots
+
+    async def load_parked(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """The parked snapshot of `guild_id`, `None` if there is none"""
+        async with self.pool.acquire() as db:
+            async with db.execute(
+                """SELECT * FROM player_snapshots WHERE guild_id = ? AND parked = 1""", (guild_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        try:
+            return self._snapshot(row)
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring a corrupted player snapshot for guild {guild_id}: {e}")
+            return None
+
+    async def delete(self, guild_id: int) -> None:
+        async with self.pool.acquire() as db:
+            await db.execute("""DELETE FROM player_snapshots WHERE guild_id = ?""", (guild_id,))
+        self._saved.pop(guild_id, None)
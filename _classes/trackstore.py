@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json, logging, time
+from asqlite import Pool
+from collections import Counter
+from typing import List, Optional
+
+from wavelink import Playable
+
+
+class TrackStore:
+    """
+    Persistent map from a normalized query or url to the tracks the node resolved it to.
+
+    Tracks are stored as their raw Lavalink payload, so a hit rebuilds them with
+    `Playable(data)` without any search round-trip. Usage counts are buffered in
+    memory and written on `flush`. The table never holds more than `max_entries`
+    rows: a `put` over the limit drops the least used and least recently used
+    entries in the same transaction, and every `EVICT_EVERY` puts the counts are
+    flushed and expired entries deleted as well.
+
+    Parameters
+    -----------
+    pool: `asqlite.Pool`
+        The bot's database pool
+    max_entries: `int`
+        Maximum number of rows kept in the table
+    ttl: `float`
+        Lifetime of an entry in seconds
+    """
+    EVICT_EVERY = 100
+
+    def __init__(self, pool: Pool, *, max_entries: int, ttl: float) -> None:
+        self.pool = pool
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._uses: Counter[str] = Counter()
+        self._puts: int = 0
+
+    async def create_table(self) -> None:
+        """Create a `resolved_tracks` table in the database"""
+        async with self.pool.acquire() as db:
+            await db.execute(
+                """CREATE TABLE IF NOT EXISTS resolved_tracks
+                   ( key        TEXT NOT NULL PRIMARY KEY,
+                     payload    TEXT NOT NULL,
+                     uses       INT  NOT NULL DEFAULT 0,
+                     last_used  REAL NOT NULL,
+                     expires_at REAL NOT NULL )""")
+            await db.execute(
+                """CREATE INDEX IF NOT EXISTS resolved_tracks_eviction
+                   ON resolved_tracks ( uses, last_used )""")
+
+    async def get(self, key: str) -> Optional[List[Playable]]:
+        """The stored tracks for `key`, `None` if there is none or it expired"""
+        async with self.pool.acquire() as db:
+            async with db.execute(
+                """SELECT payload FROM resolved_tracks WHERE key = ? AND expires_at > ?""", (key, time.time())
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            tracks = [Playable(data) for data in json.loads(row["payload"])]
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Dropping corrupted resolved track entry {key!r}: {e}")
+            await self.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touch(key)
+        return tracks
+
+    def touch(self, key: str) -> None:
+        """Count a use of `key`, written on the next `flush`"""
+        self._uses[key] += 1
+
+    async def put(self, key: str, tracks: List[Playable]) -> None:
+        now = time.time()
+        payload = json.dumps([track.raw_data for track in tracks])
+        async with self.pool.acquire() as db:
+            async with db.transaction():
+                await db.execute(
+                    """INSERT INTO resolved_tracks ( key, payload, uses, last_used, expires_at )
+                       VALUES ( ?, ?, 1, ?, ? )
+                       ON CONFLICT(key) DO UPDATE SET
+                       payload = excluded.payload, last_used = excluded.last_used, expires_at = excluded.expires_at""",
+                    (key, payload, now, now + self.ttl)
+                )
+                await self._trim(db, keep=key)
+        self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            await self.evict()
+
+    async def delete(self, key: str) -> None:
+        async with self.pool.acquire() as db:
+            await db.execute("""DELETE FROM resolved_tracks WHERE key = ?""", (key,))
+
+    async def flush(self) -> None:
+        """Write the buffered usage counts"""
+        if not self._uses:
+            return
+        uses, self._uses = self._uses, Counter()
+        now = time.time()
+        async with self.pool.acquire() as db:
+            await db.executemany(
+                """UPDATE resolved_tracks SET uses = uses + ?, last_used = ? WHERE key = ?""",
+                [(count, now, key) for key, count in uses.items()]
+            )
+
+    async def evict(self) -> int:
+        """Flush the usage counts, delete expired entries, then the least used ones above `max_entries`"""
+        await self.flush()
+        async with self.pool.acquire() as db:
+            async with db.transaction():
+                await db.execute("""DELETE FROM resolved_tracks WHERE expires_at <= ?""", (time.time(),))
+                return await self._trim(db)
+
+    async def _trim(self, db, *, keep: Optional[str] = None) -> int:
+        """Delete the least used entries above `max_entries`, never `keep`, the entry just written"""
+        async with db.execute("""SELECT COUNT(*) FROM resolved_tracks""") as cursor:
+            excess = (await cursor.fetchone())[0] - self.max_entries
+        if excess <= 0:
+            return 0
+        await db.execute(
+            """DELETE FROM resolved_tracks WHERE key IN
+               ( SELECT key FROM resolved_tracks WHERE key IS NOT ?
+                 ORDER BY uses ASC, last_used ASC LIMIT ? )""",
+            (keep, excess)
+        )
+        return excess
+
+    def stats(self) -> str:
+        """Short human readable summary of the store"""
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%})"
@@ -2,10 +2,10 @@ import discord
 from discord import ButtonStyle, Embed
 from discord.ui import View
 
-from typing import List
+from typing import Dict, List, Set
 
+from _classes.actor import ActorRegistry, MailboxFull
 from _classes.buttons import *
-import settings
 
 
 class TimeoutView(View):
@@ -79,67 +79,107 @@ class SelectView(View):
 
 class PlayerView(View):
     """
-    View cho kênh điều khiển player.
+    View của tin nhắn điều khiển player, dùng chung cho mọi guild.
+
+    Player được lấy từ `interaction.guild.voice_client` nên view không bao giờ hết hạn và
+    vẫn dùng được trên tin nhắn cũ sau khi bot khởi động lại (xem `Bot.add_view`).
+    Các thao tác đi qua `ActorRegistry` để không chen ngang các lệnh nhạc khác của guild.
+
+    Parameters
+    -----------
+    actors: `ActorRegistry`
+        Actor của các guild
     """
-    def __init__(self, vc):
+    def __init__(self, actors: ActorRegistry):
         super().__init__(timeout=None)
-        self.vc = vc
+        self.actors = actors
+        # Những người đã vote skip bài đang phát, theo guild
+        self.skippers: Dict[int, Set[int]] = {}
+
+    def reset_votes(self, guild_id: int) -> None:
+        self.skippers.pop(guild_id, None)
+
+    @staticmethod
+    def _is_dj(member: discord.Member) -> bool:
+        return any(role.name == "DJ" for role in member.roles)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        player = interaction.guild.voice_client if interaction.guild else None
+        if not player:
+            await interaction.response.send_message(embed=ErrorEmbed("Bot không ở trong kênh thoại nào"), ephemeral=True)
+            return False
+        if not interaction.user.voice or interaction.user.voice.channel != player.channel:
+            await interaction.response.send_message(embed=ErrorEmbed("Bạn cần ở cùng kênh thoại với bot"), ephemeral=True)
+            return False
+        return True
+
+    async def _submit(self, interaction: discord.Interaction, func, *args) -> None:
+        try:
+            await self.actors.submit(interaction.guild_id, func, *args)
+        except MailboxFull as e:
+            await interaction.followup.send(embed=ErrorEmbed(str(e)), ephemeral=True)
 
     @discord.ui.button(emoji="<:stop:1221490994923442266>", custom_id="player:stop")
     async def stop_button(self, interaction: discord.Interaction, b: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
-        for role in interaction.user.roles:
-            if role.name == "DJ":
-                self.vc.queue.clear()
-                await self.vc.stop()
-                return
-        await interaction.followup.send(embed=ErrorEmbed("Chỉ có ai có role DJ mới có thể buộc dừng chơi nhạc!"))
+        if not self._is_dj(interaction.user):
+            return await interaction.followup.send(
+                embed=ErrorEmbed("Chỉ có ai có role DJ mới có thể buộc dừng chơi nhạc!"), ephemeral=True
+            )
+        player: wavelink.Player = interaction.guild.voice_client
+
+        async def stop():
+            player.queue.clear()
+            await player.stop(force=True)
+        await self._submit(interaction, stop)
 
     @discord.ui.button(emoji="<:playpause:1222556825698959410>", custom_id="player:pauseplay")
     async def pause_button(self, interaction: discord.Interaction, b: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
-        if self.vc.is_playing() is True:
-            await self.vc.pause()
-        elif self.vc.is_paused() is True:
-            await self.vc.resume()
-        else:
-            await interaction.followup.send(embed=ErrorEmbed("Hiện đang không phát thứ gì"), ephemeral=True)
+        player: wavelink.Player = interaction.guild.voice_client
+        if not player.current:
+            return await interaction.followup.send(embed=ErrorEmbed("Hiện đang không phát thứ gì"), ephemeral=True)
+
+        async def toggle():
+            await player.pause(not player.paused)
+        await self._submit(interaction, toggle)
 
     @discord.ui.button(emoji="<:next:1222558976676335676>", custom_id="player:next")
     async def next_button(self, interaction: discord.Interaction, b: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
-        for role in interaction.user.roles:
-            if role.name == "DJ":
-                await self.vc.seek(self.vc.current.length)
-                return
-
-        needed = len(self.vc.channel.members) // 2
-        if len(settings.skippers) >= needed:
-            await self.vc.seek(self.vc.current.length)
-            settings.skippers = []  # Đặt lại biến skippers về danh sách rỗng
-            return
-        elif interaction.user.id in settings.skippers:
-            await interaction.followup.send(
-                embed=ErrorEmbed(f"Bạn đã vote skip rồi. Cần thêm {needed - len(settings.skippers)} vote để skip."),
-                ephemeral=True
-            )
-        else:
-            settings.skippers.append(interaction.user.id)
-            await interaction.followup.send(
-                embed=discord.Embed(
-                    title=f"Đã vote skip thành công! Cần thêm {needed - len(settings.skippers)} vote để skip."
-                ),
+        player: wavelink.Player = interaction.guild.voice_client
+        if not player.current:
+            return await interaction.followup.send(embed=ErrorEmbed("Hiện đang không phát thứ gì"), ephemeral=True)
+
+        skippers = self.skippers.setdefault(interaction.guild_id, set())
+        needed = max(sum(not member.bot for member in player.channel.members) // 2, 1)
+        if not self._is_dj(interaction.user) and interaction.user.id in skippers:
+            return await interaction.followup.send(
+                embed=ErrorEmbed(f"Bạn đã vote skip rồi. Cần thêm {needed - len(skippers)} vote để skip."),
                 ephemeral=True
             )
+        skippers.add(interaction.user.id)
+        if self._is_dj(interaction.user) or len(skippers) >= needed:
+            track = player.current
+
+            async def skip():
+                # Bài đã đổi trong lúc chờ thì không skip nữa
+                if player.current is track:
+                    await player.skip(force=True)
+            self.reset_votes(interaction.guild_id)
+            return await self._submit(interaction, skip)
+        await interaction.followup.send(
+            embed=discord.Embed(title=f"Đã vote skip thành công! Cần thêm {needed - len(skippers)} vote để skip."),
+            ephemeral=True
+        )
 
     @discord.ui.button(emoji="<:queue:1222558678796730469>", custom_id="player:queue")
     async def queue_button(self, interaction: discord.Interaction, b: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
-        embed = FooterEmbed(title=f"Hàng chờ: {self.vc.queue.count}", description="")
-        for i, track in enumerate(self.vc.queue, 1):
+        player: wavelink.Player = interaction.guild.voice_client
+        embed = FooterEmbed(title=f"Hàng chờ: {player.queue.count}", description="")
+        for i, track in enumerate(player.queue[:20], 1):
             embed.description += f"{i}. [**{track}**](<{track.uri}>)\n"
+        if player.queue.count > 20:
+            embed.description += f"... và {player.queue.count - 20} bài khác"
         await interaction.followup.send(embed=embed, ephemeral=True)
-
-
-
-
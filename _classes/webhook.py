@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio, discord, logging
+from aiohttp import ClientSession
+from collections import deque
+from discord import Embed
+from typing import Deque, List, Optional
+
+# Discord limits for a single webhook message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class WebhookDispatcher:
+    """
+    Async, batched replacement for `discord.SyncWebhook.send`.
+
+    `send` never blocks: embeds are put in a bounded queue and a background task
+    packs whatever is pending into one message of up to 10 embeds.
+    When the queue is full the oldest embed is dropped. `close` lets the task
+    finish the batch it is sending and the ones still pending before it stops.
+
+    Parameters
+    -----------
+    url: `str`
+        The webhook url
+    session: `aiohttp.ClientSession`
+        The session used for the requests
+    maxsize: `int`
+        Maximum number of pending embeds
+
+    Raises
+    -----------
+    `ValueError`
+        The webhook url is missing or invalid
+
+    Example
+    -----------
+    .. code-block:: python
+        webhook = WebhookDispatcher(MUSIC_WEBHOOK, session=bot.cs)
+        webhook.start()
+        webhook.send(embed=embed)
+        await webhook.close()
+    """
+    def __init__(self, url: Optional[str], *, session: ClientSession, maxsize: int = 100) -> None:
+        if not url:
+            raise ValueError("Missing webhook url")
+        self.webhook = discord.Webhook.from_url(url, session=session)
+        self.maxsize = maxsize
+        self._pending: Deque[Embed] = deque()
+        self._wakeup = asyncio.Event()
+        self._closing: bool = False
+        self._task: Optional[asyncio.Task] = None
+        self.sent: int = 0
+        self.dropped: int = 0
+
+    def start(self) -> None:
+        """Start the background task that sends the queued embeds"""
+        self._closing = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"webhook-dispatcher-{self.webhook.id}")
+
+    async def close(self) -> None:
+        """Send what is still pending then stop the background task"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task and not self._task.done():
+            # The task drains the queue before returning, including a batch waiting on a retry
+            await self._task
+        self._task = None
+        while self._pending:
+            await self._send(self._next_batch())
+
+    def send(self, *, embed: Embed) -> None:
+        """Queue an embed to be sent, this does not wait for the request"""
+        if len(self._pending) >= self.maxsize:
+            self._pending.popleft()
+            self.dropped += 1
+            logging.warning("Webhook queue is full, dropped the oldest embed")
+        self._pending.append(embed)
+        self._wakeup.set()
+
+    def _next_batch(self) -> List[Embed]:
+        """Pack the oldest pending embeds into one message, up to Discord's per-message limits"""
+        first = self._pending.popleft()
+        embeds = [first]
+        chars = len(first)
+        # An embed that doesn't fit stays first in line for the next message
+        while len(embeds) < MAX_EMBEDS and self._pending and chars + len(self._pending[0]) <= MAX_EMBED_CHARS:
+            embed = self._pending.popleft()
+            embeds.append(embed)
+            chars += len(embed)
+        return embeds
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._send(self._next_batch())
+
+    async def _send(self, embeds: List[Embed], *, retries: int = 5) -> None:
+        for attempt in range(retries):
+            try:
+                await self.webhook.send(embeds=embeds)
+                self.sent += len(embeds)
+                return
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    logging.error(f"Failed to send {len(embeds)} embed(s) to webhook: {e}")
+                    return
+                retry_after = e.response.headers.get("Retry-After") if e.response else None
+                delay = max(float(retry_after or 0), 2 ** attempt)
+                logging.warning(f"Webhook returned {e.status}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logging.error(f"Failed to send {len(embeds)} embed(s) to webhook: {e}")
+                return
+        logging.error(f"Gave up sending {len(embeds)} embed(s) to webhook after {retries} attempts")
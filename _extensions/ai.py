@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from discord.ext import commands
-from deep_translator import GoogleTranslator, MyMemoryTranslator
 from typing import TYPE_CHECKING
 
 from _classes.embeds import LoadingEmbed, FooterEmbed
@@ -27,6 +26,8 @@ class AI(commands.Cog):
         text
             A string that need to be translated
         """
+        # deep_translator pulls requests and bs4, only import it when someone translates
+        from deep_translator import GoogleTranslator, MyMemoryTranslator
         msg = await ctx.reply(embed=LoadingEmbed("Translating..."))
         google_translator = GoogleTranslator(source="auto", target="vi").translate(text)
         mymemory_translator = MyMemoryTranslator(source="en-US", target="vi-VN").translate(text)
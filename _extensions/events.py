@@ -7,8 +7,10 @@ from typing import TYPE_CHECKING
 from wavelink import Player, Playable, TrackStartEventPayload, TrackEndEventPayload
 
 
-from settings import MUSIC_CHANNEL, ACTIVITY_NAME
+from settings import ACTIVITY_NAME
+from _classes.actor import MailboxFull
 from _classes.embeds import ErrorEmbed, FooterEmbed
+from _classes.extensions import WarmingUp
 
 if TYPE_CHECKING:
     from bot import Furina
@@ -38,7 +40,8 @@ class BotEvents(commands.Cog):
 
         # Processing DMs
         if isinstance(message.channel, discord.DMChannel):
-            owner = self.bot.get_user(self.bot.owner_id)
+            # The owner is not cached unless they share a voice channel with the bot
+            owner = self.bot.get_user(self.bot.owner_id) or await self.bot.fetch_user(self.bot.owner_id)
             embed = Embed(
                 title=f"{message.author.mention} ({message.author.id}) sent a message",
                 description="`" + message.content + "`" if message.content else None
@@ -56,6 +59,13 @@ class BotEvents(commands.Cog):
             embed.description = f"Command `{ctx.message.content.split()[0]}` not found!"
         elif isinstance(error, commands.MissingRequiredArgument):
             embed.description = f"Missing argument: `{error.param.name}`"
+        elif isinstance(error, WarmingUp):
+            embed.description = f"{error}, try again in a few seconds"
+            return await ctx.reply(embed=embed, ephemeral=True, delete_after=10)
+        elif isinstance(error, MailboxFull):
+            # Too many pending music commands in the guild, expected under load so no traceback
+            embed.description = f"{error}"
+            return await ctx.reply(embed=embed, ephemeral=True, delete_after=10)
         elif isinstance(error, commands.CheckFailure):
             return
         else:
@@ -74,10 +84,12 @@ class BotEvents(commands.Cog):
         if before.channel and not after.channel:
             if len(before.channel.members) == 1 and before.channel.members[0] == self.bot.user:
                 await member.guild.voice_client.disconnect(force=True)
-                channel = self.bot.get_channel(MUSIC_CHANNEL)
-                embed = FooterEmbed(title="I am not afraid of ghost i swear :fearful:")
-                embed.set_image(url="https://media1.tenor.com/m/Cbwh3gVO4KAAAAAC/genshin-impact-furina.gif")
-                await channel.send(embed=embed)
+                channel_id = self.bot.guild_settings.music_channel(member.guild.id)
+                channel = member.guild.get_channel(channel_id) if channel_id else None
+                if channel:
+                    embed = FooterEmbed(title="I am not afraid of ghost i swear :fearful:")
+                    embed.set_image(url="https://media1.tenor.com/m/Cbwh3gVO4KAAAAAC/genshin-impact-furina.gif")
+                    await channel.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, payload: TrackEndEventPayload) -> None:
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-import discord, io, subprocess
+import asyncio, discord, io, subprocess
+from collections import deque
 from discord.ext import commands
 from discord import app_commands, Embed, Color
 from typing import TYPE_CHECKING, Optional, Tuple
 
 
 from settings import *
+from _classes.cacheprofile import PROFILES, format_bytes, measure_caches
+from _classes.logs import log_path
 from _classes.embeds import *
 
 if TYPE_CHECKING:
@@ -38,7 +41,7 @@ class Hidden(commands.Cog):
     def get_logs(dir: str, lines: int = 15) -> Tuple[Embed, Optional[discord.File]]:
         try:
             with open(dir, 'r', encoding='utf-8') as file:
-                log_lines = file.readlines()[-lines:]
+                log_lines = deque(file, maxlen=lines)
                 output = ''.join(log_lines)
                 errors = None
         except Exception as e:
@@ -61,7 +64,8 @@ class Hidden(commands.Cog):
     @commands.command(hidden=True, name='logs', aliases=['log'], description="Get the bot's logs")
     @commands.is_owner()
     async def logs(self, ctx: commands.Context, number: int = 15) -> None:
-        embed, file = self.get_logs("./logs/furina.log", number)
+        # Every cluster writes its own log file
+        embed, file = self.get_logs(log_path(self.bot.cluster_id if self.bot.ipc else None), number)
         await ctx.reply(embed=embed, file=file)
 
     @commands.command(hidden=True, name='lavalogs', description="Get the lavalink's logs")
@@ -70,6 +74,57 @@ class Hidden(commands.Cog):
         embed, file = self.get_logs("./logs/spring.log", number)
         await ctx.reply(embed=embed, file=file)
 
+    @commands.command(hidden=True, name='cachestats', description="Get the music search cache stats")
+    @commands.is_owner()
+    async def cache_stats(self, ctx: commands.Context) -> None:
+        from .music import scrape_cache, scrape_flights, search_cache, search_flights
+        embed = FooterEmbed(title="Music search cache")
+        embed.add_field(name="YouTube scrape", inline=False,
+                        value=f"{scrape_cache.stats()}, {scrape_flights.coalesced} coalesced")
+        embed.add_field(name="Playable.search", inline=False,
+                        value=f"{search_cache.stats()}, {search_flights.coalesced} coalesced")
+        embed.add_field(name="Guild settings", value=self.bot.guild_settings.stats(), inline=False)
+        music = self.bot.get_cog("Music")
+        if music:
+            embed.add_field(name="Resolved track store", value=music.track_store.stats(), inline=False)
+            embed.add_field(name="Idle reaper", value=music.reaper.stats(), inline=False)
+            embed.add_field(name="Now playing messages", value=music.board.stats(), inline=False)
+            embed.add_field(name="Play history", value=music.history.stats(), inline=False)
+        await ctx.reply(embed=embed)
+
+    @commands.command(hidden=True, name='memreport', aliases=['mem'], description="Get the memory used by the discord caches")
+    @commands.is_owner()
+    async def memory_report(self, ctx: commands.Context, guilds: int = 100, members: int = 250) -> None:
+        """
+        Live cache sizes, then the bytes every cache profile keeps for a synthetic load
+
+        Parameters
+        -----------
+        guilds: `int`
+            Number of synthetic guilds
+        members: `int`
+            Members per synthetic guild
+        """
+        import psutil
+        async with ctx.typing():
+            embed = FooterEmbed(title="Memory report")
+            bot = self.bot
+            embed.add_field(name=f"Live ({bot.cache_profile.name} profile)", inline=False, value=(
+                f"**RSS:** {format_bytes(psutil.Process().memory_info().rss)}\n"
+                f"**Guilds:** {len(bot.guilds)}\n"
+                f"**Members:** {sum(len(guild.members) for guild in bot.guilds)}\n"
+                f"**Users:** {len(bot.users)}\n"
+                f"**Messages:** {len(bot.cached_messages)}"
+            ))
+            for profile in PROFILES.values():
+                sizes = await asyncio.to_thread(measure_caches, profile, guilds=guilds, members=members)
+                embed.add_field(
+                    name=f"{profile.name} profile, {guilds} guilds x {members} members", inline=False,
+                    value="\n".join(f"**{cache.capitalize()}:** {format_bytes(size)}" for cache, size in sizes.items())
+                          + f"\n**Total:** {format_bytes(sum(sizes.values()))}"
+                )
+        await ctx.reply(embed=embed)
+
     @app_commands.command(name='embed', description="Gửi một embed.")
     @app_commands.default_permissions(manage_permissions=True)
     async def send_embed(self, interaction: discord.Interaction,
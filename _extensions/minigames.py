@@ -8,8 +8,10 @@ from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from collections import Counter
 from io import BytesIO
 
+from _classes.embeds import ErrorEmbed
 from .utils import Utils
 
+DEPENDS = ("_extensions.utils",)
 
 if TYPE_CHECKING:
     from bot import Furina
@@ -476,7 +478,11 @@ class Minigames(commands.GroupCog, group_name="minigame"):
         self.bot = bot
 
     async def cog_load(self) -> None:
-        await self.update_wordle_emojis()
+        # Fetching, and maybe uploading, the emojis only matters to wordle
+        self.warmup = self.bot.loader.warmup(self, self.update_wordle_emojis)
+
+    async def cog_unload(self) -> None:
+        await self.warmup.cancel()
 
     async def update_wordle_emojis(self) -> None:
         global WORDLE_EMOJIS
@@ -542,6 +548,12 @@ class Minigames(commands.GroupCog, group_name="minigame"):
         letters: `app_commands.Range[int, 3, 8] = 5`
             - Number of letters for this game (3-8), default to 5
         """
+        if not self.warmup.ready:
+            return await interaction.response.send_message(
+                embed=ErrorEmbed(description="Wordle failed to start" if self.warmup.failed
+                                 else "Wordle is warming up, try again in a few seconds"),
+                ephemeral=True
+            )
         await interaction.response.defer()
         async with self.bot.cs.get(f"https://random-word-api.vercel.app/api?length={letters}") as response:
             word: str = ast.literal_eval(await response.text())[0]
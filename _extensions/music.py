@@ -1,15 +1,29 @@
 from __future__ import annotations
 
-import asyncio, discord, logging, subprocess, textwrap, threading, wavelink
-from discord.ext import commands
+import asyncio, discord, logging, textwrap, time, wavelink
+from discord.ext import commands, tasks
 from discord import app_commands, ui, Color, ButtonStyle, Embed, Message
 from typing import TYPE_CHECKING, List, cast
 from wavelink import (Player, Playable, Playlist, TrackSource, TrackStartEventPayload, QueueMode,
-                      TrackEndEventPayload, TrackExceptionEventPayload, AutoPlayMode, Node, Pool)
-from youtube_search import YoutubeSearch
-
-
-from _classes.views import PaginatedView
+                      TrackEndEventPayload, TrackExceptionEventPayload, AutoPlayMode, Node, NodeStatus, Pool)
+
+
+from _classes.actor import ActorRegistry, MailboxFull
+from _classes.cache import SingleFlight, TTLCache
+from _classes.history import PlayHistory
+from _classes.lavalink import LavalinkArtifact, LavalinkProcess
+from _classes.nodes import balancer
+from _classes.nowplaying import NowPlayingBoard
+from _classes.player import FurinaPlayer
+from _classes.playlists import SavedPlaylists
+from _classes.prefetch import TrackPrefetcher
+from _classes.recommender import Recommender
+from _classes.queue import normalize_title
+from _classes.reaper import IdleReaper, TimerWheel
+from _classes.snapshots import PlayerSnapshots
+from _classes.trackstore import TrackStore
+from _classes.views import PaginatedView, PlayerView
+from _classes.webhook import WebhookDispatcher
 from settings import *
 
 if TYPE_CHECKING:
@@ -30,7 +44,7 @@ class Embeds:
     @staticmethod
     def invalid_embed() -> Embed:
         return FooterEmbed(title="Error",
-                           description="The track is more than 2 hours or is a livestream. Please choose another one.",
+                           description="The track is already in the queue, is more than 2 hours or is a livestream. Please choose another one.",
                            color=Color.red())
     
     @staticmethod
@@ -51,7 +65,7 @@ class Embeds:
         embed = FooterEmbed(title=f"Now Playing", description=f"### [{current}]({current.uri})\n", color=Color.blue())
         embed.set_author(icon_url=PLAYING_GIF, name=current.author)
         embed.set_image(url=current.artwork)
-        played = int((player.position / current.length) * 20)
+        played = min(int((player.position / current.length) * 20), 20) if current.length else 0
         embed.description += ('▰'*played + '▱'*(20-played))
         embed.description += f"\n`{format_len(player.position)} / {format_len(current.length)}`"
         return embed
@@ -60,13 +74,6 @@ class Embeds:
     def error_embed(error: str) -> Embed:
         return FooterEmbed(title="Error", description=error)
 
-    @staticmethod
-    def player_embed(track: Playable) -> Embed:
-        embed = FooterEmbed(title=f"Playing: **{track}**", url = track.uri)
-        embed.set_author(name=track.author, icon_url=PLAYING_GIF)
-        embed.set_thumbnail(url=track.artwork)
-        return embed
-
 
 def format_len(length: int) -> str:
     """Chuyển đổi độ dài track sang dạng `phút:giây`"""
@@ -77,30 +84,42 @@ def shorten_name(track: Playable) -> str:
     """Rút gọn tên track xuống còn 50 ký tự."""
     return textwrap.shorten(track.title, width=50, break_long_words=False, placeholder="...")
 
-def is_valid(track: Playable, player: Player = None) -> bool:
+def is_valid(track: Playable, player: FurinaPlayer = None) -> bool:
     """Kiểm tra xem track có hợp lệ để phát hay không."""
-    if player and track in player.queue:
+    if player and player.queue.has(track):
         return False
     return True
 
-async def ensure_voice_connection(ctx: commands.Context | discord.Interaction) -> Player:
-    try:
+async def ensure_voice_connection(ctx: commands.Context | discord.Interaction) -> FurinaPlayer | None:
+    """Kết nối vào kênh thoại của người dùng, thử lại với thời gian chờ tăng dần nếu bị timeout."""
+    author = ctx.author if isinstance(ctx, commands.Context) else ctx.user
+    delay = 1.0
+    for attempt in range(1, VOICE_CONNECT_ATTEMPTS + 1):
         if ctx.guild.voice_client:
-            return cast(Player, ctx.guild.voice_client)
-        elif isinstance(ctx, commands.Context):
-            return await ctx.author.voice.channel.connect(cls=Player, self_deaf=True)
-        else:
-            interaction = ctx
-            return await interaction.user.voice.channel.connect(cls=Player, self_deaf=True)
-    except wavelink.exceptions.ChannelTimeoutException:
-        await ctx.channel.send("Bot không kết nối được với kênh thoại...", delete_after=10.0)
+            return cast(FurinaPlayer, ctx.guild.voice_client)
+        try:
+            return await author.voice.channel.connect(cls=FurinaPlayer, self_deaf=True)
+        except wavelink.exceptions.ChannelTimeoutException:
+            logging.warning(f"Voice connection to guild {ctx.guild.id} timed out ({attempt}/{VOICE_CONNECT_ATTEMPTS})")
+            if attempt < VOICE_CONNECT_ATTEMPTS:
+                await asyncio.sleep(delay)
+                delay *= 2
+    return None
 
 async def add_to_queue(ctx: commands.Context | discord.Interaction, data: Playlist | Playable):
     msg = await loading_embed_reply(ctx)
-    player = await ensure_voice_connection(ctx)
-    while not player:
-        player = await ensure_voice_connection(ctx)
+    # Mọi thao tác lên player của một guild đều đi qua actor của guild đó
+    try:
+        embed, view = await actors.submit(ctx.guild.id, enqueue, ctx, data)
+    except MailboxFull as e:
+        embed, view = Embeds.error_embed(str(e)), None
+    await msg.edit(embed=embed, view=view)
 
+async def enqueue(ctx: commands.Context | discord.Interaction, data: Playlist | Playable) -> tuple[Embed, ui.View | None]:
+    player = await ensure_voice_connection(ctx)
+    if not player:
+        return Embeds.error_embed("Bot không kết nối được với kênh thoại"), None
+    player.home = ctx.channel
 
     # Kiểm tra xem bot có đang ở trong StageChannel không để có thể request to speak
     if isinstance(player.channel, discord.StageChannel):
@@ -109,13 +128,8 @@ async def add_to_queue(ctx: commands.Context | discord.Interaction, data: Playli
     async with ctx.channel.typing():
         if isinstance(data, Playlist):
             embeds = await put_a_playlist(playlist=data, player=player)
-            view = PaginatedView(timeout=180, embeds=embeds)
-            embed = embeds[0]
-        else:
-            embed = await put_a_song(track=data, player=player)
-            view = None
-
-        await msg.edit(embed=embed, view=view)
+            return embeds[0], PaginatedView(timeout=180, embeds=embeds)
+        return await put_a_song(track=data, player=player), None
 
 async def loading_embed_reply(ctx: commands.Context | discord.Interaction) -> Message:
     """Reply lệnh với `LoadingEmbed` và trả về `Message`"""
@@ -125,26 +139,30 @@ async def loading_embed_reply(ctx: commands.Context | discord.Interaction) -> Me
     else:
         return await ctx.reply(embed=Embeds.loading_embed(), view=None)
 
-async def put_a_song(*, track: Playable, player: Player) -> Embed:
+async def put_a_song(*, track: Playable, player: FurinaPlayer) -> Embed:
     """Thêm một track vào hàng chờ."""
-    if not is_valid(track):
+    if not is_valid(track, player):
         return Embeds.invalid_embed()
     await player.queue.put_wait(track)
 
     if not player.playing:
-        await player.play(player.queue.get(), populate=True)
+        await player.play(player.queue.get())
     return Embeds.added_embed(track=track, player=player)
 
-async def put_a_playlist(*, playlist: Playlist, player: Player) -> Embed:
+async def put_a_playlist(*, playlist: Playlist, player: FurinaPlayer) -> list[Embed]:
     """Thêm một playlist vào hàng chờ."""
     track_added: int = 0
     track_skipped: int = 0
     embed = FooterEmbed(description="")
     embeds = []
+    batch: list[Playable] = []
+    # Các track trùng nhau trong cùng playlist cũng bị bỏ qua
+    seen: set[str] = set()
     for track in playlist.tracks:
-        if is_valid(track):
+        if is_valid(track, player) and track.identifier not in seen:
             embed.description += f"- Đã thêm `{track}` vào hàng chờ\n"
-            await player.queue.put_wait(track)
+            batch.append(track)
+            seen.add(track.identifier)
             track_added += 1
         else:
             embed.description += f"- Đã bỏ qua `{track}`\n"
@@ -158,35 +176,177 @@ async def put_a_playlist(*, playlist: Playlist, player: Player) -> Embed:
             
     for embed in embeds:
         embed.title = f"Đã thêm {track_added}, bỏ qua {track_skipped} trên tổng số {len(playlist.tracks)} track"
+    # Thêm cả batch trong một lần thay vì `put_wait` từng track
+    await player.queue.put_wait(batch)
     if not player.playing:
-        await player.play(player.queue.get(), populate=True)
+        await player.play(player.queue.get())
     return embeds
 
-async def play_music(ctx: commands.Context, track_name: str, source: TrackSource | str = None):
+async def play_music(ctx: commands.Context, track_name: str, source: TrackSource | str = None, *,
+                     store: TrackStore | None = None):
     if not ctx.interaction:
         await ctx.message.add_reaction(CHECKMARK)
-    tracks = await search_for_tracks(track_name=track_name, source=source)
+    tracks = await search_for_tracks(track_name=track_name, source=source, store=store)
     if not tracks:
         return await ctx.reply(embed=Embeds.error_embed(f"Không tìm thấy kết quả nào cho `{track_name}`"))
     if isinstance(tracks, Playlist):
         return await add_to_queue(ctx, tracks)
     await add_to_queue(ctx, tracks[0])
 
-async def search_for_tracks(track_name: str, source: TrackSource | str = None) -> wavelink.Search:
+# Mỗi guild có một actor xử lý lần lượt các lệnh điều khiển player
+actors = ActorRegistry(maxsize=ACTOR_MAILBOX_SIZE, idle_timeout=ACTOR_IDLE_TIMEOUT)
+
+# Kết quả scrape YouTube và kết quả `Playable.search`, dùng chung cho mọi guild
+scrape_cache: TTLCache[list[dict]] = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+search_cache: TTLCache[wavelink.Search] = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# Track vừa được node resolve thì `TrackPrefetcher` không cần hỏi lại node nữa
+validated_tracks: TTLCache[bool] = TTLCache(maxsize=SEARCH_CACHE_SIZE * 4, ttl=PREFETCH_TTL)
+# Nhiều lệnh cùng tìm một query thì chỉ chạy một lần scrape/search
+scrape_flights: SingleFlight[list[dict]] = SingleFlight()
+search_flights: SingleFlight[wavelink.Search] = SingleFlight()
+
+def normalize_query(query: str) -> str:
+    """Chuẩn hóa query để làm key cho cache, link thì giữ nguyên chữ hoa/thường."""
+    query = " ".join(query.split())
+    return query if "https://" in query else query.casefold()
+
+async def youtube_search(query: str, max_results: int = 1) -> list[dict]:
+    """Scrape kết quả tìm kiếm YouTube trong executor để không chặn event loop."""
+    key = (normalize_query(query), max_results)
+    results = scrape_cache.get(key)
+    if results is None:
+        results = await scrape_flights.run(key, lambda: _scrape(key, query, max_results))
+    return results or []
+
+async def _scrape(key: tuple[str, int], query: str, max_results: int) -> list[dict]:
+    # Import lúc tìm kiếm lần đầu, youtube_search kéo theo cả requests
+    from youtube_search import YoutubeSearch
+    results = await asyncio.to_thread(lambda: YoutubeSearch(query, max_results).to_dict())
+    if results:
+        scrape_cache.set(key, results)
+    return results
+
+async def cache_lookup(key: tuple[str, str], store: TrackStore | None = None, *,
+                       count: bool = True) -> wavelink.Search | None:
+    """Tìm kết quả đã resolve trong cache bộ nhớ, rồi tới `TrackStore`."""
+    tracks = search_cache.get(key, count=count)
+    if tracks is not None:
+        if store:
+            store.touch("\x1f".join(key))
+        return tracks
+    if store:
+        tracks = await store.get("\x1f".join(key))
+        if tracks:
+            search_cache.set(key, tracks)
+    return tracks
+
+async def cache_remember(key: tuple[str, str], tracks: wavelink.Search, store: TrackStore | None = None) -> None:
+    """Lưu kết quả vào cache bộ nhớ và `TrackStore` (trừ playlist)."""
+    if not tracks:
+        return
+    search_cache.set(key, tracks)
+    if store and not isinstance(tracks, Playlist):
+        await store.put("\x1f".join(key), tracks)
+
+async def cached_search(query: str, source: TrackSource | str | None = None, *,
+                        store: TrackStore | None = None, count: bool = True) -> wavelink.Search:
+    """
+    `Playable.search` có cache theo query và source.
+
+    `count=False` khi lần tra cứu này thuộc về một yêu cầu đã được đếm hit/miss rồi.
+    """
+    key = (str(source), normalize_query(query))
+    tracks = await cache_lookup(key, store, count=count)
+    if tracks is None:
+        tracks = await search_flights.run(key, lambda: _search(key, query, source, store))
+    return tracks
+
+async def _search(key: tuple[str, str], query: str, source: TrackSource | str | None,
+                  store: TrackStore | None) -> wavelink.Search:
+    tracks = await Playable.search(query, source=source) if source else await Playable.search(query)
+    for track in (tracks.tracks if isinstance(tracks, Playlist) else tracks):
+        validated_tracks.set(track.encoded, True)
+    await cache_remember(key, tracks, store)
+    return tracks
+
+async def search_for_tracks(track_name: str, source: TrackSource | str = None, *,
+                            store: TrackStore | None = None) -> wavelink.Search:
     if "https://" not in track_name:
-        ytsearch = YoutubeSearch(track_name, 1).to_dict()[0]
-        track_name = f"https://youtu.be/{ytsearch['id']}"
-        return await Playable.search(track_name)
+        key = (str(source), normalize_query(track_name))
+        tracks = await cache_lookup(key, store)
+        if tracks is not None:
+            return tracks
+        ytsearch = await youtube_search(track_name, 1)
+        if not ytsearch:
+            return []
+        # Miss của query đã được đếm ở trên, link chỉ là bước resolve tiếp theo
+        tracks = await cached_search(f"https://youtu.be/{ytsearch[0]['id']}", store=store, count=False)
+        await cache_remember(key, tracks, store)
+        return tracks
     else:
-        return await Playable.search(track_name, source=source)
+        return await cached_search(track_name, source=source, store=store)
+
+
+async def fan_out_search(query: str, *, limit: int = 5,
+                         store: TrackStore | None = None) -> tuple[list[Playable], list[Playable]]:
+    """
+    Tìm kiếm song song trên YouTube và SoundCloud.
+
+    Mỗi nguồn có hạn chót `SEARCH_DEADLINE` giây, nguồn nào quá hạn thì trả về những gì đã có.
+    Số request đồng thời tới node bị giới hạn bởi `SEARCH_CONCURRENCY`.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SEARCH_DEADLINE
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+    async def resolve(url: str) -> Playable | None:
+        async with semaphore:
+            results = await cached_search(url, store=store)
+        return results[0] if results else None
+
+    async def youtube() -> list[Playable]:
+        ytsearch = await asyncio.wait_for(youtube_search(query, limit), timeout=max(deadline - loop.time(), 0))
+        tasks = [asyncio.create_task(resolve(f"https://youtu.be/{result['id']}")) for result in ytsearch]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=max(deadline - loop.time(), 0))
+        for task in pending:
+            task.cancel()
+        # Giữ nguyên thứ tự kết quả của YouTube, bỏ các track chưa xong hoặc bị lỗi
+        return [task.result() for task in tasks
+                if task not in pending and not task.exception() and task.result()]
+
+    async def soundcloud() -> list[Playable]:
+        async with semaphore:
+            results = await cached_search(query, source=TrackSource.SoundCloud, store=store)
+        return list(results[:limit]) if isinstance(results, list) else []
+
+    async def guarded(source: str, coro) -> list[Playable]:
+        try:
+            return await coro
+        except asyncio.TimeoutError:
+            logging.warning(f"Search on {source} for \"{query}\" exceeded {SEARCH_DEADLINE}s")
+        except Exception as e:
+            logging.error(f"Search on {source} for \"{query}\" failed: {e}")
+        return []
+
+    # YouTube tự xử lý hạn chót để giữ lại những track đã resolve xong
+    yt_tracks, sc_tracks = await asyncio.gather(
+        guarded("YouTube", youtube()),
+        guarded("SoundCloud", asyncio.wait_for(soundcloud(), timeout=SEARCH_DEADLINE))
+    )
+    return yt_tracks, sc_tracks
 
 
 class SelectTrackView(ui.View):
     def __init__(self, yt_tracks: list[Playable], sc_tracks: list[Playable]):
         super().__init__(timeout=180)
         self.message: Message | None = None
-        self.add_item(SelectTrack(yt_tracks, placeholder="YouTube"))
-        self.add_item(SelectTrack(sc_tracks, placeholder="SoundCloud"))
+        # Select không được phép rỗng nên chỉ thêm nguồn nào có kết quả
+        if yt_tracks:
+            self.add_item(SelectTrack(yt_tracks, placeholder="YouTube"))
+        if sc_tracks:
+            self.add_item(SelectTrack(sc_tracks, placeholder="SoundCloud"))
 
     async def on_timeout(self) -> None:
         self.stop()
@@ -218,6 +378,134 @@ class SelectTrack(ui.Select):
         await add_to_queue(interaction, self.tracks[int(self.values[0])])
 
 
+class QueueView(ui.View):
+    """
+    View hàng chờ chỉ render trang đang xem.
+
+    Giữ một bản sao danh sách track lúc gọi lệnh (chỉ copy tham chiếu), mỗi lần chuyển trang
+    chỉ tạo một `Embed` nên bộ nhớ và thời gian phản hồi không phụ thuộc độ dài hàng chờ.
+    """
+    PAGE_SIZE = 10
+
+    def __init__(self, player: FurinaPlayer):
+        super().__init__(timeout=60)
+        self.player = player
+        self.message: Message | None = None
+        self.tracks: list[Playable] = list(player.queue)
+        # Vị trí (trong `self.tracks`) của các track khớp với bộ lọc, `None` là không lọc
+        self.matches: list[int] | None = None
+        self.query: str | None = None
+        self.page: int = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.matches) if self.matches is not None else len(self.tracks)
+
+    @property
+    def pages(self) -> int:
+        return max((self.total - 1) // self.PAGE_SIZE + 1, 1)
+
+    def render(self) -> Embed:
+        """Tạo embed cho trang hiện tại và cập nhật trạng thái các nút."""
+        self.page = min(max(self.page, 0), self.pages - 1)
+        start = self.page * self.PAGE_SIZE
+        if self.matches is not None:
+            positions = self.matches[start:start + self.PAGE_SIZE]
+        else:
+            positions = range(start, min(start + self.PAGE_SIZE, len(self.tracks)))
+        lines = []
+        for i in positions:
+            track = self.tracks[i]
+            lines.append(f"{i + 1}. [**{track}**](<{track.uri}>) ({format_len(track.length)})")
+
+        embed = FooterEmbed(color=Color.blue(),
+                            title=f"Hàng chờ: {len(self.tracks)} bài hát",
+                            description="\n".join(lines) or f"Không có bài nào khớp với `{self.query}`")
+        if self.query:
+            embed.title += f" ({self.total} bài khớp `{self.query}`)"
+        if self.player.playing and self.player.current:
+            track = self.player.current
+            embed.add_field(
+                name="Đang phát",
+                value=f"[**{track}**](<{track.uri}>) ({format_len(track.length)})"
+            )
+
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+        self.page_counter.label = f"{self.page + 1}/{self.pages}"
+        return embed
+
+    def apply_filter(self, query: str) -> None:
+        query = normalize_title(query)
+        if not query:
+            self.matches, self.query = None, None
+        else:
+            # Dùng tiêu đề đã chuẩn hóa sẵn trong index của hàng chờ, track đã rời hàng chờ
+            # sau khi mở view thì không khớp nữa
+            matched = self.player.queue.matching(query)
+            self.matches = [i for i, track in enumerate(self.tracks) if track.identifier in matched] if matched else []
+            self.query = query
+        self.page = 0
+
+    @ui.button(emoji="\U00002b05", style=ButtonStyle.grey)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        self.page -= 1
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @ui.button(label="1/1", style=ButtonStyle.grey, disabled=True)
+    async def page_counter(self, interaction: discord.Interaction, button: ui.Button):
+        pass
+
+    @ui.button(emoji="\U000027a1", style=ButtonStyle.grey)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        self.page += 1
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @ui.button(emoji="\U0001f522", style=ButtonStyle.grey)
+    async def jump_to_page(self, interaction: discord.Interaction, button: ui.Button):
+        await interaction.response.send_modal(QueueJumpModal(self))
+
+    @ui.button(emoji="\U0001f50e", style=ButtonStyle.grey)
+    async def filter_tracks(self, interaction: discord.Interaction, button: ui.Button):
+        await interaction.response.send_modal(QueueFilterModal(self))
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        # Giải phóng bản sao hàng chờ ngay khi view hết hạn
+        self.tracks, self.matches = [], None
+        if self.message:
+            await self.message.edit(view=self)
+
+
+class QueueJumpModal(ui.Modal, title="Đi tới trang"):
+    page = ui.TextInput(label="Số trang", max_length=6)
+
+    def __init__(self, view: QueueView):
+        super().__init__()
+        self.view = view
+        self.page.placeholder = f"1 - {view.pages}"
+
+    async def on_submit(self, interaction: discord.Interaction):
+        if not self.page.value.isdigit():
+            return await interaction.response.send_message(embed=Embeds.error_embed("Số trang không hợp lệ"),
+                                                           ephemeral=True)
+        self.view.page = int(self.page.value) - 1
+        await interaction.response.edit_message(embed=self.view.render(), view=self.view)
+
+
+class QueueFilterModal(ui.Modal, title="Lọc hàng chờ"):
+    query = ui.TextInput(label="Tên bài hát (để trống để bỏ lọc)", required=False, max_length=100)
+
+    def __init__(self, view: QueueView):
+        super().__init__()
+        self.view = view
+
+    async def on_submit(self, interaction: discord.Interaction):
+        self.view.apply_filter(self.query.value)
+        await interaction.response.edit_message(embed=self.view.render(), view=self.view)
+
+
 class LoopView(ui.View):
     def __init__(self, *, player: Player):
         super().__init__(timeout=60)
@@ -232,21 +520,29 @@ class LoopView(ui.View):
     @ui.button(emoji="\U0000274e", style=ButtonStyle.grey)
     async def loop_off(self, interaction: discord.Interaction, button: ui.Button):
         await interaction.response.defer()
-        self.player.queue.mode = QueueMode.normal
+        await self.set_mode(QueueMode.normal, interaction)
         await self.mass_button_style_change(button)
 
     @ui.button(emoji="\U0001f502", style=ButtonStyle.grey)
     async def loop_current(self, interaction: discord.Interaction, button: ui.Button):
         await interaction.response.defer()
-        self.player.queue.mode = QueueMode.loop_all
+        await self.set_mode(QueueMode.loop_all, interaction)
         await self.mass_button_style_change(button)
 
     @ui.button(emoji="\U0001f501", style=ButtonStyle.grey)
     async def loop_all(self, interaction: discord.Interaction, button: ui.Button):
         await interaction.response.defer()
-        self.player.queue.mode = QueueMode.loop
+        await self.set_mode(QueueMode.loop, interaction)
         await self.mass_button_style_change(button)
 
+    async def set_mode(self, mode: QueueMode, interaction: discord.Interaction):
+        async def switch():
+            self.player.queue.mode = mode
+        try:
+            await actors.submit(interaction.guild_id, switch)
+        except MailboxFull as e:
+            await interaction.followup.send(embed=Embeds.error_embed(str(e)), ephemeral=True)
+
     async def mass_button_style_change(self, button: ui.Button):
         for child in self.children:
             if child == button:
@@ -265,59 +561,222 @@ class Music(commands.Cog):
     """Music Related Commands"""
     def __init__(self, bot: Furina):
         self.bot = bot
-        self.webhook = discord.SyncWebhook.from_url(MUSIC_WEBHOOK)
+        self.webhook = WebhookDispatcher(MUSIC_WEBHOOK, session=bot.cs)
+        self.webhooks: dict[str, WebhookDispatcher] = {}
+        self.lavalink = LavalinkProcess(bot.cs, jar=LAVALINK_JAR, uri=LAVA_URI, password=LAVA_PW,
+                                        jvm_options=LAVALINK_JVM_OPTIONS)
+        self.snapshots = PlayerSnapshots(bot.pool)
+        self.playlists = SavedPlaylists(bot.pool)
+        self.track_store = TrackStore(bot.pool, max_entries=RESOLVED_TRACK_LIMIT, ttl=RESOLVED_TRACK_TTL)
+        self.prefetcher = TrackPrefetcher(actors, validated=validated_tracks, depth=PREFETCH_DEPTH,
+                                          timeout=PREFETCH_TIMEOUT)
+        self.recommender = Recommender(window=RECOMMENDER_WINDOW, max_tracks=RECOMMENDER_MAX_TRACKS)
+        self.history = PlayHistory(bot.pool, size=PLAY_HISTORY_SIZE, half_life=PLAY_HISTORY_HALF_LIFE)
+        self.history_loaded = False
+        self.players_restored = False
+        # Task chạy nền phải được giữ tham chiếu, event loop chỉ giữ tham chiếu yếu
+        self._background: set[asyncio.Task] = set()
+        self.board = NowPlayingBoard(PlayerView(actors), self._render_player, budget=NOWPLAYING_EDIT_BUDGET)
+        self.reaper = IdleReaper(TimerWheel(tick=IDLE_WHEEL_TICK), pause_after=IDLE_PAUSE_AFTER,
+                                 disconnect_after=IDLE_DISCONNECT_AFTER, park=self._park)
 
     async def cog_load(self) -> None:
-        await self.get_lavalink_jar()
-        self.start_lavalink()
-        await asyncio.sleep(10)
+        self.webhook.start()
+        await self.snapshots.create_table()
+        await self.track_store.create_table()
+        await self.history.create_table()
+        await self.playlists.create_table()
+        # Nút trên tin nhắn điều khiển cũ vẫn dùng được sau khi khởi động lại
+        self.bot.add_view(self.board.view)
+        # Khởi động Lavalink mất vài giây, các extension khác không cần chờ
+        self.warmup = self.bot.loader.warmup(self, self._warm_up)
+
+    async def _warm_up(self) -> None:
+        """Phần khởi động chậm của cog, chạy nền; lệnh nhạc báo đang khởi động cho tới khi xong."""
+        # Mô hình autoplay học lại từ lịch sử phát đã lưu, chỉ một lần dù warm-up được thử lại
+        if not self.history_loaded:
+            for guild_id, track in await self.history.load(self.bot.owns_guild):
+                self.recommender.record(guild_id, track)
+            self.history_loaded = True
+        # Chỉ cluster đầu tiên chạy Lavalink, các cluster khác chờ node đó sẵn sàng
+        if self.bot.runs_lavalink:
+            # Lần thử lại không tải lại jar khi tiến trình Lavalink vẫn đang được giám sát
+            if not self.lavalink.supervising:
+                await self.get_lavalink_jar()
+                self.lavalink.start()
+            ready = await self.lavalink.wait_ready(timeout=LAVALINK_BOOT_TIMEOUT)
+        else:
+            ready = await self.lavalink.wait_external(timeout=LAVALINK_BOOT_TIMEOUT)
+        if not ready:
+            logging.warning(f"Lavalink is not ready after {LAVALINK_BOOT_TIMEOUT}s, connecting anyway")
         await self.refresh_node_connection()
+        # Các bước trên có thể lỗi và được thử lại, các bước dưới chỉ chạy một lần dù warm-up được thử lại
+        for loop in (self.node_health_check, self.save_snapshots, self.refresh_nowplaying):
+            if not loop.is_running():
+                loop.start()
+        self.reaper.wheel.start()
+        if not self.players_restored:
+            self._spawn(self.restore_players())
+            self.players_restored = True
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Chạy `coro` nền, giữ task tới khi xong để nó không bị thu gom giữa chừng."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def cog_unload(self) -> None:
+        await self.warmup.cancel()
+        for task in self._background:
+            task.cancel()
+        self.node_health_check.cancel()
+        self.save_snapshots.cancel()
+        self.prefetcher.cancel_all()
+        self.refresh_nowplaying.cancel()
+        await self.reaper.wheel.stop()
+        await actors.close()
+        # Lưu vị trí chính xác của mọi player trước khi tắt
+        await self.snapshots.save(self._players(), force=True, prune=False)
+        await self.track_store.flush()
+        await self.history.flush()
+        await self.webhook.close()
+        for webhook in self.webhooks.values():
+            await webhook.close()
+        await self.lavalink.stop()
+
+    def _players(self) -> list[FurinaPlayer]:
+        return [vc for vc in self.bot.voice_clients if isinstance(vc, FurinaPlayer)]
+
+    @tasks.loop(seconds=SNAPSHOT_INTERVAL)
+    async def save_snapshots(self) -> None:
+        """Lưu trạng thái các player đã thay đổi kể từ lần lưu trước."""
+        try:
+            await self.snapshots.save(self._players())
+            await self.track_store.flush()
+            await self.history.flush()
+        except Exception as e:
+            logging.error(f"Cannot save player snapshots: {e}")
 
-    async def get_lavalink_jar(self) -> None:
-        async with self.bot.cs.get("https://api.github.com/repos/lavalink-devs/Lavalink/releases/latest") as response:
-            release_info = await response.json()
-            try:
-                jar_info = next(
-                    (asset for asset in release_info["assets"] if asset["name"] == "Lavalink.jar"),
-                    None
-                )
-            except KeyError:
-                return
-            jar_url = jar_info["browser_download_url"]
-            async with self.bot.cs.get(jar_url) as jar:
-                with open("./Lavalink.jar", "wb") as f:
-                    f.write(await jar.read())
-                    print("Lavalink.jar downloaded")
-
-    def start_lavalink(self):
-        def run_lavalink():
-            try:
-                subprocess.run(["java", "-jar", "Lavalink.jar"], cwd="./")
-            except FileNotFoundError as e:
-                logging.error(f"Java is not installed or not in PATH: {e}")
-                print(f"Java is not installed or not in PATH: {e}")
-                raise e
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Error starting Lavalink: {e}")
-                print(f"Error starting Lavalink: {e}")
-                raise e
-            except Exception as e:
-                logging.error(f"An error occured when starting Lavalink: {e}")
-                print(f"An error occured when starting Lavalink: {e}")
+    @tasks.loop(seconds=NOWPLAYING_TICK)
+    async def refresh_nowplaying(self) -> None:
+        """Cập nhật thanh tiến trình trên tin nhắn điều khiển của các guild đang phát."""
         try:
-            thread = threading.Thread(target=run_lavalink, daemon=True)
-            thread.start()
+            await self.board.tick(self._players())
         except Exception as e:
-            pass
+            logging.error(f"Cannot refresh now playing messages: {e}")
+
+    @staticmethod
+    def _render_player(player: FurinaPlayer) -> Embed:
+        """Embed của tin nhắn điều khiển."""
+        if not player.current:
+            return FooterEmbed(title="Hàng chờ trống", description="Dùng `!play` hoặc `/play` để thêm bài hát")
+        embed = Embeds.nowplaying_embed(player)
+        if player.paused:
+            embed.title = "Paused"
+        if player.queue.count:
+            embed.add_field(name="Hàng chờ", value=f"{player.queue.count} bài hát")
+        return embed
+
+    def _webhook(self, guild_id: int) -> WebhookDispatcher:
+        """Webhook nhạc của guild, dùng webhook mặc định nếu guild không đặt hoặc link không hợp lệ."""
+        url = self.bot.guild_settings.webhook(guild_id)
+        if not url or url == MUSIC_WEBHOOK:
+            return self.webhook
+        webhook = self.webhooks.get(url)
+        if webhook is None:
+            try:
+                webhook = self.webhooks[url] = WebhookDispatcher(url, session=self.bot.cs)
+            except ValueError:
+                logging.warning(f"Invalid music webhook for guild {guild_id}, using the default one")
+                return self.webhook
+            webhook.start()
+        return webhook
+
+    def _home_channel(self, player: FurinaPlayer) -> discord.abc.Messageable | None:
+        return player.home or self._music_channel(player.guild)
+
+    async def restore_players(self) -> None:
+        """Khôi phục kết nối thoại, hàng chờ và vị trí phát của các guild sau khi khởi động lại."""
+        await self.bot.wait_until_ready()
+        # Guild thuộc shard của process khác do cluster đó khôi phục
+        snapshots = [snapshot for snapshot in await self.snapshots.load_all()
+                     if self.bot.owns_guild(snapshot["guild_id"])]
+        results = await asyncio.gather(*(self._restore_player(snapshot) for snapshot in snapshots),
+                                       return_exceptions=True)
+        restored = sum(result is True for result in results)
+        for snapshot, result in zip(snapshots, results):
+            if isinstance(result, Exception):
+                logging.error(f"Cannot restore player of guild {snapshot['guild_id']}: {result}")
+        if snapshots:
+            logging.info(f"Restored {restored}/{len(snapshots)} players from snapshots")
+
+    async def _restore_player(self, snapshot: dict) -> bool:
+        guild = self.bot.get_guild(snapshot["guild_id"])
+        channel = guild.get_channel(snapshot["channel_id"]) if guild else None
+        if not channel or guild.voice_client:
+            await self.snapshots.delete(snapshot["guild_id"])
+            return False
+        player = await channel.connect(cls=FurinaPlayer, self_deaf=True)
+        await self._apply_snapshot(player, snapshot, paused=snapshot["paused"])
+        return True
+
+    @staticmethod
+    async def _apply_snapshot(player: FurinaPlayer, snapshot: dict, *, paused: bool) -> None:
+        player.queue.put([track for track in snapshot["queue"] if not player.queue.has(track)])
+        player.queue.mode = snapshot["mode"]
+        player.autoplay = snapshot["autoplay"]
+        if player.playing:
+            return
+        if snapshot["current"]:
+            await player.play(snapshot["current"], start=snapshot["position"], paused=paused, add_history=False)
+        elif not player.queue.is_empty:
+            await player.play(player.queue.get())
+
+    async def _park(self, player: FurinaPlayer) -> bool:
+        try:
+            return await actors.submit(player.guild.id, self._park_now, player)
+        except MailboxFull:
+            return False
+
+    async def _park_now(self, player: FurinaPlayer) -> bool:
+        """Lưu hàng chờ rồi ngắt kết nối player không hoạt động, có thể phát tiếp bằng lệnh `restore`."""
+        if player.guild.voice_client is not player or (player.playing and not player.paused):
+            return False
+        await self.snapshots.park(player)
+        await player.disconnect()
+        embed = FooterEmbed(title="Đã rời kênh thoại vì không hoạt động",
+                            description="Dùng `!restore` hoặc `/restore` để phát tiếp hàng chờ cũ")
+        if player.guild.id in self.board.messages:
+            await self.board.close(player.guild.id, embed=embed)
+        else:
+            self._webhook(player.guild.id).send(embed=embed)
+        return True
+
+    async def get_lavalink_jar(self) -> None:
+        artifact = LavalinkArtifact(self.bot.cs, path=LAVALINK_JAR, api=LAVALINK_RELEASES_API, pinned=LAVALINK_VERSION)
+        await artifact.ensure()
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        # Lệnh chỉ có dạng slash không đi qua on_command_error, hàng chờ của actor đầy thì báo lỗi giống các lệnh khác
+        if isinstance(error.__cause__, MailboxFull):
+            embed = Embeds.error_embed(str(error.__cause__))
+            if interaction.response.is_done():
+                return await interaction.followup.send(embed=embed, ephemeral=True)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        command = interaction.command.name if interaction.command else None
+        logging.error(f"Ignoring exception in command {command!r}", exc_info=error)
 
     async def cog_check(self, ctx: commands.Context) -> bool:
+        # Lavalink chưa sẵn sàng thì báo "warming up" qua on_command_error
+        self.warmup.check()
         embed = Embeds.error_embed("")
         if not self._is_connected(ctx):
             embed.description = "Bạn cần tham gia kênh thoại để sử dụng lệnh"
             await ctx.reply(embed=embed, ephemeral=True, delete_after=10)
             return False
         if not self._is_in_music_channel(ctx):
-            embed.description = f"Lệnh này chỉ có thể dùng được ở <#{MUSIC_CHANNEL}>"
+            embed.description = f"Lệnh này chỉ có thể dùng được ở <#{self._music_channel(ctx.guild).id}>"
             await ctx.reply(embed=embed, ephemeral=True, delete_after=10)
             return False
         if not self._is_in_same_channel(ctx):
@@ -331,23 +790,62 @@ class Music(commands.Cog):
         try:
             Pool.get_node()
         except wavelink.InvalidNodeException:
-            node = Node(uri=LAVA_URI, password=LAVA_PW, heartbeat=5.0, inactive_player_timeout=None)
+            nodes = [Node(identifier="MAIN", uri=LAVA_URI, password=LAVA_PW, heartbeat=5.0, inactive_player_timeout=None)]
+            if BACKUP_LL:
+                nodes.append(Node(identifier="BACKUP", uri=BACKUP_LL, password=BACKUP_LL_PW,
+                                  heartbeat=5.0, inactive_player_timeout=None))
             await Pool.close()
+            await Pool.connect(client=self.bot, nodes=nodes)
+            for node in balancer.healthy_nodes():
+                logging.info(f"Connected to node {node.identifier} (\"{node.uri}\")")
+        await balancer.refresh()
+
+    @tasks.loop(seconds=NODE_HEALTH_INTERVAL)
+    async def node_health_check(self) -> None:
+        """Cập nhật tải của các node và chuyển player khỏi node bị mất kết nối."""
+        await balancer.refresh()
+        for node in Pool.nodes.values():
+            if node.status == NodeStatus.CONNECTED or not node.players:
+                continue
+            target = balancer.best_node(exclude=node)
+            if target is None:
+                logging.warning(f"Node {node.identifier} is down and there is no healthy node to fail over to")
+                continue
+            for player in node.players.values():
+                try:
+                    await player.switch_node(target)
+                except Exception as e:
+                    logging.error(f"Cannot move player of guild {player.guild.id} to node {target.identifier}: {e}")
+
+    @commands.Cog.listener()
+    async def on_wavelink_node_closed(self, node: Node, disconnected: list[FurinaPlayer]) -> None:
+        """Kết nối lại các player bị ngắt cùng node vào một node khác, giữ nguyên hàng chờ và vị trí."""
+        if balancer.best_node(exclude=node) is None:
+            return
+        for old in disconnected:
+            if not isinstance(old, FurinaPlayer) or not old.channel:
+                continue
             try:
-                await Pool.connect(client=self.bot, nodes=[node])
-                print(f"Connected to \"{node.uri}\"")
-            except wavelink.NodeException:
-                node = Node(uri=BACKUP_LL, password=BACKUP_LL_PW, heartbeat=5.0, inactive_player_timeout=None)
+                player = await old.channel.connect(cls=FurinaPlayer, self_deaf=True)
+                await player.restore_from(old, position=old._last_position)
+                logging.info(f"Restored player of guild {old.channel.guild.id} on node {player.node.identifier}")
+            except Exception as e:
+                logging.error(f"Cannot restore player of guild {old.channel.guild.id}: {e}")
 
     @staticmethod
     def _is_connected(ctx: commands.Context) -> bool:
         """Kiểm tra người dùng đã kết nối chưa."""
         return ctx.author.voice is not None
 
-    @staticmethod
-    def _is_in_music_channel(ctx: commands.Context) -> bool:
+    def _music_channel(self, guild: discord.Guild) -> discord.abc.GuildChannel | None:
+        """Kênh lệnh bật nhạc của guild, `None` nếu guild không đặt kênh nào."""
+        channel_id = self.bot.guild_settings.music_channel(guild.id)
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def _is_in_music_channel(self, ctx: commands.Context) -> bool:
         """Kiểm tra tin nhẵn có đang ở kênh lệnh bật nhạc không."""
-        return ctx.message.channel.id == MUSIC_CHANNEL
+        channel = self._music_channel(ctx.guild)
+        return channel is None or ctx.message.channel.id == channel.id
 
     @staticmethod
     def _is_in_same_channel(ctx: commands.Context) -> bool:
@@ -358,26 +856,78 @@ class Music(commands.Cog):
             return True
         return bot_connected.channel.id == ctx.author.voice.channel.id
 
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState,
+                                    after: discord.VoiceState) -> None:
+        """Có người vào hoặc rời kênh của bot thì kiểm tra lại trạng thái không hoạt động."""
+        player = member.guild.voice_client
+        if isinstance(player, FurinaPlayer) and player.channel in (before.channel, after.channel):
+            self.reaper.touch(player)
+
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, payload: TrackEndEventPayload):
         """Xử lý khi bài hát kết thúc."""
         player: Player = payload.player
         if not player:
             return
-        if player.autoplay == AutoPlayMode.enabled:
+        # "replaced" là do chính bot gọi `play` khi đang phát, không cần chuyển bài
+        if not isinstance(player, FurinaPlayer) or not player.guild or payload.reason == "replaced":
             return
-        if hasattr(player, "queue") and not player.queue.is_empty:
-            await player.play(player.queue.get())
+        # Hộp thư đầy vì người dùng spam lệnh cũng không được làm mất sự kiện này, nếu không nhạc sẽ dừng
+        await actors.post(player.guild.id, self._play_next, player, payload.track, payload.reason)
+
+    async def _play_next(self, player: FurinaPlayer, ended: Playable, reason: str) -> None:
+        # Track tiếp theo thường đã được kiểm tra trước bởi `TrackPrefetcher`
+        track = await self.prefetcher.next_track(player)
+        # Không tự động phát tiếp sau một track lỗi để tránh lặp lỗi liên tục
+        if not track and player.autoplay == AutoPlayMode.enabled and reason != "loadFailed":
+            track = player.autoplay_next or await self._recommend(player, ended)
+            player.autoplay_next = None
+        if track:
+            await player.play(track)
         else:
-            embed = FooterEmbed(title="Queue is empty")
-            self.webhook.send(embed=embed)
+            await self.board.show(player, self._home_channel(player))
+            self.reaper.touch(player)
+
+    async def _recommend(self, player: FurinaPlayer, seed: Playable) -> Playable | None:
+        """Chọn bài tự động phát từ lịch sử của guild, chỉ hỏi node khi chưa có gợi ý nào."""
+        exclude = {track.identifier for track in player.queue}
+        exclude.add(seed.identifier)
+        track = self.recommender.recommend(player.guild.id, exclude)
+        if track:
+            return track
+        query = (f"https://music.youtube.com/watch?v={seed.identifier}&list=RD{seed.identifier}"
+                 if seed.source == "youtube" else f"ytmsearch:{seed.author} {seed.title}")
+        try:
+            results = await Pool.fetch_tracks(query)
+        except Exception as e:
+            logging.warning(f"Cannot fetch recommendations for {seed.identifier}: {e}")
+            return None
+        tracks = results.tracks if isinstance(results, Playlist) else results
+        return next((track for track in tracks if track.identifier not in exclude), None)
+
+    async def _preselect(self, player: FurinaPlayer, seed: Playable) -> None:
+        """Chọn trước bài tự động phát trong lúc bài hiện tại vẫn đang phát."""
+        track = await self._recommend(player, seed)
+        if player.current is seed:
+            player.autoplay_next = track
 
     @commands.Cog.listener()
     async def on_wavelink_track_start(self, payload: TrackStartEventPayload):
         """Xử lý khi bài hát bắt đầu."""
         track: Playable = payload.track
-        embed = Embeds.player_embed(track=track)
-        self.webhook.send(embed=embed)
+        player = payload.player
+        if isinstance(player, FurinaPlayer) and player.guild:
+            self.recommender.record(player.guild.id, track)
+            self.history.record(player.guild.id, track)
+            self.prefetcher.schedule(player)
+            self.reaper.touch(player)
+            player.autoplay_next = None
+            if player.autoplay == AutoPlayMode.enabled and player.queue.is_empty:
+                self._spawn(self._preselect(player, player.current))
+            # Sửa lại tin nhắn điều khiển thay vì gửi tin nhắn mới cho mỗi bài
+            self.board.view.reset_votes(player.guild.id)
+            await self.board.show(player, self._home_channel(player))
 
     @commands.Cog.listener()
     async def on_wavelink_track_exception(self, payload: TrackExceptionEventPayload):
@@ -387,7 +937,8 @@ class Music(commands.Cog):
                                    f"```\n"
                                    f"{payload.exception}\n"
                                    f"```")
-        self.webhook.send(embed=embed)
+        webhook = self._webhook(payload.player.guild.id) if payload.player and payload.player.guild else self.webhook
+        webhook.send(embed=embed)
 
     @staticmethod
     def _get_player(ctx: commands.Context) -> Player:
@@ -406,7 +957,7 @@ class Music(commands.Cog):
         query: str
             Tên bài hát hoặc link dẫn đến bài hát
         """
-        await play_music(ctx, query)
+        await play_music(ctx, query, store=self.track_store)
 
     @play_command.command(name='youtube', aliases=['yt'], description="Phát một bài hát từ YouTube")
     async def play_yt_command(self, ctx: commands.Context, *, query: str):
@@ -420,7 +971,7 @@ class Music(commands.Cog):
         query: str
             Tên bài hát hoặc link dẫn đến bài hát
         """
-        await play_music(ctx, query)
+        await play_music(ctx, query, store=self.track_store)
 
     @play_command.command(name='youtubemusic', aliases=['ytm'], description="Phát một bài hát từ YouTube Music")
     async def play_ytm_command(self, ctx: commands.Context, *, query: str):
@@ -434,7 +985,7 @@ class Music(commands.Cog):
         query: str
             Tên bài hát hoặc link dẫn đến bài hát
         """
-        await play_music(ctx, query, TrackSource.YouTubeMusic)
+        await play_music(ctx, query, TrackSource.YouTubeMusic, store=self.track_store)
 
     @play_command.command(name='soundcloud', aliases=['sc'], description="Phát một bài hát từ SoundCloud")
     async def play_sc_command(self, ctx: commands.Context, *, query: str):
@@ -448,7 +999,18 @@ class Music(commands.Cog):
         query: str
             Tên bài hát hoặc link dẫn đến bài hát
         """
-        await play_music(ctx, query, TrackSource.SoundCloud)
+        await play_music(ctx, query, TrackSource.SoundCloud, store=self.track_store)
+
+    @play_yt_command.autocomplete("query")
+    @play_ytm_command.autocomplete("query")
+    @play_sc_command.autocomplete("query")
+    async def play_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice]:
+        """Gợi ý các bài đã phát trong guild, trả lời từ bộ nhớ nên không tìm kiếm lại."""
+        if not interaction.guild_id:
+            return []
+        return [app_commands.Choice(name=track.title[:100],
+                                    value=track.uri if track.uri and len(track.uri) <= 100 else track.title[:100])
+                for track in self.history.suggest(interaction.guild_id, current)]
 
     @commands.hybrid_command(name='search', aliases=['s'], description="Tìm kiếm một bài hát.")
     async def search_command(self, ctx: commands.Context, *, query: str):
@@ -464,37 +1026,30 @@ class Music(commands.Cog):
         """
         await ctx.defer()
         msg = await ctx.reply(embed=FooterEmbed(description=f"**Đang tìm kiếm:** `{query}`"))
-        tracks_yt = []
-        for yttrack in YoutubeSearch(query, 5).to_dict():
-            for key, value in yttrack.items():
-                if key == "id":
-                    results = await Playable.search(f"https://youtu.be/{value}")
-                    tracks_yt.append(results[0])
-
-        tracks_sc: wavelink.Search = await Playable.search(query, source=TrackSource.SoundCloud)
-
-
-        view = SelectTrackView(tracks_yt[:5], tracks_sc[:5])
-        tracks = tracks_yt[:5] + tracks_sc[:5]
+        tracks_yt, tracks_sc = await fan_out_search(query, limit=5, store=self.track_store)
 
-        if len(tracks) == 0:
-            return msg.edit(embed=Embeds.error_embed(f"Không tìm thấy kết quả nào cho `query`"))
-        else:
-            await msg.edit(embed=FooterEmbed(title=f"Kết quả tìm kiếm cho `{query}`"), view=view)
+        if not tracks_yt and not tracks_sc:
+            return await msg.edit(embed=Embeds.error_embed(f"Không tìm thấy kết quả nào cho `{query}`"))
+        view = SelectTrackView(tracks_yt, tracks_sc)
+        view.message = await msg.edit(embed=FooterEmbed(title=f"Kết quả tìm kiếm cho `{query}`"), view=view)
 
     @commands.hybrid_command(name='pause', description="Tạm dừng việc phát nhạc")
     async def pause_command(self, ctx: commands.Context) -> None:
         """Tạm dừng việc phát nhạc."""
-        player: Player = self._get_player(ctx)
+        player: FurinaPlayer = self._get_player(ctx)
         await player.pause(True)
+        self.reaper.touch(player)
+        await self.board.show(player, None)
         embed = FooterEmbed(title="Đã tạm dừng chơi nhạc", description="Dùng `!resume` hoặc `/resume` để tiếp tục")
         await ctx.reply(embed=embed)
 
     @commands.hybrid_command(name='resume', description="Tiếp tục việc phát nhạc")
     async def resume_command(self, ctx: commands.Context) -> None:
         """Tiếp tục việc phát nhạc."""
-        player: Player = self._get_player(ctx)
+        player: FurinaPlayer = self._get_player(ctx)
         await player.pause(False)
+        self.reaper.touch(player)
+        await self.board.show(player, None)
         embed = FooterEmbed(title="Đã tiếp tục chơi nhạc", description="Dùng `!pause` hoặc `/pause` để tạm dừng")
         await ctx.reply(embed=embed)
 
@@ -527,30 +1082,40 @@ class Music(commands.Cog):
     @commands.hybrid_command(name='nowplaying', aliases=['np', 'now', 'current'], description="Đang phát bài gì thế?")
     async def nowplaying_command(self, ctx: commands.Context):
         """Xem bài hát đang phát."""
-        player: Player = self._get_player(ctx)
-        await ctx.reply(embed=Embeds.nowplaying_embed(player))
+        player: FurinaPlayer = self._get_player(ctx)
+        if not player or not player.current:
+            return await ctx.reply(embed=Embeds.error_embed("Hiện đang không phát bất cứ thứ gì"))
+        # Đưa tin nhắn điều khiển xuống cuối kênh thay vì tạo thêm một embed nữa
+        await self.board.repost(player, ctx.reply)
 
     @commands.hybrid_command(name='skip', description="Bỏ qua bài hát hiện tại.")
     async def skip_command(self, ctx: commands.Context):
         """Bỏ qua bài hát hiện tại."""
         player: Player = self._get_player(ctx)
+        await ctx.reply(embed=await actors.submit(ctx.guild.id, self._skip, player))
+
+    @staticmethod
+    async def _skip(player: Player) -> Embed:
         track = player.current
-        if track:
-            embed = Embed().set_author(name=f"Đã skip {track}", icon_url=SKIP_EMOJI)
-            await player.seek(track.length)
-        else:
-            embed = Embeds.error_embed("Hiện đang không phát bất cứ thứ gì")
-        await ctx.reply(embed=embed)
+        if not track:
+            return Embeds.error_embed("Hiện đang không phát bất cứ thứ gì")
+        await player.seek(track.length)
+        return Embed().set_author(name=f"Đã skip {track}", icon_url=SKIP_EMOJI)
 
     @commands.hybrid_command(name='stop', description="Dừng phát nhạc và xóa hàng chờ")
     async def stop_playing(self, ctx: commands.Context):
         """Tạm dừng phát nhạc và xóa hàng chờ."""
         player: Player = self._get_player(ctx)
+        await actors.submit(ctx.guild.id, self._stop, player)
+        self.reaper.touch(player)
+        embed = Embed().set_author(name=f"Đã dừng phát nhạc và xóa toàn bộ hàng chờ", icon_url=SKIP_EMOJI)
+        await ctx.reply(embed=embed)
+
+    @staticmethod
+    async def _stop(player: Player) -> None:
         player.queue.clear()
         player.autoplay = AutoPlayMode.disabled
         await player.stop(force=True)
-        embed = Embed().set_author(name=f"Đã dừng phát nhạc và xóa toàn bộ hàng chờ", icon_url=SKIP_EMOJI)
-        await ctx.reply(embed=embed)
 
     @commands.hybrid_command(name='queue', aliases=['q'], description="Xem chi tiết hàng chờ.")
     async def queue_command(self, ctx: commands.Context):
@@ -558,41 +1123,11 @@ class Music(commands.Cog):
         await self._show_queue(ctx)
 
     async def _show_queue(self, ctx: commands.Context):
-        embeds: list[Embed] | Embed = self._queue_embeds(ctx)
-        if isinstance(embeds, Embed):
-            return await ctx.reply(embed=embeds)
-        view = PaginatedView(timeout=60, embeds=embeds)
-        view.message = await ctx.reply(embed=embeds[0], view=view)
-
-    def _queue_embeds(self, ctx: commands.Context) -> list[Embed] | Embed:
-        player: Player = self._get_player(ctx)
+        player: FurinaPlayer = self._get_player(ctx)
         if player.queue.is_empty:
-            embed: Embed = FooterEmbed(title="Hàng chờ trống!")
-            return embed
-        queue_embeds: list[Embed] = []
-        q: str = ""
-        for i, track in enumerate(player.queue, 1):
-            q += f"{i}. [**{track}**](<{track.uri}>) ({format_len(track.length)})\n"
-            if i % 10 == 0:
-                embed: Embed = self._create_queue_embed(player, q)
-                queue_embeds.append(embed)
-                q = ""
-        if q:
-            embed: Embed = self._create_queue_embed(player, q)
-            queue_embeds.append(embed)
-        return queue_embeds
-
-    def _create_queue_embed(self, player: Player, q: str) -> Embed:
-        embed = FooterEmbed(color=Color.blue(),
-                                   title=f"Hàng chờ: {player.queue.count} bài hát",
-                                   description=q)
-        if player.playing:
-            track = player.current
-            embed.add_field(
-                name="Đang phát",
-                value=f"[**{track}**](<{track.uri}>) ({format_len(track.length)})"
-                )
-        return embed
+            return await ctx.reply(embed=FooterEmbed(title="Hàng chờ trống!"))
+        view = QueueView(player)
+        view.message = await ctx.reply(embed=view.render(), view=view)
 
     @app_commands.command(name='remove', description="Xóa một bài hát khỏi hàng chờ")
     async def remove_slashcommand(self, interaction: discord.Interaction, track_name: str):
@@ -606,28 +1141,108 @@ class Music(commands.Cog):
         track_name
             Tên bài hát cần xóa
         """
-        player: Player = self._get_player(interaction)
-        player.queue.remove(track for track in player.queue if track.title == track_name)
-        deleted: str = track_name
+        player: FurinaPlayer = self._get_player(interaction)
+        deleted = await actors.submit(interaction.guild_id, self._remove, player, track_name)
+        if deleted is None:
+            return await interaction.response.send_message(
+                embed=Embeds.error_embed(f"Không tìm thấy `{track_name}` trong hàng chờ"), ephemeral=True
+            )
 
         await interaction.response.send_message(embed=Embed(title=f"Đã xóa {deleted} khỏi hàng chờ."))
 
+    @staticmethod
+    async def _remove(player: FurinaPlayer, track_name: str) -> Playable | None:
+        # Autocomplete trả về identifier, nếu người dùng tự gõ tên thì lấy kết quả khớp đầu tiên
+        deleted = player.queue.remove_identifier(track_name)
+        if deleted is None:
+            matches = player.queue.search(track_name, limit=1)
+            deleted = player.queue.remove_identifier(matches[0].identifier) if matches else None
+        return deleted
+
     @remove_slashcommand.autocomplete("track_name")
     async def remove_slashcommand_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice]:
-        player: Player = self._get_player(interaction)
-        return [app_commands.Choice(name=track.title, value=track.title) for track in player.queue if current.lower() in track.title.lower()][:25]
+        player: FurinaPlayer = self._get_player(interaction)
+        if not player:
+            return []
+        return [app_commands.Choice(name=track.title[:100], value=track.identifier)
+                for track in player.queue.search(current, limit=25)]
     
     @commands.command(name='remove', aliases=['rm', 'delete'], description="Xóa một bài hát khỏi hàng chờ")
-    async def remove_prefixcommand(self, ctx: commands.Context):
-        player: Player = self._get_player(ctx)
-        if player.queue.is_empty:
-            return
-        track_index = player.queue.count - 1
-        deleted: Playable = player.queue[track_index]
-        del player.queue[track_index]
+    async def remove_prefixcommand(self, ctx: commands.Context, position: int = None):
+        """
+        Xóa một bài hát khỏi hàng chờ.
+
+        Parameters
+        -----------
+        ctx
+            commands.Context
+        position
+            Vị trí của bài hát trong hàng chờ, mặc định là bài cuối cùng
+        """
+        player: FurinaPlayer = self._get_player(ctx)
+        deleted = await actors.submit(ctx.guild.id, self._remove_at, player, position)
+        if deleted is None:
+            return await ctx.reply(embed=Embeds.error_embed("Vị trí không hợp lệ"))
         await ctx.reply(embed=Embed(title=f"Đã xóa {deleted} khỏi hàng chờ."))  
         await self._show_queue(ctx)
 
+    @staticmethod
+    async def _remove_at(player: FurinaPlayer, position: int | None) -> Playable | None:
+        index = player.queue.count - 1 if position is None else position - 1
+        if not 0 <= index < player.queue.count:
+            return None
+        deleted: Playable = player.queue[index]
+        player.queue.delete(index)
+        return deleted
+
+    @commands.hybrid_command(name='move', aliases=['mv'], description="Di chuyển một bài hát trong hàng chờ")
+    async def move_command(self, ctx: commands.Context, source: int, destination: int):
+        """
+        Di chuyển một bài hát tới vị trí khác trong hàng chờ.
+
+        Parameters
+        -----------
+        ctx
+            commands.Context
+        source
+            Vị trí hiện tại của bài hát
+        destination
+            Vị trí mới của bài hát
+        """
+        player: FurinaPlayer = self._get_player(ctx)
+        moved = await actors.submit(ctx.guild.id, self._move, player, source, destination)
+        if moved is None:
+            return await ctx.reply(embed=Embeds.error_embed("Vị trí không hợp lệ"))
+        await ctx.reply(embed=FooterEmbed(title=f"Đã chuyển {moved} tới vị trí {destination}"))
+
+    @staticmethod
+    async def _move(player: FurinaPlayer, source: int, destination: int) -> Playable | None:
+        count = player.queue.count
+        if not (1 <= source <= count and 1 <= destination <= count):
+            return None
+        return player.queue.move(source - 1, destination - 1)
+
+    @commands.hybrid_command(name='shuffle', description="Xáo trộn hàng chờ")
+    async def shuffle_command(self, ctx: commands.Context, start: int = 1, end: int = None):
+        """
+        Xáo trộn hàng chờ, hoặc chỉ các bài từ vị trí `start` tới `end`.
+
+        Parameters
+        -----------
+        ctx
+            commands.Context
+        start
+            Vị trí bắt đầu, mặc định là đầu hàng chờ
+        end
+            Vị trí kết thúc, mặc định là cuối hàng chờ
+        """
+        player: FurinaPlayer = self._get_player(ctx)
+        await actors.submit(ctx.guild.id, self._shuffle, player, start, end)
+        await ctx.reply(embed=FooterEmbed(title="Đã xáo trộn hàng chờ"))
+
+    @staticmethod
+    async def _shuffle(player: FurinaPlayer, start: int, end: int | None) -> None:
+        player.queue.shuffle(max(start - 1, 0), end)
 
     @commands.hybrid_command(name='loop', aliases=['repeat'], description="Chuyển đổi giữa các chế độ lặp")
     async def loop_command(self, ctx: commands.Context) -> None:
@@ -635,10 +1250,105 @@ class Music(commands.Cog):
         view = LoopView(player=player)
         view.message = await ctx.reply(view=view)
 
+    @commands.hybrid_command(name='restore', description="Phát tiếp hàng chờ cũ sau khi bot rời kênh vì không hoạt động")
+    async def restore_command(self, ctx: commands.Context):
+        """Phát tiếp hàng chờ đã lưu khi bot tự rời kênh thoại."""
+        snapshot = await self.snapshots.load_parked(ctx.guild.id)
+        if not snapshot:
+            return await ctx.reply(embed=Embeds.error_embed("Không có hàng chờ nào để khôi phục"))
+        await ctx.reply(embed=await actors.submit(ctx.guild.id, self._restore_parked, ctx, snapshot))
+
+    async def _restore_parked(self, ctx: commands.Context, snapshot: dict) -> Embed:
+        player = await ensure_voice_connection(ctx)
+        if not player:
+            return Embeds.error_embed("Bot không kết nối được với kênh thoại")
+        player.home = ctx.channel
+        await self._apply_snapshot(player, snapshot, paused=False)
+        await self.snapshots.delete(ctx.guild.id)
+        restored = len(snapshot["queue"]) + bool(snapshot["current"])
+        return FooterEmbed(title=f"Đã khôi phục {restored} bài hát")
+
+    @commands.hybrid_group(name='playlist', aliases=['pl'], description="Lưu và phát lại các playlist")
+    async def playlist_command(self, ctx: commands.Context):
+        """Xem các playlist đã lưu của bạn và của server."""
+        embed = FooterEmbed(title="Playlist đã lưu")
+        for title, guild in (("Của bạn", False), ("Của server", True)):
+            owner_id = ctx.guild.id if guild else ctx.author.id
+            names = await self.playlists.names(owner_id, guild=guild)
+            value = "\n".join(f"- `{name}` ({size} bài)" for name, size in names[:20]) or "Chưa có playlist nào"
+            embed.add_field(name=title, value=value, inline=False)
+        await ctx.reply(embed=embed)
+
+    @playlist_command.command(name='save', description="Lưu bài đang phát và hàng chờ thành một playlist")
+    async def playlist_save(self, ctx: commands.Context, name: str, server: bool = False):
+        """
+        Lưu bài đang phát và hàng chờ thành một playlist
+
+        Parameters
+        -----------
+        ctx: commands.Context
+            Context
+        name: str
+            Tên playlist, trùng tên thì ghi đè
+        server: bool
+            Lưu thành playlist chung của server
+        """
+        player: FurinaPlayer = self._get_player(ctx)
+        if not player or (not player.current and player.queue.is_empty):
+            return await ctx.reply(embed=Embeds.error_embed("Hàng chờ đang trống"))
+        tracks = ([player.current] if player.current else []) + list(player.queue)
+        owner_id = ctx.guild.id if server else ctx.author.id
+        saved = await self.playlists.save(owner_id, name[:100], tracks[:PLAYLIST_MAX_TRACKS], guild=server)
+        await ctx.reply(embed=FooterEmbed(title=f"Đã lưu {saved} bài hát vào playlist `{name[:100]}`"))
+
+    @playlist_command.command(name='load', description="Thêm một playlist đã lưu vào hàng chờ")
+    async def playlist_load(self, ctx: commands.Context, name: str, server: bool = False):
+        """
+        Thêm một playlist đã lưu vào hàng chờ, không cần tìm kiếm lại từng bài
+
+        Parameters
+        -----------
+        ctx: commands.Context
+            Context
+        name: str
+            Tên playlist
+        server: bool
+            Lấy playlist chung của server
+        """
+        owner_id = ctx.guild.id if server else ctx.author.id
+        started = time.perf_counter()
+        playlist = await self.playlists.load(owner_id, name, guild=server)
+        if not playlist:
+            return await ctx.reply(embed=Embeds.error_embed(f"Không có playlist nào tên `{name}`"))
+        logging.info(f"Loaded saved playlist {playlist.name!r} ({len(playlist.tracks)} tracks) "
+                     f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+        await add_to_queue(ctx, playlist)
+
+    @playlist_command.command(name='delete', description="Xóa một playlist đã lưu")
+    async def playlist_delete(self, ctx: commands.Context, name: str, server: bool = False):
+        """
+        Xóa một playlist đã lưu
+
+        Parameters
+        -----------
+        ctx: commands.Context
+            Context
+        name: str
+            Tên playlist
+        server: bool
+            Xóa playlist chung của server
+        """
+        owner_id = ctx.guild.id if server else ctx.author.id
+        if not await self.playlists.delete(owner_id, name, guild=server):
+            return await ctx.reply(embed=Embeds.error_embed(f"Không có playlist nào tên `{name}`"))
+        await ctx.reply(embed=FooterEmbed(title=f"Đã xóa playlist `{name}`"))
+
     @commands.hybrid_command(name='connect', aliases=['j', 'join'], description="Kết nối bot vào kênh thoại")
     async def connect_command(self, ctx: commands.Context):
         """Gọi bot vào kênh thoại"""
-        player: Player = await ensure_voice_connection(ctx)
+        player = await actors.submit(ctx.guild.id, ensure_voice_connection, ctx)
+        if not player:
+            return await ctx.reply(embed=Embeds.error_embed("Bot không kết nối được với kênh thoại"))
         embed = FooterEmbed(title="— Đã kết nối!", description=f"Đã vào kênh {player.channel.mention}.")
         await ctx.reply(embed=embed)
 
@@ -647,6 +1357,7 @@ class Music(commands.Cog):
         if ctx.voice_client:
             embed = FooterEmbed(title="— Đã ngắt kết nối!", description=f"Đã rời kênh {ctx.voice_client.channel.mention}")
             await ctx.voice_client.disconnect(force=True)
+            await self.board.close(ctx.guild.id, embed=embed)
         else:
             embed = Embeds.error_embed("Bot không nằm trong kênh thoại nào.")
         await ctx.reply(embed=embed)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import asqlite, platform, discord, random, psutil, wavelink, aiohttp
+import platform, discord, random, re, wavelink, aiohttp
 from discord.ext import commands
 from discord import app_commands
 from enum import Enum
@@ -9,6 +9,7 @@ from discord.ui import Select
 
 
 from _classes.embeds import *
+from _classes.nodes import balancer
 from _classes.views import PaginatedView, TimeoutView, SelectView
 
 if TYPE_CHECKING:
@@ -30,7 +31,7 @@ class HelpSelect(Select):
 
     async def callback(self, interaction: discord.Interaction) -> None:
         embed = CommandListEmbed(
-            prefix=self.bot.prefixes.get(interaction.guild.id) or DEFAULT_PREFIX,  
+            prefix=self.bot.guild_settings.prefix(interaction.guild.id),  
             cog=self.bot.get_cog(self.values[0])
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -64,7 +65,7 @@ class Utils(commands.Cog):
 
         if message.content == '<@1131530915223441468>':
             embed = FooterEmbed(
-                description=(f"My Prefix is `{self.bot.prefixes.get(message.guild.id) or DEFAULT_PREFIX}`\n"
+                description=(f"My Prefix is `{self.bot.guild_settings.prefix(message.guild.id)}`\n"
                               "### I also support slash commands \n-> Type `/` to see commands i can do!\n"
                               "### Or you can select one category below to see all the commands."), 
                 color=Color.blue()
@@ -94,42 +95,67 @@ class Utils(commands.Cog):
         embed = AvatarEmbed(title="— Thành công!", user=ctx.author)
         embed.add_field(name="Độ trễ:", value=f"**Bot:** {bot_latency * 1000:.2f}ms\n**Voice:** {voice_latency}ms")
 
-        for i, node in enumerate(wavelink.Pool.nodes, 1):
-            node_ = wavelink.Pool.get_node(node)
-            if node_.status == wavelink.NodeStatus.CONNECTED:
+        for i, node in enumerate(wavelink.Pool.nodes.values(), 1):
+            if node.status == wavelink.NodeStatus.CONNECTED:
                 node_status = ":white_check_mark:"
-            elif node_.status == wavelink.NodeStatus.CONNECTING:
+            elif node.status == wavelink.NodeStatus.CONNECTING:
                 node_status = ":arrows_clockwise:"
             else:
                 node_status = ":negative_squared_cross_mark:"
-            embed.add_field(name=f"Node {i}: {node_status}",
-                            value="")
+            stats = balancer.stats.get(node.identifier)
+            if stats:
+                value = (f"**Players:** {stats.playing}/{stats.players}\n"
+                         f"**CPU:** {stats.cpu.system_load:.0%}\n"
+                         f"**Load:** {balancer.load(node):.1f}")
+            else:
+                value = f"**Players:** {len(node.players)}"
+            if music := self.bot.get_cog("Music"):
+                reaper = music.reaper
+                value += (f"\n**Reaped:** {reaper.reaped_by_node[node.identifier]} "
+                          f"(load {-reaper.load_freed[node.identifier]:+.1f})")
+            embed.add_field(name=f"Node {i} ({node.identifier}): {node_status}",
+                            value=value)
         await ctx.reply(embed=embed)
 
     @commands.command(name="prefix", description="Set a custom prefix for your server")
     async def prefix_command(self, ctx: commands.Context, prefix: str):
         """Set a custom prefix or clear it with 'clear' or 'reset'"""
-        async with asqlite.connect("config.db") as db:
-            if prefix in ['clear', 'reset', 'default']:
-                await db.execute(
-                    f"""DELETE FROM custom_prefixes
-                        WHERE guild_id = {ctx.guild.id}"""
-                )
-            else:
-                await db.execute(
-                    """INSERT INTO custom_prefixes ( guild_id, prefix )
-                       VALUES ( ?, ? )
-                       ON CONFLICT(guild_id) DO UPDATE SET
-                       prefix = excluded.prefix""", (ctx.guild.id, prefix)
-                )
-            await db.commit()
-        await self.bot.update_prefixes()
+        await self.bot.guild_settings.update(ctx.guild.id, prefix=None if prefix in ['clear', 'reset', 'default'] else prefix)
+        await ctx.reply(
+            embed=FooterEmbed(
+                description=f"Prefix for this server has been changed to `{self.bot.guild_settings.prefix(ctx.guild.id)}`"
+            )
+        )
+
+    @commands.command(name="musicchannel", description="Set the channel where music commands can be used")
+    @commands.has_permissions(manage_guild=True)
+    async def music_channel_command(self, ctx: commands.Context, channel: Optional[discord.TextChannel] = None):
+        """Set the music channel to `channel`, or reset it to the default without one"""
+        await self.bot.guild_settings.update(ctx.guild.id, music_channel=channel.id if channel else None)
+        channel_id = self.bot.guild_settings.music_channel(ctx.guild.id)
         await ctx.reply(
             embed=FooterEmbed(
-                description=f"Prefix for this server has been changed to `{self.bot.prefixes.get(ctx.guild.id) or DEFAULT_PREFIX}`"
+                description=f"Music channel for this server has been changed to <#{channel_id}>" if channel_id
+                            else "Music commands can now be used in any channel"
             )
         )
 
+    @commands.command(name="musicwebhook", description="Set the webhook used for music notifications")
+    @commands.has_permissions(manage_guild=True)
+    async def music_webhook_command(self, ctx: commands.Context, url: str):
+        """Set the music webhook url or clear it with 'clear' or 'reset'"""
+        # The url is a secret, do not leave it in the channel
+        try:
+            await ctx.message.delete()
+        except discord.HTTPException:
+            pass
+        if url in ['clear', 'reset', 'default']:
+            url = None
+        elif not re.match(r"https://(?:\w+\.)?discord(?:app)?\.com/api/webhooks/\d+/[\w-]+", url):
+            return await ctx.send(embed=FooterEmbed(description="That is not a Discord webhook url"))
+        await self.bot.guild_settings.update(ctx.guild.id, webhook=url)
+        await ctx.send(embed=FooterEmbed(description="Music webhook for this server has been updated"))
+
     @commands.command(name='source', aliases=['sources', 'src'], description="Source code of the bot")
     async def source_command(self, ctx: commands.Context):
         await ctx.reply("https://github.com/Th4nhZ/FurinaBot")
@@ -155,7 +181,7 @@ class Utils(commands.Cog):
         # !help <CogName>
         cog = self.bot.get_cog(category_or_command_name.capitalize())
         if cog and cog.__cog_name__ != "Hidden":
-            embed = CommandListEmbed(prefix=self.bot.prefixes.get(ctx.guild.id) or DEFAULT_PREFIX, cog=cog)
+            embed = CommandListEmbed(prefix=self.bot.guild_settings.prefix(ctx.guild.id), cog=cog)
             return await ctx.reply(embed=embed)
         
         # !help <Command>
@@ -173,6 +199,7 @@ class Utils(commands.Cog):
 
     @commands.command(name='vps', description="VPS Info")
     async def vps_command(self, ctx: commands.Context):
+        import psutil
         # OS Version
         os_version = platform.platform()
 
@@ -238,9 +265,11 @@ class Utils(commands.Cog):
         embed.add_field(name="Account Created:", value=f"<t:{account_created}>\n<t:{account_created}:R>")
         server_joined = int(member.created_at.timestamp())
         embed.add_field(name="Server Joined:", value=f"<t:{server_joined}>\n<t:{server_joined}:R>")
-        embed.add_field(name="Status: ", value=MemberStatus[str(member.status)].value)
+        # Status and activity only exist with the presences intent, see `CACHE_PROFILE`
+        if self.bot.intents.presences:
+            embed.add_field(name="Status: ", value=MemberStatus[str(member.status)].value)
         embed.add_field(name="Roles:", value=", ".join(role.mention for role in reversed(member.roles) if role.name != '@everyone'))
-        if member.activity:
+        if self.bot.intents.presences and member.activity:
             embed.add_field(
                 name="Activity:",
                 value=f"**{str.capitalize(member.activity.type.name)}**: `{member.activity.name}`"
@@ -0,0 +1,68 @@
+"""
+Loading a playlist into a queue that already holds tracks, per track against in bulk.
+
+The queue starts with `--queued` tracks and a `--size` track playlist is added to it,
+`--duplicates` of which are already queued and get skipped.
+
+- before: `wavelink.Queue`, a linear `track in queue` check then `put_wait` for every track
+- after: `music.put_a_playlist` on a `FurinaQueue`, O(1) duplicate checks and one `put_wait`
+
+    python benchmarks/bulk_enqueue.py [--queued 5000] [--size 5000] [--duplicates 0.1] [--runs 5]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, statistics, time, types
+from typing import Any, Awaitable, Callable, List
+
+import fakes
+
+
+async def measure(add: Callable[[Any, List[Any]], Awaitable[Any]], make_queue: Callable[[], Any],
+                  queued: List[Any], playlist: List[Any], runs: int) -> tuple[float, int]:
+    timings = []
+    for _ in range(runs):
+        queue = make_queue()
+        queue.put(queued)
+        begin = time.perf_counter()
+        await add(queue, playlist)
+        timings.append(time.perf_counter() - begin)
+    return statistics.median(timings), len(queue)
+
+
+async def run(args: argparse.Namespace) -> None:
+    from wavelink import Queue
+    from _classes.queue import FurinaQueue
+    from _extensions import music
+
+    queued = fakes.tracks(args.queued, prefix="q")
+    duplicates = int(args.size * args.duplicates)
+    playlist = queued[:duplicates] + fakes.tracks(args.size - duplicates, prefix="p")
+
+    async def before(queue: Queue, tracks: List[Any]) -> None:
+        for track in tracks:
+            if track not in queue:
+                await queue.put_wait(track)
+
+    async def after(queue: FurinaQueue, tracks: List[Any]) -> None:
+        # Already playing, so `put_a_playlist` does not call the node
+        player = types.SimpleNamespace(queue=queue, playing=True)
+        await music.put_a_playlist(playlist=types.SimpleNamespace(tracks=tracks), player=player)
+
+    print(f"{args.size} track playlist ({duplicates} already queued) into a {args.queued} track queue, "
+          f"median of {args.runs}")
+    for name, add, make_queue in (("before", before, Queue), ("after", after, FurinaQueue)):
+        elapsed, length = await measure(add, make_queue, queued, playlist, args.runs)
+        print(f"  {name:<7} {elapsed * 1000:9.1f} ms  queue length {length}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queued", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Fraction of the playlist already queued")
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
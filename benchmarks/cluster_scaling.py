@@ -0,0 +1,133 @@
+"""
+Gateway event throughput with the shards split over 1, 2 and 4 processes.
+
+A fake gateway streams `--events` `MESSAGE_CREATE` events, spread evenly over `--shards`
+shards, to clusters started like `ClusterLauncher` starts them: one spawned process per
+group of `split_shards`. Each process parses every event into a `discord.Message` and
+runs `Bot.get_context` on it, the CPU bound part of handling a command message. The
+clock starts once every process is connected, so interpreter start up is not counted.
+
+Scaling is bounded by the number of CPU cores, on a single core more processes only
+add overhead.
+
+    python benchmarks/cluster_scaling.py [--events 20000] [--shards 8] [--processes 1 2 4]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, json, multiprocessing, os, sys, time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def message_event(i: int) -> Dict[str, Any]:
+    return {"t": "MESSAGE_CREATE", "d": {
+        "id": str(10 ** 17 + i), "channel_id": "1", "guild_id": None,
+        "author": {"id": str(1000 + i % 300), "username": "user", "discriminator": "0", "avatar": None,
+                   "global_name": "User"},
+        "content": "!play em của ngày hôm qua", "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": [], "embeds": [], "pinned": False, "type": 0}}
+
+
+def cluster(cluster_id: int, shard_ids: List[int], port: int) -> None:
+    """One cluster process, handles the events of its shards then reports how many were commands"""
+    async def run() -> None:
+        import discord
+        from discord.ext import commands
+
+        bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+
+        @bot.command()
+        async def play(ctx: commands.Context, *, query: str) -> None:
+            pass
+
+        state = bot._connection
+        state.user = discord.ClientUser(state=state, data={"id": "999", "username": "Furina",
+                                                            "discriminator": "0", "avatar": None})
+        channel = discord.DMChannel(me=None, state=state, data={"id": "1", "recipients": [], "type": 1})
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(json.dumps(shard_ids).encode() + b"\n")
+        await writer.drain()
+        commands_found = 0
+        async for line in reader:
+            payload = json.loads(line)
+            if payload["t"] == "END":
+                break
+            message = discord.Message(state=state, channel=channel, data=payload["d"])
+            ctx = await bot.get_context(message)
+            commands_found += ctx.command is not None
+        writer.write(json.dumps(commands_found).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+    asyncio.run(run())
+
+
+async def measure(processes: int, shards: int, events: int) -> Dict[str, float]:
+    from _classes.cluster import split_shards
+
+    groups = split_shards(shards, processes)
+    connected: List[asyncio.StreamWriter] = []
+    all_connected = asyncio.Event()
+    finished: List[int] = []
+    begin = 0.0
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        nonlocal begin
+        shard_ids = json.loads(await reader.readline())
+        connected.append(writer)
+        if len(connected) == len(groups):
+            begin = time.perf_counter()
+            all_connected.set()
+        await all_connected.wait()
+        for i in range(events * len(shard_ids) // shards):
+            writer.write(json.dumps(message_event(i)).encode() + b"\n")
+            if i % 1000 == 0:
+                await writer.drain()
+        writer.write(b'{"t": "END"}\n')
+        await writer.drain()
+        finished.append(json.loads(await reader.readline()))
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    context = multiprocessing.get_context("spawn")
+    children = [context.Process(target=cluster, args=(cluster_id, shard_ids, port))
+                for cluster_id, shard_ids in enumerate(groups)]
+    for child in children:
+        child.start()
+    try:
+        while len(finished) < len(children):
+            if any(child.exitcode for child in children):
+                raise RuntimeError("A cluster process failed")
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - begin
+    finally:
+        for child in children:
+            child.join(timeout=10)
+            if child.is_alive():
+                child.kill()
+        server.close()
+    return {"elapsed": elapsed, "commands": sum(finished)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{args.events} events over {args.shards} shards, {os.cpu_count()} CPU core(s)")
+    baseline = None
+    for processes in args.processes:
+        result = asyncio.run(measure(processes, args.shards, args.events))
+        rate = result["commands"] / result["elapsed"]
+        baseline = baseline or rate
+        print(f"  {processes} process(es)  {rate:9,.0f} events/s  {result['elapsed']:6.2f} s  "
+              f"x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
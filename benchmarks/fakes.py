@@ -0,0 +1,171 @@
+"""
+Local stand-ins for Lavalink used by the benchmarks, nothing here talks to the network.
+
+`FakeNode` answers the REST and websocket API of a Lavalink v4 node. Loading a track
+sleeps for `load_delay(identifier)` seconds first, so a benchmark can inject latency per
+source or a slow tail.
+"""
+from __future__ import annotations
+
+import asyncio, base64, os, sys, time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+INFO = {"version": {"semver": "4.0.8", "major": 4, "minor": 0, "patch": 8, "preRelease": None, "build": None},
+        "buildTime": 0, "git": {"branch": "main", "commit": "0", "commitTime": 0}, "jvm": "17",
+        "lavaplayer": "2.2.2", "sourceManagers": ["youtube", "soundcloud"], "filters": [], "plugins": []}
+STATS = {"players": 0, "playingPlayers": 0, "uptime": 1000,
+         "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+         "cpu": {"cores": 1, "systemLoad": 0.0, "lavalinkLoad": 0.0}}
+
+
+def track_payload(identifier: str, *, title: Optional[str] = None, source: str = "youtube",
+                  length: int = 200_000) -> Dict[str, Any]:
+    """A Lavalink track object, `encoded` has the usual size but is not decodable by a real node"""
+    uri = (f"https://www.youtube.com/watch?v={identifier}" if source == "youtube"
+           else f"https://soundcloud.com/bench/{identifier}")
+    return {
+        "encoded": base64.b64encode(f"{source}:{identifier}".encode().ljust(240, b"\0")).decode(),
+        "info": {"identifier": identifier, "isSeekable": True, "author": "Bench", "length": length,
+                 "isStream": False, "position": 0, "title": title or f"Track {identifier}", "uri": uri,
+                 "sourceName": source, "artworkUrl": None, "isrc": None},
+        "pluginInfo": {}, "userData": {},
+    }
+
+
+def tracks(count: int, *, prefix: str = "t", source: str = "youtube") -> List[Any]:
+    """`count` distinct `wavelink.Playable`, built locally"""
+    from wavelink import Playable
+    return [Playable(track_payload(f"{prefix}{i:09d}", title=f"Bench song {prefix}{i}", source=source))
+            for i in range(count)]
+
+
+class FakeNode:
+    """
+    A Lavalink v4 node answering `/v4/loadtracks` from synthetic tracks.
+
+    - `https://youtu.be/<id>` and `https://www.youtube.com/watch?v=<id>` load one track
+    - `<prefix>search:<query>` loads `search_results` tracks of that source
+    - identifiers in `unavailable` load as `empty`, like a removed video
+
+    Parameters
+    -----------
+    load_delay: `Callable[[str], float]`
+        Seconds to wait before answering a load of the identifier
+    search_results: `int`
+        Tracks returned by a search
+    """
+    def __init__(self, *, load_delay: Callable[[str], float] = lambda identifier: 0.0,
+                 search_results: int = 5) -> None:
+        self.load_delay = load_delay
+        self.search_results = search_results
+        self.unavailable: set[str] = set()
+        self.loads: int = 0
+        self.player_updates: List[tuple[float, Dict[str, Any]]] = []
+        self.on_player_update: Optional[Callable[[str, Dict[str, Any]], Any]] = None
+        self.sockets: List[Any] = []
+        self._runner = None
+
+    def load(self, identifier: str) -> Dict[str, Any]:
+        if identifier.startswith(("https://youtu.be/", "https://www.youtube.com/watch?v=")):
+            video = identifier.rsplit("/", 1)[-1].rsplit("=", 1)[-1]
+            if video in self.unavailable:
+                return {"loadType": "empty", "data": {}}
+            return {"loadType": "track", "data": track_payload(video)}
+        prefix, _, query = identifier.partition("search:")
+        if query:
+            source = "soundcloud" if prefix == "sc" else "youtube"
+            return {"loadType": "search", "data": [
+                track_payload(f"{prefix}{abs(hash((query, i))) % 10 ** 11:011d}", title=f"{query} {i}", source=source)
+                for i in range(self.search_results)]}
+        return {"loadType": "empty", "data": {}}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening, returns the port"""
+        from aiohttp import web
+
+        async def loadtracks(request: web.Request) -> web.Response:
+            identifier = request.query["identifier"]
+            self.loads += 1
+            delay = self.load_delay(identifier)
+            if delay:
+                await asyncio.sleep(delay)
+            return web.json_response(self.load(identifier))
+
+        async def update_player(request: web.Request) -> web.Response:
+            data = await request.json()
+            self.player_updates.append((time.perf_counter(), data))
+            if self.on_player_update:
+                self.on_player_update(request.match_info["guild"], data)
+            return web.json_response({"guildId": request.match_info["guild"], "track": None, "volume": 100,
+                                      "paused": False, "filters": {},
+                                      "state": {"time": 0, "position": 0, "connected": True, "ping": 0},
+                                      "voice": {"token": "", "endpoint": "", "sessionId": ""}})
+
+        async def websocket(request: web.Request) -> web.WebSocketResponse:
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            self.sockets.append(ws)
+            await ws.send_json({"op": "ready", "resumed": False, "sessionId": "bench"})
+            async for _ in ws:
+                pass
+            self.sockets.remove(ws)
+            return ws
+
+        app = web.Application()
+        app.router.add_get("/version", lambda request: web.Response(text="4.0.8"))
+        app.router.add_get("/v4/info", lambda request: web.json_response(INFO))
+        app.router.add_get("/v4/stats", lambda request: web.json_response(STATS))
+        app.router.add_get("/v4/loadtracks", loadtracks)
+        app.router.add_patch("/v4/sessions/{session}",
+                             lambda request: web.json_response({"resuming": True, "timeout": 60}))
+        app.router.add_patch("/v4/sessions/{session}/players/{guild}", update_player)
+        app.router.add_get("/v4/websocket", websocket)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        """Send a websocket message, e.g. a track event, to every connected client"""
+        for ws in list(self.sockets):
+            await ws.send_json(payload)
+
+    async def close(self) -> None:
+        for ws in list(self.sockets):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def fake_client(user_id: int = 1000):
+    """A logged out `commands.Bot` with a user, enough for wavelink to connect a node"""
+    import discord
+    from discord.ext import commands
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+    bot._connection.user = discord.ClientUser(state=bot._connection, data={
+        "id": str(user_id), "username": "Furina", "discriminator": "0", "avatar": None})
+    return bot
+
+
+async def connect(port: int, client=None) -> Any:
+    """Connect the wavelink `Pool` to a `FakeNode` on `port`, returns the client"""
+    import wavelink
+    client = client or fake_client()
+    node = wavelink.Node(identifier="MAIN", uri=f"http://127.0.0.1:{port}", password="bench",
+                         inactive_player_timeout=None)
+    await wavelink.Pool.connect(client=client, nodes=[node])
+    for _ in range(200):
+        if node.status == wavelink.NodeStatus.CONNECTED:
+            return client
+        await asyncio.sleep(0.01)
+    raise RuntimeError("The fake node did not become ready")
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
@@ -0,0 +1,101 @@
+"""
+Time the event loop spends per log record, with the old handlers against the queue listener.
+
+- before: a `FileHandler` and a console `StreamHandler` on the root logger, formatted by
+  the old `LogFormatter` that built a new `logging.Formatter` for every record
+- after: `setup_logging`, a `QueueHandler` on the root logger and a listener thread doing
+  the formatting and the I/O, into the rotating gzipped `furina.log`
+
+Each version runs in its own interpreter inside a temporary directory, so the logs of the
+repository are untouched. `--records` INFO records are logged from a coroutine yielding to
+the loop every 500 records, console output goes to `os.devnull`. "drain" is how long the
+listener needs to write what is still queued when it is stopped.
+
+    python benchmarks/logging_cost.py [--records 20000]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, json, logging, os, subprocess, sys, tempfile, time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class OldLogFormatter(logging.Formatter):
+    """`LogFormatter` of `main.py` before `_classes/logs.py`"""
+    blue = '\x1b[38;5;39m'
+    reset = '\x1b[0m'
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.FORMATS = {level: self.blue + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s"
+                        for level in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)}
+
+    def format(self, record: logging.LogRecord) -> str:
+        return logging.Formatter(self.FORMATS.get(record.levelno)).format(record)
+
+
+async def log_records(records: int) -> List[int]:
+    logger = logging.getLogger("bench")
+    samples = []
+    for i in range(records):
+        begin = time.perf_counter_ns()
+        logger.info("Restored player of guild %s on node %s", i, "MAIN")
+        samples.append(time.perf_counter_ns() - begin)
+        if i % 500 == 0:
+            await asyncio.sleep(0)
+    return samples
+
+
+def child(mode: str, records: int) -> None:
+    sys.path.insert(0, ROOT)
+    sys.stderr = open(os.devnull, "w")
+    os.makedirs("logs", exist_ok=True)
+    listener = None
+    if mode == "before":
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.INFO)
+        for handler in (logging.FileHandler("logs/furina_20240101_000000.log"), logging.StreamHandler()):
+            handler.setFormatter(OldLogFormatter())
+            root_logger.addHandler(handler)
+    else:
+        from _classes.logs import setup_logging
+        listener = setup_logging(max_bytes=512 * 1024, backup_count=3)
+    samples = sorted(asyncio.run(log_records(records)))
+    drain = 0.0
+    if listener:
+        begin = time.perf_counter()
+        listener.stop()
+        drain = time.perf_counter() - begin
+    print(json.dumps({"mean": sum(samples) / len(samples) / 1000, "p50": samples[len(samples) // 2] / 1000,
+                      "p99": samples[int(len(samples) * 0.99)] / 1000, "max": samples[-1] / 1000,
+                      "drain": drain, "files": len(os.listdir("logs"))}))
+
+
+def measure(mode: str, records: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--records", str(records)],
+                                cwd=directory, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--child", choices=("before", "after"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.records)
+
+    print(f"{args.records} records, µs the logging call blocks the loop")
+    for mode in ("before", "after"):
+        result = measure(mode, args.records)
+        line = (f"  {mode:<7} mean {result['mean']:6.2f}  p50 {result['p50']:6.2f}  p99 {result['p99']:7.2f}  "
+                f"max {result['max']:8.0f}")
+        if mode == "after":
+            line += f"  drain {result['drain'] * 1000:.0f} ms, {result['files']} log files"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Time to `/playlist load` a saved playlist, from the database query until the tracks are queued.
+
+A playlist of each `--sizes` is saved with `SavedPlaylists.save` in a temporary SQLite
+database, then loaded `--runs` times into an empty `FurinaQueue`:
+
+- load: `SavedPlaylists.load`, the query, JSON decoding and rebuilding the `Playable`s
+- enqueue: `music.put_a_playlist`, duplicate checks, the result pages and the bulk `put_wait`
+
+    python benchmarks/playlist_load.py [--sizes 100 1000 5000] [--runs 10]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, os, statistics, tempfile, time, types
+from typing import List
+
+import fakes
+
+
+async def run(sizes: List[int], runs: int) -> None:
+    import asqlite
+    from _classes.playlists import SavedPlaylists
+    from _classes.queue import FurinaQueue
+    from _extensions import music
+
+    print(f"Median of {runs} loads")
+    with tempfile.TemporaryDirectory() as directory:
+        async with asqlite.create_pool(os.path.join(directory, "bench.db")) as pool:
+            playlists = SavedPlaylists(pool)
+            await playlists.create_table()
+            for size in sizes:
+                await playlists.save(1, f"bench {size}", fakes.tracks(size))
+                loads, enqueues = [], []
+                for _ in range(runs):
+                    begin = time.perf_counter()
+                    playlist = await playlists.load(1, f"bench {size}")
+                    loaded = time.perf_counter()
+                    # Already playing, so `put_a_playlist` does not call the node
+                    player = types.SimpleNamespace(queue=FurinaQueue(), playing=True)
+                    await music.put_a_playlist(playlist=playlist, player=player)
+                    loads.append(loaded - begin)
+                    enqueues.append(time.perf_counter() - loaded)
+                load, enqueue = statistics.median(loads) * 1000, statistics.median(enqueues) * 1000
+                print(f"  {size:>5} tracks  load {load:7.1f} ms  enqueue {enqueue:7.1f} ms  total {load + enqueue:7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per message cost of resolving the command prefixes of a guild.
+
+`--guilds` guilds are stored in a temporary `guild_settings` table, every other one with a
+custom prefix, and messages come from random guilds:
+
+- before: the dict of custom prefixes, then `when_mentioned_or(prefix)(bot, message)`,
+  which builds a new list with the two mentions on every message
+- after: `GuildSettings.prefixes`, the list built once per guild
+- the same two through `Bot.get_prefix`, what discord.py calls for every message
+
+    python benchmarks/prefix_path.py [--guilds 1000] [--messages 200000]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, os, random, tempfile, time, types
+from typing import Any, Callable, List
+
+import fakes
+
+
+def per_call(call: Callable[[Any], Any], messages: List[Any]) -> float:
+    begin = time.perf_counter()
+    for message in messages:
+        call(message)
+    return (time.perf_counter() - begin) / len(messages)
+
+
+async def per_await(call: Callable[[Any], Any], messages: List[Any]) -> float:
+    begin = time.perf_counter()
+    for message in messages:
+        await call(message)
+    return (time.perf_counter() - begin) / len(messages)
+
+
+async def run(guilds: int, count: int) -> None:
+    import asqlite
+    from discord.ext.commands import when_mentioned_or
+    from _classes.guildsettings import GuildSettings
+    from settings import DEFAULT_PREFIX
+
+    bot = fakes.fake_client()
+    rng = random.Random(0)
+    messages = [types.SimpleNamespace(guild=types.SimpleNamespace(id=rng.randrange(1, guilds + 1)))
+                for _ in range(count)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with asqlite.create_pool(os.path.join(directory, "bench.db")) as pool:
+            settings = GuildSettings(pool, default_prefix=DEFAULT_PREFIX)
+            await settings.create_table()
+            async with pool.acquire() as db:
+                await db.executemany("""INSERT INTO guild_settings ( guild_id, prefix ) VALUES ( ?, ? )""",
+                                     [(guild_id, f"g{guild_id}!") for guild_id in range(1, guilds + 1, 2)])
+            await settings.load()
+            settings.bind(bot.user.id)
+    prefixes = {guild_id: f"g{guild_id}!" for guild_id in range(1, guilds + 1, 2)}
+
+    def before(message: Any) -> List[str]:
+        prefix = prefixes.get(message.guild.id) or DEFAULT_PREFIX
+        return when_mentioned_or(prefix)(bot, message)
+
+    def after(message: Any) -> List[str]:
+        return settings.prefixes(message.guild and message.guild.id)
+
+    assert before(messages[0]) == after(messages[0])
+    print(f"{count} messages from {guilds} guilds, µs per message")
+    for name, get_pre in (("before", before), ("after", after)):
+        direct = per_call(get_pre, messages)
+        bot.command_prefix = lambda _, message, get_pre=get_pre: get_pre(message)
+        through_bot = await per_await(bot.get_prefix, messages)
+        print(f"  {name:<7} prefixes {direct * 1e6:6.2f}  Bot.get_prefix {through_bot * 1e6:6.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.guilds, args.messages))
+
+
+if __name__ == "__main__":
+    main()
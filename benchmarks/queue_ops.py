@@ -0,0 +1,100 @@
+"""
+Cost of the positional queue operations on long queues, flat list against chunked `TrackList`.
+
+- before: `wavelink.Queue`, tracks in one flat `list`
+- after: `FurinaQueue`, tracks in `TrackList` chunks with a Fenwick tree over their lengths
+
+Every operation runs `--ops` times at random positions, or for `--budget` seconds when
+that comes first, and keeps the queue length constant. The result is the mean time per
+operation in microseconds. Removing a given track scans the whole list with
+`Playable.__eq__` before, after it only scans the chunk the index says holds it.
+"after" also keeps the identifier and title index in sync on every operation.
+
+    python benchmarks/queue_ops.py [--lengths 10000 100000] [--ops 2000] [--budget 2]
+"""
+from __future__ import annotations
+
+import argparse, random, time
+from typing import Any, Callable, Dict, List
+
+import fakes
+
+
+def operations(length: int) -> Dict[str, Callable[[Any, random.Random], None]]:
+    def move(queue: Any, rng: random.Random) -> None:
+        source, destination = rng.randrange(length), rng.randrange(length)
+        if hasattr(queue, "move"):
+            queue.move(source, destination)
+        else:
+            track = queue[source]
+            queue.delete(source)
+            queue.put_at(destination, track)
+
+    def remove_at(queue: Any, rng: random.Random) -> None:
+        track = queue[rng.randrange(length)]
+        queue.delete(rng.randrange(length))
+        queue.put_at(rng.randrange(length), track)
+
+    def remove_track(queue: Any, rng: random.Random) -> None:
+        track = queue[rng.randrange(length)]
+        if hasattr(queue, "remove_identifier"):
+            queue.remove_identifier(track.identifier)
+        else:
+            queue.remove(track)
+        queue.put(track)
+
+    def next_track(queue: Any, rng: random.Random) -> None:
+        queue.put(queue.get())
+
+    def shuffle_range(queue: Any, rng: random.Random) -> None:
+        start = rng.randrange(length - 100)
+        if isinstance(queue._items, list):
+            # `wavelink.Queue.shuffle` only shuffles everything
+            items = queue._items[start:start + 100]
+            rng.shuffle(items)
+            queue._items[start:start + 100] = items
+        else:
+            queue.shuffle(start, start + 100)
+
+    return {"move": move, "remove at": remove_at, "remove track": remove_track,
+            "next track": next_track, "shuffle 100": shuffle_range}
+
+
+def measure(make_queue: Callable[[], Any], tracks: List[Any], ops: int, budget: float) -> Dict[str, float]:
+    results = {}
+    for name, operation in operations(len(tracks)).items():
+        queue = make_queue()
+        queue.put(tracks)
+        rng = random.Random(0)
+        begin = time.perf_counter()
+        done = 0
+        while done < ops and time.perf_counter() - begin < budget:
+            operation(queue, rng)
+            done += 1
+        results[name] = (time.perf_counter() - begin) / done
+        assert len(queue) == len(tracks)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--budget", type=float, default=2.0, help="Seconds spent on one operation at most")
+    args = parser.parse_args()
+
+    from wavelink import Queue
+    from _classes.queue import FurinaQueue
+
+    print(f"Mean µs per operation at random positions, up to {args.ops} operations or {args.budget:.0f} s each")
+    for length in args.lengths:
+        tracks = fakes.tracks(length)
+        before = measure(Queue, tracks, args.ops, args.budget)
+        after = measure(FurinaQueue, tracks, args.ops, args.budget)
+        print(f"  {length} tracks")
+        for name in before:
+            print(f"    {name:<13} before {before[name] * 1e6:9.1f}  after {after[name] * 1e6:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Response time and memory of `!queue` against the queue length.
+
+- before: every page built up front, one `Embed` per 10 tracks in a `PaginatedView`,
+  as `_queue_embeds` did before `QueueView`
+- after: `music.QueueView`, which copies the track references and renders one page
+
+"open" is the time until the first page can be sent, "page" the time to turn a page,
+"filter" the time to apply a title filter. "retained" is the memory the view keeps
+alive until it times out, "peak" the allocation peak while opening it, both measured
+with `tracemalloc` on top of the queue itself.
+
+    python benchmarks/queue_view.py [--lengths 100 1000 10000 100000]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, gc, time, tracemalloc, types
+from typing import Any, Callable, Dict, List
+
+import fakes
+
+
+def old_queue_embeds(player: Any) -> List[Any]:
+    """`Music._queue_embeds` and `_create_queue_embed` before the windowed view"""
+    from _classes.embeds import FooterEmbed
+    from discord import Color
+    from _extensions.music import format_len
+
+    def create_queue_embed(q: str) -> Any:
+        embed = FooterEmbed(color=Color.blue(), title=f"Hàng chờ: {player.queue.count} bài hát", description=q)
+        if player.playing:
+            track = player.current
+            embed.add_field(name="Đang phát", value=f"[**{track}**](<{track.uri}>) ({format_len(track.length)})")
+        return embed
+
+    queue_embeds = []
+    q = ""
+    for i, track in enumerate(player.queue, 1):
+        q += f"{i}. [**{track}**](<{track.uri}>) ({format_len(track.length)})\n"
+        if i % 10 == 0:
+            queue_embeds.append(create_queue_embed(q))
+            q = ""
+    if q:
+        queue_embeds.append(create_queue_embed(q))
+    return queue_embeds
+
+
+def timed(call: Callable[[], Any]) -> float:
+    begin = time.perf_counter()
+    call()
+    return time.perf_counter() - begin
+
+
+def memory(build: Callable[[], Any]) -> tuple[Any, int, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        view = build()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return view, retained, peak
+
+
+async def measure(length: int) -> Dict[str, Dict[str, float]]:
+    from _classes.queue import FurinaQueue
+    from _classes.views import PaginatedView
+    from _extensions.music import QueueView
+
+    queue = FurinaQueue()
+    queue.put(fakes.tracks(length))
+    player = types.SimpleNamespace(queue=queue, playing=True, current=queue[0])
+
+    def before() -> Any:
+        embeds = old_queue_embeds(player)
+        view = PaginatedView(timeout=60, embeds=embeds)
+        embeds[0].to_dict()
+        return view
+
+    def after() -> Any:
+        view = QueueView(player)
+        view.render().to_dict()
+        return view
+
+    results = {}
+    for name, build in (("before", before), ("after", after)):
+        open_time = timed(build)
+        view, retained, peak = memory(build)
+        if name == "before":
+            page = timed(lambda: view.embeds[min(1, len(view.embeds) - 1)].to_dict())
+            # The old view had no filter, the closest is scanning the built pages
+            filter_time = timed(lambda: [embed for embed in view.embeds if "song t12345" in embed.description])
+        else:
+            view.page += 1
+            page = timed(lambda: view.render().to_dict())
+            filter_time = timed(lambda: (view.apply_filter("song t12345"), view.render()))
+        view.stop()
+        results[name] = {"open": open_time, "page": page, "filter": filter_time,
+                         "retained": retained, "peak": peak}
+    return results
+
+
+async def run(lengths: List[int]) -> None:
+    print(f"{'tracks':>8}  {'':<7} {'open ms':>9} {'page ms':>9} {'filter ms':>10} {'retained':>10} {'peak':>10}")
+    for length in lengths:
+        for name, result in (await measure(length)).items():
+            print(f"{length:>8}  {name:<7} {result['open'] * 1000:9.2f} {result['page'] * 1000:9.3f} "
+                  f"{result['filter'] * 1000:10.2f} {result['retained'] / 1024:8.0f} kB {result['peak'] / 1024:7.0f} kB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    asyncio.run(run(parser.parse_args().lengths))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Latency of `!search`, the sequential lookups it started with against `fan_out_search`.
+
+The scrape is a fake `YoutubeSearch` sleeping `--scrape-ms`, Lavalink is a `FakeNode`
+whose loads take `--node-ms` with a slow tail: `--tail` of them take `--tail-ms` instead.
+The delay of an identifier is derived from the identifier, so both versions see the same
+slow tracks. Every search is a new query and the caches are cleared, so nothing is cached.
+
+- before: the scrape, then the 5 YouTube links resolved one after the other, then SoundCloud
+- after: `music.fan_out_search`, both sources and the 5 links concurrently
+
+    python benchmarks/search_fanout.py [--searches 50] [--node-ms 120] [--tail 0.05] [--tail-ms 1500]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, random, statistics, sys, time, types
+from typing import Any, Awaitable, Callable, Dict, List
+
+import fakes
+
+SCRAPE_SECONDS = 0.15
+
+
+class FakeYoutubeSearch:
+    """Blocks like `YoutubeSearch` for `SCRAPE_SECONDS`, then returns `max_results` videos"""
+    def __init__(self, search_terms: str, max_results: int = 10) -> None:
+        time.sleep(SCRAPE_SECONDS)
+        self.videos = [{"id": f"{abs(hash((search_terms, i))) % 10 ** 11:011d}", "title": f"{search_terms} {i}"}
+                       for i in range(max_results)]
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return self.videos
+
+
+async def measure(search: Callable[[str], Awaitable[Any]], searches: int, name: str) -> List[float]:
+    from _extensions import music
+    latencies = []
+    for i in range(searches):
+        music.search_cache.clear()
+        music.scrape_cache.clear()
+        begin = time.perf_counter()
+        await search(f"{name} query {i}")
+        latencies.append(time.perf_counter() - begin)
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> None:
+    from wavelink import Playable, TrackSource
+    from _extensions import music
+
+    def load_delay(identifier: str) -> float:
+        rng = random.Random(identifier)
+        if rng.random() < args.tail:
+            return args.tail_ms / 1000
+        return rng.uniform(0.5, 1.5) * args.node_ms / 1000
+
+    node = fakes.FakeNode(load_delay=load_delay)
+    port = await node.start()
+    client = await fakes.connect(port)
+
+    async def before(query: str) -> Any:
+        yt_tracks = []
+        for result in FakeYoutubeSearch(query, 5).to_dict():
+            yt_tracks += await Playable.search(f"https://youtu.be/{result['id']}")
+        sc_tracks = await Playable.search(query, source=TrackSource.SoundCloud)
+        return yt_tracks, sc_tracks
+
+    async def after(query: str) -> Any:
+        return await music.fan_out_search(query, limit=5)
+
+    print(f"{args.searches} searches, scrape {args.scrape_ms:.0f} ms, node {args.node_ms:.0f} ms "
+          f"± 50%, {args.tail:.0%} of loads take {args.tail_ms:.0f} ms")
+    try:
+        for name, search in (("before", before), ("after", after)):
+            latencies = await measure(search, args.searches, name)
+            print(f"  {name:<7} p50 {statistics.median(latencies) * 1000:7.0f} ms  "
+                  f"p95 {fakes.percentile(latencies, 0.95) * 1000:7.0f} ms  max {max(latencies) * 1000:7.0f} ms")
+    finally:
+        import wavelink
+        await wavelink.Pool.close()
+        await client.close()
+        await node.close()
+
+
+def main() -> None:
+    global SCRAPE_SECONDS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--scrape-ms", type=float, default=150)
+    parser.add_argument("--node-ms", type=float, default=120)
+    parser.add_argument("--tail", type=float, default=0.05, help="Fraction of slow loads")
+    parser.add_argument("--tail-ms", type=float, default=1500)
+    args = parser.parse_args()
+    SCRAPE_SECONDS = args.scrape_ms / 1000
+    sys.modules["youtube_search"] = types.SimpleNamespace(YoutubeSearch=FakeYoutubeSearch)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Event loop blocking of the YouTube scrape in `search_for_tracks`, before and after it was moved off the loop.
+
+`youtube_search.YoutubeSearch` is replaced by a fake that blocks like the real scrape, a
+synchronous HTTP request (`--scrape-ms`) then parsing a result page. A ticker coroutine
+wakes up every millisecond and records how late it was, while `--requests` `!play`
+lookups over `--queries` distinct popular songs run concurrently.
+
+- before: the scrape called on the loop for every request, as the bot did originally
+- after: `music.youtube_search`, in a worker thread, cached and coalesced per query
+- after, warm: the same lookups again, now answered by the cache
+
+    python benchmarks/search_loop.py [--requests 100] [--queries 20] [--scrape-ms 300]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, json, os, random, sys, time, types
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRAPE_SECONDS = 0.3
+scrapes = 0
+
+
+class FakeYoutubeSearch:
+    """Blocks like `YoutubeSearch`: a synchronous request, then parsing the page"""
+    def __init__(self, search_terms: str, max_results: int = 10) -> None:
+        global scrapes
+        scrapes += 1
+        time.sleep(SCRAPE_SECONDS)
+        page = json.dumps({"contents": [{"videoRenderer": {"videoId": f"{abs(hash((search_terms, i))):011d}"[:11],
+                                                           "title": {"runs": [{"text": f"{search_terms} {i}"}]}}}
+                                        for i in range(20)]})
+        self.videos = [{"id": item["videoRenderer"]["videoId"], "title": item["videoRenderer"]["title"]["runs"][0]["text"]}
+                       for item in json.loads(page)["contents"]][:max_results]
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return self.videos
+
+
+async def ticker(lags: List[float], stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + 0.001
+        await asyncio.sleep(0.001)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def run(search: Callable[[str], Any], queries: List[str]) -> Dict[str, float]:
+    global scrapes
+    scrapes = 0
+    lags: List[float] = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(0.01)
+    begin = time.perf_counter()
+    await asyncio.gather(*(search(query) for query in queries))
+    elapsed = time.perf_counter() - begin
+    stop.set()
+    await tick
+    lags.sort()
+    return {"total": elapsed, "max_lag": lags[-1], "p99_lag": lags[int(len(lags) * 0.99)],
+            "blocked": sum(lag for lag in lags if lag > 0.005), "scrapes": scrapes}
+
+
+def main() -> None:
+    global SCRAPE_SECONDS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--scrape-ms", type=float, default=300)
+    args = parser.parse_args()
+    SCRAPE_SECONDS = args.scrape_ms / 1000
+    sys.modules["youtube_search"] = types.SimpleNamespace(YoutubeSearch=FakeYoutubeSearch)
+
+    from _extensions import music
+
+    # Popular songs are asked for again and again, a few of them far more than the rest
+    songs = [f"popular song {i}" for i in range(args.queries)]
+    rng = random.Random(0)
+    queries = rng.choices(songs, weights=[1 / (i + 1) for i in range(args.queries)], k=args.requests)
+
+    async def before(query: str) -> List[Dict[str, Any]]:
+        await asyncio.sleep(0)
+        return FakeYoutubeSearch(query, 1).to_dict()
+
+    async def after(query: str) -> List[Dict[str, Any]]:
+        return await music.youtube_search(query, 1)
+
+    print(f"{args.requests} lookups of {args.queries} songs, {args.scrape_ms:.0f} ms per scrape")
+    for name, search in (("before", before), ("after", after), ("after, warm", after)):
+        result = asyncio.run(run(search, queries))
+        print(f"  {name:<11} total {result['total']:7.2f} s  loop blocked {result['blocked']:7.2f} s  "
+              f"max lag {result['max_lag'] * 1000:7.1f} ms  p99 lag {result['p99_lag'] * 1000:6.1f} ms  "
+              f"scrapes {result['scrapes']}")
+    print(f"  cache: {music.scrape_cache.stats()}, {music.scrape_flights.coalesced} coalesced")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Startup benchmark: cold import time and time until `setup_hook` completes.
+
+Every run is a fresh interpreter started from the repository root. It imports `main`, then
+starts the bot against a local fake Discord API and gateway and a fake Lavalink node listening
+on `LAVA_URI`, so nothing leaves the machine. The bot runs as cluster 1, which connects to
+the node instead of downloading and starting Lavalink.
+
+    python benchmarks/startup.py [--runs 5] [--guilds 100] [--no-save]
+
+The medians are appended to `benchmarks/startup_results.jsonl` with the commit they ran on,
+and compared with the previous entry so a regression shows up in the output and in git.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, json, os, platform, statistics, subprocess, sys, tempfile, time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = os.path.join(ROOT, "benchmarks", "startup_results.jsonl")
+METRICS = ("process", "import", "setup_hook", "ready", "warm")
+BOT_ID = 1000
+OWNER_ID = 2000
+
+
+def _user(user_id: int, name: str) -> Dict[str, Any]:
+    return {"id": str(user_id), "username": name, "global_name": name, "discriminator": "0",
+            "avatar": None, "bot": user_id == BOT_ID}
+
+
+def _application() -> Dict[str, Any]:
+    return {"id": str(BOT_ID), "name": "Furina", "description": "", "icon": None, "rpc_origins": [],
+            "bot_public": True, "bot_require_code_grant": False, "verify_key": "0" * 64, "flags": 0,
+            "owner": _user(OWNER_ID, "owner"), "team": None, "summary": ""}
+
+
+async def fake_discord(guilds: int):
+    """A REST API and gateway answering what the bot asks for while starting up, on a free port"""
+    from aiohttp import WSMsgType, web
+    from _classes.cacheprofile import _guild_payload
+
+    emojis = [{"id": str(10_000 + i), "name": filename.split(".")[0].upper(), "animated": False,
+               "require_colons": True, "managed": False, "available": True, "roles": []}
+              for i, filename in enumerate(sorted(os.listdir(os.path.join(ROOT, "wordle_letters"))))]
+
+    async def gateway(request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": 41250}})
+        sequence = 0
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            payload = json.loads(message.data)
+            if payload["op"] == 1:
+                await ws.send_json({"op": 11, "d": None})
+            elif payload["op"] == 2:
+                sequence += 1
+                await ws.send_json({"op": 0, "t": "READY", "s": sequence, "d": {
+                    "v": 10, "user": _user(BOT_ID, "Furina"), "session_id": "bench", "shard": [0, 1],
+                    "resume_gateway_url": f"ws://{request.host}/gateway",
+                    "guilds": [{"id": str(guild_id), "unavailable": True} for guild_id in range(1, guilds + 1)],
+                    "application": {"id": str(BOT_ID), "flags": 0}}})
+                for guild_id in range(1, guilds + 1):
+                    sequence += 1
+                    await ws.send_json({"op": 0, "t": "GUILD_CREATE", "s": sequence, "d": _guild_payload(
+                        guild_id, 50, all_members=False, presences=False, in_voice=0)})
+        return ws
+
+    def json_response(data: Any) -> web.Response:
+        # discord.py only decodes an exact "application/json" content type, without a charset
+        return web.Response(body=json.dumps(data).encode(), headers={"Content-Type": "application/json"})
+
+    async def route(request: web.Request) -> web.Response:
+        path = request.match_info["path"]
+        if path == "users/@me":
+            return json_response(_user(BOT_ID, "Furina"))
+        if path == "oauth2/applications/@me":
+            return json_response(_application())
+        if path == "gateway/bot":
+            return json_response({"url": f"ws://{request.host}/gateway", "shards": 1, "session_start_limit": {
+                "total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}})
+        if path == f"applications/{BOT_ID}/emojis":
+            return json_response({"items": emojis})
+        print(f"fake discord: unexpected {request.method} /{path}", file=sys.stderr)
+        return json_response({})
+
+    app = web.Application()
+    app.router.add_get("/gateway", gateway)
+    app.router.add_route("*", "/api/v10/{path:.*}", route)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+async def fake_node(uri: str):
+    """A Lavalink v4 node that accepts the connection and answers the info and stats requests"""
+    from aiohttp import web
+    from yarl import URL
+
+    info = {"version": {"semver": "4.0.8", "major": 4, "minor": 0, "patch": 8, "preRelease": None, "build": None},
+            "buildTime": 0, "git": {"branch": "main", "commit": "0", "commitTime": 0}, "jvm": "17",
+            "lavaplayer": "2.2.2", "sourceManagers": ["youtube", "soundcloud"], "filters": [], "plugins": []}
+    stats = {"players": 0, "playingPlayers": 0, "uptime": 1000,
+             "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+             "cpu": {"cores": 1, "systemLoad": 0.0, "lavalinkLoad": 0.0}}
+
+    async def websocket(request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"op": "ready", "resumed": False, "sessionId": "bench"})
+        async for _ in ws:
+            pass
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/version", lambda request: web.Response(text="4.0.8"))
+    app.router.add_get("/v4/info", lambda request: web.json_response(info))
+    app.router.add_get("/v4/stats", lambda request: web.json_response(stats))
+    app.router.add_patch("/v4/sessions/{session}", lambda request: web.json_response({"resuming": True, "timeout": 60}))
+    app.router.add_get("/v4/websocket", websocket)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    url = URL(uri)
+    await web.TCPSite(runner, url.host, url.port).start()
+    return runner
+
+
+def child(port: int, database: str) -> None:
+    """One cold start, prints the timings in seconds since the process started as JSON"""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import main  # noqa: F401, the import is what is measured
+    imported = time.perf_counter()
+
+    import asqlite, discord, logging
+    from aiohttp import ClientSession
+    from bot import Furina
+
+    discord.http.Route.BASE = f"http://127.0.0.1:{port}/api/v10"
+    logging.basicConfig(level=os.getenv("BENCH_LOG_LEVEL", "WARNING"), stream=sys.stderr)
+    timings: Dict[str, float] = {"import": imported - started}
+
+    async def run() -> None:
+        async with ClientSession() as session, asqlite.create_pool(database) as pool:
+            bot = Furina(pool=pool, client_session=session, cluster_id=1)
+            setup_hook = bot.setup_hook
+
+            async def timed_setup_hook() -> None:
+                await setup_hook()
+                timings["setup_hook"] = time.perf_counter() - started
+            bot.setup_hook = timed_setup_hook
+
+            runner = asyncio.create_task(bot.start("bench"))
+            try:
+                ready = asyncio.create_task(bot.wait_until_ready())
+                await asyncio.wait((ready, runner), timeout=60, return_when=asyncio.FIRST_COMPLETED)
+                if not ready.done():
+                    ready.cancel()
+                    # Raises what stopped the bot, or times out
+                    await asyncio.wait_for(runner, timeout=0)
+                timings["ready"] = time.perf_counter() - started
+                for warmup in bot.loader.warmups.values():
+                    await warmup.wait()
+                timings["warm"] = time.perf_counter() - started
+                failed = [timing.name for timing in bot.loader.timings.values() if timing.error]
+                failed += [warmup.name for warmup in bot.loader.warmups.values() if warmup.failed]
+                if failed:
+                    raise RuntimeError(f"Failed to start: {', '.join(failed)}")
+            finally:
+                await bot.close()
+                await asyncio.gather(runner, return_exceptions=True)
+
+    asyncio.run(run())
+    print(json.dumps(timings))
+
+
+async def measure(runs: int, guilds: int) -> List[Dict[str, float]]:
+    from settings import LAVA_URI
+    discord_runner, port = await fake_discord(guilds)
+    node_runner = await fake_node(LAVA_URI)
+    env = dict(os.environ, MUSIC_WEBHOOK=f"https://discord.com/api/webhooks/{10 ** 17}/{'b' * 68}",
+               DEBUG_WEBHOOK="", CLUSTER_COUNT="1", PYTHONDONTWRITEBYTECODE="")
+    results = []
+    try:
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as directory:
+                begin = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, os.path.abspath(__file__), "--child", str(port), os.path.join(directory, "bench.db"),
+                    cwd=ROOT, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+                stdout, stderr = await process.communicate()
+                if process.returncode:
+                    raise RuntimeError(f"Benchmark run failed:\n{stderr.decode()}")
+                if os.getenv("BENCH_LOG_LEVEL"):
+                    sys.stderr.write(stderr.decode())
+                timings = json.loads(stdout.decode().strip().splitlines()[-1])
+                timings["process"] = time.perf_counter() - begin
+                results.append(timings)
+    finally:
+        await discord_runner.cleanup()
+        await node_runner.cleanup()
+    return results
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous() -> Dict[str, Any] | None:
+    try:
+        with open(RESULTS, encoding="utf-8") as file:
+            lines = [line for line in file if line.strip()]
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown reported as a regression")
+    parser.add_argument("--no-save", action="store_true", help=f"Do not append to {os.path.relpath(RESULTS, ROOT)}")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(int(args.child[0]), args.child[1])
+
+    sys.path.insert(0, ROOT)
+    runs = asyncio.run(measure(args.runs, args.guilds))
+    medians = {metric: round(statistics.median(run[metric] for run in runs) * 1000, 1) for metric in METRICS}
+    entry = {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit(), "python": platform.python_version(),
+             "cpus": os.cpu_count(), "runs": args.runs, "guilds": args.guilds, "ms": medians}
+
+    last = previous()
+    print(f"Median of {args.runs} cold starts, ms since the interpreter started (process: total wall time)")
+    for metric in METRICS:
+        line = f"  {metric:<10} {medians[metric]:>9.1f}"
+        if last and metric in last.get("ms", {}):
+            before = last["ms"][metric]
+            change = (medians[metric] - before) / before if before else 0.0
+            line += f"  {change:+.0%} vs {last['commit']}"
+            if change > args.threshold:
+                line += "  REGRESSION"
+        print(line)
+    if not args.no_save:
+        with open(RESULTS, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry) + "\n")
+        print(f"Saved to {os.path.relpath(RESULTS, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
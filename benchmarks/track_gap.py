@@ -0,0 +1,125 @@
+"""
+Gap between two tracks: from the end of one track until the node starts loading a track that plays.
+
+The queue holds `--tracks` tracks, `--dead` of which no longer load, on a `FakeNode` whose
+loads take `--node-ms`. Starting a track is modelled as the node loading it, which is what
+Lavalink does on `play`: a dead track costs a failed load, then the bot moves on to the
+next one. Each track plays for `--play-ms` before it ends.
+
+- before: `queue.get()` then play, dead tracks are only found out when they fail to play
+- after: `TrackPrefetcher`, the upcoming tracks are resolved while the current one plays
+  and dead ones dropped from the queue, `next_track` pops the next one at the boundary
+- after, loop: the same with the queue looping over a dead track, every resolve is counted
+
+    python benchmarks/track_gap.py [--tracks 40] [--dead 0.2] [--node-ms 150] [--play-ms 600]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, random, statistics, time, types
+from typing import Any, List
+
+import fakes
+
+
+async def play(track: Any) -> bool:
+    """What `player.play` costs the node before the track is audible, whether the track loads"""
+    from wavelink import Pool
+    return bool(await Pool.fetch_tracks(track.uri))
+
+
+def make_player(tracks: List[Any]) -> Any:
+    from _classes.queue import FurinaQueue
+    queue = FurinaQueue()
+    queue.put(tracks)
+    return types.SimpleNamespace(queue=queue, guild=types.SimpleNamespace(id=1))
+
+
+async def before(tracks: List[Any], play_seconds: float) -> List[float]:
+    player = make_player(tracks)
+    gaps = []
+    while not player.queue.is_empty:
+        await asyncio.sleep(play_seconds)
+        begin = time.perf_counter()
+        while not player.queue.is_empty and not await play(player.queue.get()):
+            pass
+        gaps.append(time.perf_counter() - begin)
+    return gaps
+
+
+async def after(tracks: List[Any], play_seconds: float, prefetcher: Any) -> List[float]:
+    player = make_player(tracks)
+    gaps = []
+    prefetcher.schedule(player)
+    while not player.queue.is_empty:
+        await asyncio.sleep(play_seconds)
+        begin = time.perf_counter()
+        track = await prefetcher.actors.submit(1, prefetcher.next_track, player)
+        if track is None:
+            break
+        await play(track)
+        gaps.append(time.perf_counter() - begin)
+        # `on_wavelink_track_start`
+        prefetcher.schedule(player)
+    return gaps
+
+
+async def looped(track: Any, others: List[Any], prefetcher: Any, boundaries: int) -> int:
+    from wavelink import QueueMode
+    player = make_player([track, *others])
+    # The looped track is the one `get` keeps returning
+    player.queue.mode = QueueMode.loop
+    player.queue.loaded = player.queue.get()
+    for _ in range(boundaries):
+        await prefetcher.actors.submit(1, prefetcher.next_track, player)
+    return prefetcher.resolves
+
+
+def summary(gaps: List[float]) -> str:
+    return (f"p50 {statistics.median(gaps) * 1000:6.0f} ms  p95 {fakes.percentile(gaps, 0.95) * 1000:6.0f} ms  "
+            f"max {max(gaps) * 1000:6.0f} ms  over {len(gaps)} boundaries")
+
+
+async def run(args: argparse.Namespace) -> None:
+    from _classes.actor import ActorRegistry
+    from _classes.cache import TTLCache
+    from _classes.prefetch import TrackPrefetcher
+
+    node = fakes.FakeNode(load_delay=lambda identifier: args.node_ms / 1000)
+    port = await node.start()
+    client = await fakes.connect(port)
+    tracks = fakes.tracks(args.tracks)
+    dead = random.Random(0).sample(tracks, int(args.tracks * args.dead))
+    node.unavailable.update(track.identifier for track in dead)
+
+    def prefetcher() -> TrackPrefetcher:
+        return TrackPrefetcher(ActorRegistry(maxsize=20, idle_timeout=60),
+                               validated=TTLCache(maxsize=4096, ttl=1800), depth=3, timeout=3.0)
+
+    print(f"{args.tracks} tracks, {len(dead)} dead, node loads take {args.node_ms:.0f} ms, "
+          f"tracks play {args.play_ms:.0f} ms")
+    try:
+        play_seconds = args.play_ms / 1000
+        print(f"  before       {summary(await before(tracks, play_seconds))}")
+        after_prefetcher = prefetcher()
+        gaps = await after(tracks, play_seconds, after_prefetcher)
+        print(f"  after        {summary(gaps)}, {after_prefetcher.dropped} dropped ahead")
+        resolves = await looped(dead[0], [track for track in tracks if track not in dead], prefetcher(), args.tracks)
+        print(f"  after, loop  {resolves} node resolve(s) for a dead track over {args.tracks} boundaries")
+    finally:
+        import wavelink
+        await wavelink.Pool.close()
+        await client.close()
+        await node.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=40)
+    parser.add_argument("--dead", type=float, default=0.2, help="Fraction of tracks that no longer load")
+    parser.add_argument("--node-ms", type=float, default=150)
+    parser.add_argument("--play-ms", type=float, default=600)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
-import discord, logging, platform, traceback, wavelink
+import asyncio, discord, logging, platform, wavelink
 from aiohttp import ClientSession
 from asqlite import Pool
-from discord import Intents, Activity, ActivityType, Embed, app_commands, utils
-from discord.ext.commands import Bot, when_mentioned_or, errors
-from typing import List
+from discord import Activity, ActivityType, Embed, app_commands, utils
+from discord.ext.commands import AutoShardedBot
+from dataclasses import asdict
+from typing import List, Optional
 
-from settings import DEFAULT_PREFIX, ACTIVITY_NAME, DEBUG_WEBHOOK
+from _classes.cacheprofile import CacheProfile, get_profile
+from _classes.cluster import ClusterIPC
+from _classes.extensions import ExtensionLoader
+from _classes.guildsettings import GuildConfig, GuildSettings
+from _classes.webhook import WebhookDispatcher
+from settings import DEFAULT_PREFIX, ACTIVITY_NAME, CACHE_PROFILE, DEBUG_WEBHOOK, MUSIC_CHANNEL, MUSIC_WEBHOOK, \
+    WARMUP_RETRY_DELAY, WARMUP_RETRY_MAX_DELAY
 
-class Furina(Bot):
+class Furina(AutoShardedBot):
     """
-    Customized `commands.Bot` class
+    Customized `commands.AutoShardedBot` class
+
+    Runs every shard when `shard_ids` is `None`, or one cluster of shards started by
+    `ClusterLauncher`, in which case the clusters share settings changes through `ipc`.
 
     Attributes
     -----------
@@ -19,6 +29,18 @@ class Furina(Bot):
         - The database pool for the bot for easier database access
     - client_session: `aiohttp.ClientSession`
         - The client session for the bot for easier http request
+    - debug_webhook: `Optional[WebhookDispatcher]`
+        - Dispatcher for the `DEBUG_WEBHOOK`, `None` if it is not configured
+    - guild_settings: `GuildSettings`
+        - Cached per guild prefix, music channel and music webhook
+    - cache_profile: `CacheProfile`
+        - Intents and cache sizes the bot runs with, picked by `CACHE_PROFILE`
+    - cluster_id: `int`
+        - Id of the cluster this process runs, `0` when there is only one
+    - ipc: `Optional[ClusterIPC]`
+        - Connection to the other clusters, `None` when there is only one
+    - loader: `ExtensionLoader`
+        - Loads the extensions and runs the background warm-up of their cogs
 
     Example
     -----------
@@ -27,12 +49,16 @@ class Furina(Bot):
             async with Furina(pool=pool, client_session=client_session) as bot:
                 await bot.start(TOKEN)
     """
-    def __init__(self, *, pool: Pool, client_session: ClientSession) -> None:
+    def __init__(self, *, pool: Pool, client_session: ClientSession, shard_ids: Optional[List[int]] = None,
+                 shard_count: Optional[int] = None, cluster_id: int = 0, ipc: Optional[ClusterIPC] = None) -> None:
+        self.cache_profile: CacheProfile = get_profile(CACHE_PROFILE)
         super().__init__(
             command_prefix     = self.get_pre,
+            shard_ids          = shard_ids,
+            shard_count        = shard_count,
             case_insensitive   = True,
             strip_after_prefix = True,
-            intents            = Intents.all(),
+            **self.cache_profile.options(),
             help_command       = None,
             allowed_contexts   = app_commands.AppCommandContext(dm_channel=False, guild=True),
             activity           = Activity(type=ActivityType.playing,
@@ -41,58 +67,76 @@ class Furina(Bot):
         )
         self.pool = pool
         self.cs = client_session
+        self.debug_webhook: Optional[WebhookDispatcher] = None
+        self.guild_settings = GuildSettings(pool, default_prefix=DEFAULT_PREFIX,
+                                            default_music_channel=MUSIC_CHANNEL, default_webhook=MUSIC_WEBHOOK)
+        self.cluster_id = cluster_id
+        self.ipc = ipc
+        self.loader = ExtensionLoader(self, retry_delay=WARMUP_RETRY_DELAY, max_retry_delay=WARMUP_RETRY_MAX_DELAY)
+        if ipc:
+            self.guild_settings.on_update = lambda config: ipc.publish("guild_settings", asdict(config))
+            ipc.subscribe("guild_settings", lambda data: self.guild_settings.apply(GuildConfig(**data)))
+
+    @property
+    def runs_lavalink(self) -> bool:
+        """Only the first cluster starts the local Lavalink node, the others connect to it"""
+        return self.cluster_id == 0
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether `guild_id` is on one of the shards of this process"""
+        if self.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
 
-    async def create_prefix_table(self) -> None:
-        """Create a `custom_prefixes` table in the database"""
-        async with self.pool.acquire() as db:
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS custom_prefixes
-                   ( guild_id INT NOT NULL PRIMARY KEY, prefix TEXT NOT NULL )""")
-            
-    async def update_prefixes(self) -> None:
-        """Retrieve all prefixes in the `custom_prefixes` table and cache them in `Furina.prefixes`"""
-        async with self.pool.acquire() as db:
-            async with db.execute("""SELECT * FROM custom_prefixes""") as cursor:
-                prefixes = await cursor.fetchall()
-                self.prefixes = {prefix[0]: prefix[1] for prefix in prefixes}
-            
     def get_pre(self, _, message: discord.Message) -> List[str]:
-        """Custom `get_prefix` method"""
-        prefix = self.prefixes.get(message.guild.id) or DEFAULT_PREFIX
-        return when_mentioned_or(prefix)(self, message)
+        """Custom `get_prefix` method, returns the prebuilt prefix list of the guild"""
+        return self.guild_settings.prefixes(message.guild and message.guild.id)
 
     async def on_ready(self) -> None:
-        logging.info(f"Logged in as {self.user.name}")
+        logging.info(f"Logged in as {self.user.name} (cluster {self.cluster_id}, shards {sorted(self.shards)})")
         logging.info(f"discord.py v{discord.__version__}")
         logging.info(f"Wavelink v{wavelink.__version__}")
         logging.info(f"Running Python {platform.python_version()}")
 
-        try:
+        if self.debug_webhook:
             embed = Embed(color=self.user.accent_color).set_author(
                 name="BOT IS READY!",
                 icon_url=self.user.display_avatar.url
             )
             embed.timestamp = utils.utcnow()
-            discord.SyncWebhook.from_url(DEBUG_WEBHOOK).send(embed=embed)
+            self.debug_webhook.send(embed=embed)
+
+    async def setup_hook(self) -> None:
+        await self.guild_settings.create_table()
+        await self.guild_settings.load()
+        self.guild_settings.bind(self.user.id)
+        if self.ipc:
+            self.ipc.start()
+
+        try:
+            self.debug_webhook = WebhookDispatcher(DEBUG_WEBHOOK, session=self.cs)
+            self.debug_webhook.start()
         except ValueError:
             logging.warning("Cannot get the Webhook url for on_ready events."
                             "If you don't want to get a webhook message when the bot is ready, please ignore this")
 
-    async def setup_hook(self) -> None:
-        await self.create_prefix_table()
-        await self.update_prefixes()
-
-        # loads the extensions
+        # loads the extensions, independent ones concurrently
         from _extensions import EXTENSIONS
-        for extension in EXTENSIONS:
-            try:
-                await self.load_extension(f"{extension}")
-                logging.info(f"Loaded extension: {extension}")
-            except errors.NoEntryPointError:
-                logging.error(f"Extension {extension} has no setup function so it cannot be loaded")
-            except Exception as e:
-                traceback.print_exc()
-                logging.error(f"An error occured when trying to load {extension}\n{e}")
-        await self.load_extension("jishaku")
-        logging.info("Loaded Jishaku extension")
+        await self.loader.load(EXTENSIONS)
+        # Jishaku is only used by the owner, import it once the bot is up instead of before
+        self._jishaku = asyncio.create_task(self._load_jishaku())
+
+    async def _load_jishaku(self) -> None:
+        await self.wait_until_ready()
+        try:
+            await self.load_extension("jishaku")
+            logging.info("Loaded Jishaku extension")
+        except Exception as e:
+            logging.error(f"An error occured when trying to load jishaku\n{e}")
 
+    async def close(self) -> None:
+        await super().close()
+        if self.debug_webhook:
+            await self.debug_webhook.close()
+        if self.ipc:
+            await self.ipc.close()
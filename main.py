@@ -1,72 +1,51 @@
 from __future__ import annotations
 
 import asyncio
-import os
-import logging
 
 import asqlite
 from aiohttp import ClientSession
+from logging.handlers import QueueListener
+from typing import List, Optional, Tuple
 
 
 from bot import Furina
-from settings import TOKEN
+from _classes.cluster import ClusterIPC, ClusterLauncher, fetch_recommended_shards
+from _classes.logs import delete_legacy_logs, setup_logging
+from settings import TOKEN, SHARD_COUNT, CLUSTER_COUNT, IPC_HOST, IPC_PORT, LOG_MAX_BYTES, LOG_BACKUP_COUNT
        
 
-class LogFormatter(logging.Formatter):
-    grey = '\x1b[38;21m'
-    blue = '\x1b[38;5;39m'
-    yellow = '\x1b[38;5;226m'
-    red = '\x1b[38;5;196m'
-    bold_red = '\x1b[31;1m'
-    reset = '\x1b[0m'
+def handle_setup_logging(cluster_id: Optional[int] = None) -> QueueListener:
+    """Setup logging for the bot, every cluster process logs to its own rotating file"""
+    return setup_logging(cluster_id, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT)
 
-    def __init__(self):
-        super().__init__()
-        self.FORMATS = {
-            logging.DEBUG:    self.grey     + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s",
-            logging.INFO:     self.blue     + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s",
-            logging.WARNING:  self.yellow   + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s",
-            logging.ERROR:    self.red      + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s",
-            logging.CRITICAL: self.bold_red + "%(asctime)s | %(levelname)8s" + self.reset + " | %(message)s"
-        }
-
-    def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
-
-
-def handle_setup_logging() -> None:
-    """Setup logging for the bot"""
-    from discord import utils
-    timestamp = utils.utcnow().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"logs/furina_{timestamp}.log"
-
-    file_handler = logging.FileHandler(log_filename)
-    console_handler = logging.StreamHandler()
-    file_handler.setFormatter(LogFormatter())
-    console_handler.setFormatter(LogFormatter())
-
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-
-    # utils.setup_logging()
-    
-def delete_old_logs() -> None:
-    """Delete old logs"""
-    logs = sorted([file for file in os.listdir("logs") if file.startswith("furina_") and file.endswith(".log")])
-    if len(logs) > 2:
-        for log in logs[:-2]:
-            os.remove(f"logs/{log}")
-
-async def main() -> None:
-    os.makedirs("logs", exist_ok=True)
-    delete_old_logs()
-    handle_setup_logging()
+async def start_bot(*, shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None,
+                    cluster_id: int = 0, ipc: Optional[ClusterIPC] = None) -> None:
     async with ClientSession() as client_session, asqlite.create_pool("config.db") as pool:
-        async with Furina(pool=pool, client_session=client_session) as bot:
+        async with Furina(pool=pool, client_session=client_session, shard_ids=shard_ids,
+                          shard_count=shard_count, cluster_id=cluster_id, ipc=ipc) as bot:
             await bot.start(TOKEN)
 
-asyncio.run(main())
+def run_cluster(cluster_id: int, shard_ids: List[int], shard_count: int, address: Tuple[str, int]) -> None:
+    """Entry point of a cluster process started by `ClusterLauncher`"""
+    listener = handle_setup_logging(cluster_id)
+    try:
+        asyncio.run(start_bot(shard_ids=shard_ids, shard_count=shard_count, cluster_id=cluster_id,
+                              ipc=ClusterIPC(cluster_id, *address)))
+    finally:
+        listener.stop()
+
+async def main() -> None:
+    if CLUSTER_COUNT <= 1:
+        return await start_bot(shard_count=SHARD_COUNT)
+    shard_count = SHARD_COUNT or await fetch_recommended_shards(TOKEN)
+    launcher = ClusterLauncher(run_cluster, shard_count=max(shard_count, CLUSTER_COUNT),
+                               clusters=CLUSTER_COUNT, address=(IPC_HOST, IPC_PORT))
+    await launcher.run()
+
+if __name__ == "__main__":
+    listener = handle_setup_logging()
+    delete_legacy_logs()
+    try:
+        asyncio.run(main())
+    finally:
+        listener.stop()
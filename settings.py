@@ -5,9 +5,16 @@ load_dotenv()
 
 # Basic
 DEFAULT_PREFIX = "!"
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "lean")  # "lean" or "full", see _classes/cacheprofile.py
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None  # None = what Discord recommends
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", 1))  # Processes running the shards, see _classes/cluster.py
+IPC_HOST = "127.0.0.1"
+IPC_PORT = int(os.getenv("IPC_PORT", 47510))
 ACTIVITY_NAME = "Music » /play"
 TOKEN = os.getenv("BOT_TOKEN")
 DEBUG_WEBHOOK = os.getenv("DEBUG_WEBHOOK")
+LOG_MAX_BYTES = 5 * 1024 * 1024  # logs/furina.log is gzipped and rotated past this size
+LOG_BACKUP_COUNT = 10
 
 # GIF
 LOADING_GIF = "https://cdn.discordapp.com/emojis/1187957747724079144.gif?size=64&name=loading&quality=lossless"
@@ -26,3 +33,34 @@ LAVA_URI = "http://localhost:1710"
 LAVA_PW = "thanhz"
 BACKUP_LL = os.getenv("BACKUP_LL")
 BACKUP_LL_PW = os.getenv("BACKUP_LL_PW")
+NODE_HEALTH_INTERVAL = 10.0
+SNAPSHOT_INTERVAL = 30.0
+LAVALINK_JAR = "./Lavalink.jar"
+LAVALINK_RELEASES_API = os.getenv("LAVALINK_RELEASES_API", "https://api.github.com/repos/lavalink-devs/Lavalink/releases")
+LAVALINK_VERSION = os.getenv("LAVALINK_VERSION")  # Pin a release tag, e.g. "4.0.8"
+LAVALINK_JVM_OPTIONS = os.getenv("LAVALINK_JVM_OPTIONS", "-Xmx1G").split()
+LAVALINK_BOOT_TIMEOUT = 120.0
+WARMUP_RETRY_DELAY = 10.0
+WARMUP_RETRY_MAX_DELAY = 5 * 60
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 6 * 60 * 60
+RESOLVED_TRACK_LIMIT = 50_000
+RESOLVED_TRACK_TTL = 14 * 24 * 60 * 60
+SEARCH_CONCURRENCY = 4
+SEARCH_DEADLINE = 5.0
+PREFETCH_DEPTH = 3
+PREFETCH_TTL = 30 * 60
+PREFETCH_TIMEOUT = 3.0
+ACTOR_MAILBOX_SIZE = 20
+ACTOR_IDLE_TIMEOUT = 5 * 60
+VOICE_CONNECT_ATTEMPTS = 3
+RECOMMENDER_WINDOW = 3
+RECOMMENDER_MAX_TRACKS = 5000
+IDLE_WHEEL_TICK = 5.0
+IDLE_PAUSE_AFTER = 5 * 60
+IDLE_DISCONNECT_AFTER = 15 * 60
+NOWPLAYING_TICK = 15.0
+NOWPLAYING_EDIT_BUDGET = 10
+PLAY_HISTORY_SIZE = 500
+PLAY_HISTORY_HALF_LIFE = 7 * 24 * 60 * 60
+PLAYLIST_MAX_TRACKS = 1000